@@ -0,0 +1,44 @@
+"""Helpers shared by the benchmark scripts: stub environment, result files, percentiles."""
+
+import json
+import math
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Lets Config() load outside a real environment; nothing here reaches Google or Cal.com.
+STUB_ENV = {"API_KEY": "bench", "GEMINI_API_KEY": "bench", "GCP_PROJECT_ID": "bench"}
+
+
+def git_sha() -> str:
+    proc = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+    )
+    return proc.stdout.strip() or "unknown"
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0..100); None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def record(name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Stamps `result` with time/commit/python and appends it to results/<name>.jsonl."""
+    stamped = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_sha": git_sha(),
+        "python": sys.version.split()[0],
+        **result,
+    }
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    with (RESULTS_DIR / f"{name}.jsonl").open("a") as f:
+        f.write(json.dumps(stamped) + "\n")
+    return stamped
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Latency and recall per EMBEDDING_DIMENSION (256, 512, 768). For each dimension the case study
+and project chunks and the labeled queries in benchmarks/retrieval_queries.json are embedded
+through the app's EmbeddingClient and ranked against an in-memory snapshot: recall@k and MRR
+over the labeled slugs, overlap with the 768-dimension top k, embedding round-trip latency and
+response size, vector bytes per chunk and search latency. Each run is appended as one JSON
+line to benchmarks/results/embedding_dimensions.jsonl.
+
+Usage:
+    uv run python -m benchmarks.embedding_dimensions [--k 3] [--dtype float32]
+    uv run python -m benchmarks.embedding_dimensions --live   # real Gemini embeddings
+
+Offline, the fake server hashes words into `dimension` buckets, so fewer dimensions means
+more collisions; that tracks the direction of the trade-off, not Gemini's actual numbers.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import STUB_ENV, percentile, record
+from benchmarks.retrieval import QUERIES
+
+
+async def embed_all(client: Any, texts: List[str], live: bool) -> Tuple[List[List[float]], Dict]:
+    """Embeddings of `texts`, plus round-trip latency and response size stats."""
+    import httpx
+
+    latencies, sizes, vectors = [], [], []
+    async with httpx.AsyncClient() as http:
+        for text in texts:
+            url, kwargs = client.request(text)
+            start = time.perf_counter()
+            resp = await http.post(url, timeout=15.0, **kwargs)
+            resp.raise_for_status()
+            vectors.append(client.parse(resp.json()))
+            latencies.append(time.perf_counter() - start)
+            sizes.append(len(resp.content))
+            if live:
+                await asyncio.sleep(0.1)  # free-tier rate limits, as in scripts/ingest.py
+    return vectors, {
+        "embed_ms": {f"p{q}": round((percentile(latencies, q) or 0) * 1000, 2) for q in (50, 95)},
+        "response_bytes_mean": round(sum(sizes) / len(sizes)),
+    }
+
+
+async def run(k: int, dtype: str, live: bool) -> Dict[str, Any]:
+    from src.core.config import get_config
+    from src.core.corpus import (
+        CASE_STUDY_COLLECTION,
+        PROJECT_COLLECTION,
+        case_study_chunks,
+        project_chunks,
+    )
+    from src.core.embeddings import DIMENSIONS, EmbeddingClient, EmbeddingSpec
+    from src.core.snapshot import EmbeddingSnapshot, write_snapshot
+    from src.utils.utils import _read_data_file
+
+    config = get_config()
+    labeled = json.loads(QUERIES.read_text())
+    corpora = {
+        CASE_STUDY_COLLECTION: case_study_chunks(_read_data_file("case_studies.json", True)),
+        PROJECT_COLLECTION: project_chunks(_read_data_file("projects.json", True)),
+    }
+    results: Dict[int, Dict[str, Any]] = {}
+    full_top: Dict[str, List[List[str]]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for dimension in sorted(DIMENSIONS, reverse=True):
+            spec = EmbeddingSpec(config.gemini_embedding_model, dimension)
+            client = EmbeddingClient(spec, config.gemini_api_key, config.gemini_api_base_url)
+            recalls, reciprocal_ranks, overlaps, search_latencies = [], [], [], []
+            embed_stats = []
+            for collection, chunks in corpora.items():
+                queries = [q for q in labeled if q["collection"] == collection]
+                docs, doc_stats = await embed_all(client, [d["content"] for _, d in chunks], live)
+                vectors, query_stats = await embed_all(client, [q["query"] for q in queries], live)
+                embed_stats.append(query_stats)
+                directory = Path(tmp) / str(dimension) / collection
+                snapshot = EmbeddingSnapshot(write_snapshot(directory, chunks, docs, dtype))
+                tops = []
+                for query, vector in zip(queries, vectors, strict=True):
+                    start = time.perf_counter()
+                    hits = snapshot.search(vector, k)
+                    search_latencies.append(time.perf_counter() - start)
+                    tops.append([doc_id for doc_id, _, _ in hits])
+                    slugs = [doc["slug"] for _, doc, _ in hits]
+                    relevant = set(query["relevant"])
+                    recalls.append(len(relevant & set(slugs)) / len(relevant))
+                    rank = next((i for i, s in enumerate(slugs, start=1) if s in relevant), None)
+                    reciprocal_ranks.append(1 / rank if rank else 0.0)
+                full_top.setdefault(collection, tops)
+                overlaps += [
+                    len(set(top) & set(full)) / len(full)
+                    for top, full in zip(tops, full_top[collection], strict=True)
+                ]
+            results[dimension] = {
+                f"recall_at_{k}": round(sum(recalls) / len(recalls), 3),
+                "mrr": round(sum(reciprocal_ranks) / len(reciprocal_ranks), 3),
+                f"overlap_at_{k}_vs_{max(DIMENSIONS)}": round(sum(overlaps) / len(overlaps), 3),
+                # Query embeddings only: what a search pays per call
+                "query_embed_ms_p50": max(s["embed_ms"]["p50"] for s in embed_stats),
+                "response_bytes_mean": max(s["response_bytes_mean"] for s in embed_stats),
+                "vector_bytes_per_chunk": snapshot.nbytes // max(len(snapshot), 1),
+                "search_ms_p50": round((percentile(search_latencies, 50) or 0) * 1000, 3),
+            }
+    return {"k": k, "dtype": dtype, "dimensions": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latency and recall per embedding dimension")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--dtype", choices=("int8", "float16", "float32"), default="float32")
+    parser.add_argument("--remote-ms", type=float, default=0)
+    parser.add_argument("--live", action="store_true", help="Embed with the configured Gemini key")
+    parser.add_argument("--no-record", action="store_true", help="Print only, don't append")
+    args = parser.parse_args()
+
+    if not args.live:
+        for key, value in STUB_ENV.items():
+            os.environ.setdefault(key, value)
+    logging.basicConfig(level=logging.WARNING)
+
+    from benchmarks.fakes import FakeRemoteServer
+    from src.core.config import get_config
+
+    with contextlib.ExitStack() as stack:
+        if not args.live:
+            remote = stack.enter_context(FakeRemoteServer(latency=args.remote_ms / 1000))
+            get_config().gemini_api_base_url = remote.url
+        result = {"live": args.live, **asyncio.run(run(args.k, args.dtype, args.live))}
+
+    if not args.no_record:
+        result = record("embedding_dimensions", result)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,688 @@
+"""
+Offline stand-ins for the services the chatbot talks to, used by the load harness:
+
+- FakeReActLLM: a scripted LlamaIndex LLM that streams ReAct-formatted tokens
+  (router handoff → one specialist tool call → answer) with configurable latency.
+- FakeFunctionCallingLLM: the same conversations as structured tool calls, for
+  AGENT_MODE=function.
+- InMemoryFirestore: the subset of the Firestore AsyncClient API used by the service
+  layer and vector store, including find_nearest over stored embeddings.
+- FakeRemoteServer: a local HTTP server standing in for the Gemini embedding endpoint
+  and the Cal.com slots API.
+"""
+
+import asyncio
+import copy
+import hashlib
+import itertools
+import json
+import math
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud.firestore_v1.transforms import Increment, Sentinel
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.core.llms.llm import LLM, ToolSelection
+from pydantic import Field, PrivateAttr
+
+from src.core.corpus import (
+    CASE_STUDY_COLLECTION,
+    PROJECT_COLLECTION,
+    case_study_chunks,
+    project_chunks,
+)
+from src.core.embeddings import INDEX_COLLECTION, EmbeddingSpec
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+EMBEDDING_DIM = 768
+
+
+# ── scripted conversations ────────────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One benchmark conversation: the router hands off to `agent`, which calls `tool` once."""
+
+    name: str
+    prompt: str
+    agent: str
+    tool: str
+    tool_input: Dict[str, Any] = field(default_factory=dict)
+
+
+SCENARIOS: Tuple[Scenario, ...] = (
+    Scenario(
+        "semantic_search",
+        "How did Lorenzo handle retrieval in his RAG projects?",
+        "project_agent",
+        "search_case_study_content",
+        {"query": "retrieval augmented generation"},
+    ),
+    Scenario(
+        "project_list",
+        "Which AI projects has Lorenzo shipped?",
+        "project_agent",
+        "search_projects",
+        {"category": "ai"},
+    ),
+    Scenario("core_stack", "What is Lorenzo's core stack?", "technical_agent", "get_core_stack"),
+    Scenario(
+        "availability",
+        "Is Lorenzo available next week?",
+        "availability_agent",
+        "check_availability",
+    ),
+    Scenario("contact", "How can I contact Lorenzo?", "contact_agent", "trigger_contact_action"),
+)
+
+
+def scenario_for(message: str) -> Scenario:
+    return next((s for s in SCENARIOS if s.prompt == message), SCENARIOS[0])
+
+
+# ── fake LLM ──────────────────────────────────────────────────────────────────
+
+
+class FakeReActLLM(LLM):
+    """
+    Streams ReAct text the way Gemini does, without a network call. The agent is identified
+    from the tool list in its system prompt; the reply is picked from the scenario matching
+    the user message:
+
+    - router: `Action: handoff` to the scenario's agent
+    - specialist, no observation yet: `Action: <scenario tool>`
+    - specialist after its tool's observation: `Answer:` with `answer_tokens` tokens
+    """
+
+    first_token_latency: float = Field(default=0.3, description="Seconds before the first chunk")
+    token_latency: float = Field(default=0.01, description="Seconds between chunks")
+    answer_tokens: int = Field(default=60, description="Tokens in the final answer")
+    tokens_per_chunk: int = Field(default=4, description="Tokens per streamed chunk")
+
+    _output_tokens: int = PrivateAttr(default=0)  # generated so far, for tokens-per-turn
+
+    @property
+    def output_tokens(self) -> int:
+        return self._output_tokens
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=1_000_000,
+            num_output=2048,
+            is_chat_model=True,
+            is_function_calling_model=False,
+            model_name="fake-react",
+        )
+
+    # ── script ────────────────────────────────────────────────────────────────
+
+    def script(self, messages: Sequence[ChatMessage]) -> str:
+        system = (messages[0].content or "") if messages else ""
+        user_msg = next(
+            (
+                m.content or ""
+                for m in reversed(messages)
+                if m.role == MessageRole.USER and not (m.content or "").startswith("Observation:")
+            ),
+            "",
+        )
+        scenario = scenario_for(user_msg)
+
+        if f"Tool Name: {scenario.tool}" not in system:
+            return (
+                "Thought: This needs a specialist.\n"
+                "Action: handoff\n"
+                f'Action Input: {{"to_agent": "{scenario.agent}", "reason": "{scenario.name}"}}'
+            )
+
+        last_action = next(
+            (
+                m.content or ""
+                for m in reversed(messages)
+                if m.role == MessageRole.ASSISTANT and "Action:" in (m.content or "")
+            ),
+            "",
+        )
+        if f"Action: {scenario.tool}" in last_action and (messages[-1].content or "").startswith(
+            "Observation:"
+        ):
+            words = " ".join(f"word{i}" for i in range(self.answer_tokens))
+            return f"Thought: I can answer without using any more tools.\nAnswer: {words}"
+
+        return (
+            f"Thought: I need {scenario.tool}.\n"
+            f"Action: {scenario.tool}\n"
+            f"Action Input: {json.dumps(scenario.tool_input)}"
+        )
+
+    def _chunks(self, text: str) -> List[str]:
+        return _chunks(text, self.tokens_per_chunk)
+
+    # ── async API (what AgentWorkflow uses) ───────────────────────────────────
+
+    async def astream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponseAsyncGen:
+        text = self.script(messages)
+        self._output_tokens += _count_tokens(text)
+
+        async def gen() -> ChatResponseAsyncGen:
+            await asyncio.sleep(self.first_token_latency)
+            content = ""
+            for i, delta in enumerate(self._chunks(text)):
+                if i:
+                    await asyncio.sleep(self.token_latency)
+                content += delta
+                yield ChatResponse(
+                    message=ChatMessage(role=MessageRole.ASSISTANT, content=content), delta=delta
+                )
+
+        return gen()
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        await asyncio.sleep(self.first_token_latency)
+        text = self.script(messages)
+        self._output_tokens += _count_tokens(text)
+        return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT, content=text))
+
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        response = await self.achat([ChatMessage(role=MessageRole.USER, content=prompt)])
+        return CompletionResponse(text=response.message.content or "")
+
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        raise NotImplementedError("FakeReActLLM only streams chat")
+
+    # ── sync API (unused by the agents) ───────────────────────────────────────
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return ChatResponse(
+            message=ChatMessage(role=MessageRole.ASSISTANT, content=self.script(messages))
+        )
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(
+            text=self.chat([ChatMessage(content=prompt)]).message.content or ""
+        )
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        raise NotImplementedError("FakeReActLLM is async only")
+
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        raise NotImplementedError("FakeReActLLM is async only")
+
+
+def _chunks(text: str, tokens_per_chunk: int) -> List[str]:
+    # Whitespace-delimited "tokens", grouped like a real streaming response.
+    tokens = re.findall(r"\S+\s*", text)
+    step = max(1, tokens_per_chunk)
+    return ["".join(tokens[i : i + step]) for i in range(0, len(tokens), step)]
+
+
+def _count_tokens(text: str) -> int:
+    return len(text.split())
+
+
+class FakeFunctionCallingLLM(FunctionCallingLLM):
+    """
+    The FakeReActLLM conversations as native tool calls: the router calls `handoff`, the
+    specialist calls its scenario tool, then streams the answer as plain text. The agent is
+    identified from the tools it is offered.
+    """
+
+    first_token_latency: float = Field(default=0.3, description="Seconds before the first chunk")
+    token_latency: float = Field(default=0.01, description="Seconds between chunks")
+    answer_tokens: int = Field(default=60, description="Tokens in the final answer")
+    tokens_per_chunk: int = Field(default=4, description="Tokens per streamed chunk")
+
+    _output_tokens: int = PrivateAttr(default=0)
+    _ids: Any = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def output_tokens(self) -> int:
+        return self._output_tokens
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=1_000_000,
+            num_output=2048,
+            is_chat_model=True,
+            is_function_calling_model=True,
+            model_name="fake-function-calling",
+        )
+
+    def _prepare_chat_with_tools(
+        self,
+        tools: Sequence[Any],
+        user_msg: Optional[Any] = None,
+        chat_history: Optional[List[ChatMessage]] = None,
+        verbose: bool = False,
+        allow_parallel_tool_calls: bool = False,
+        tool_required: bool = False,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        messages = list(chat_history or [])
+        if user_msg is not None:
+            content = user_msg if isinstance(user_msg, str) else user_msg.content
+            messages.append(ChatMessage(role=MessageRole.USER, content=content))
+        return {"messages": messages, "tools": tools}
+
+    def get_tool_calls_from_response(
+        self, response: ChatResponse, error_on_no_tool_call: bool = True, **kwargs: Any
+    ) -> List[ToolSelection]:
+        calls = response.message.additional_kwargs.get("tool_calls") or []
+        if not calls and error_on_no_tool_call:
+            raise ValueError("Expected at least one tool call")
+        return [
+            ToolSelection(tool_id=c["id"], tool_name=c["name"], tool_kwargs=c["args"])
+            for c in calls
+        ]
+
+    # ── script ────────────────────────────────────────────────────────────────
+
+    def script(
+        self, messages: Sequence[ChatMessage], tools: Sequence[Any]
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """(answer text, tool call) for the next step; exactly one of the two is set."""
+        user_msg = next(
+            (m.content or "" for m in reversed(messages) if m.role == MessageRole.USER), ""
+        )
+        scenario = scenario_for(user_msg)
+        offered = {t.metadata.name for t in tools}
+        if scenario.tool not in offered:
+            args = {"to_agent": scenario.agent, "reason": scenario.name}
+            return "", {"id": f"call-{next(self._ids)}", "name": "handoff", "args": args}
+        called = any(
+            c["name"] == scenario.tool
+            for m in messages
+            if m.role == MessageRole.ASSISTANT
+            for c in m.additional_kwargs.get("tool_calls") or []
+        )
+        if called:
+            return " ".join(f"word{i}" for i in range(self.answer_tokens)), None
+        args = dict(scenario.tool_input)
+        return "", {"id": f"call-{next(self._ids)}", "name": scenario.tool, "args": args}
+
+    # ── async API ─────────────────────────────────────────────────────────────
+
+    async def astream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponseAsyncGen:
+        text, call = self.script(messages, kwargs.get("tools") or [])
+        self._output_tokens += (
+            _count_tokens(text) if call is None else 1 + _count_tokens(json.dumps(call["args"]))
+        )
+
+        async def gen() -> ChatResponseAsyncGen:
+            await asyncio.sleep(self.first_token_latency)
+            if call is not None:
+                message = ChatMessage(
+                    role=MessageRole.ASSISTANT, content="", additional_kwargs={"tool_calls": [call]}
+                )
+                yield ChatResponse(message=message, delta="")
+                return
+            content = ""
+            for i, delta in enumerate(_chunks(text, self.tokens_per_chunk)):
+                if i:
+                    await asyncio.sleep(self.token_latency)
+                content += delta
+                yield ChatResponse(
+                    message=ChatMessage(role=MessageRole.ASSISTANT, content=content), delta=delta
+                )
+
+        return gen()
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        chunks = [chunk async for chunk in await self.astream_chat(messages, **kwargs)]
+        return chunks[-1]
+
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        raise NotImplementedError("FakeFunctionCallingLLM only chats")
+
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        raise NotImplementedError("FakeFunctionCallingLLM only chats")
+
+    # ── sync API (unused by the agents) ───────────────────────────────────────
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        raise NotImplementedError("FakeFunctionCallingLLM is async only")
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        raise NotImplementedError("FakeFunctionCallingLLM is async only")
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        raise NotImplementedError("FakeFunctionCallingLLM is async only")
+
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        raise NotImplementedError("FakeFunctionCallingLLM is async only")
+
+
+# ── fake embeddings ───────────────────────────────────────────────────────────
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Deterministic unit vector derived from the text's hashed words."""
+    vec = [0.0] * dim
+    for word in text.lower().split():
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        idx = int.from_bytes(digest[:4], "little") % dim
+        vec[idx] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+# ── in-memory Firestore ───────────────────────────────────────────────────────
+
+
+class _Snapshot:
+    def __init__(self, ref: "_DocumentRef", data: Optional[Dict[str, Any]]):
+        self.reference = ref
+        self.id = ref.id
+        self.update_time = ref._store.update_times.get(ref.path)
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+
+class _DocumentRef:
+    def __init__(self, store: "InMemoryFirestore", path: Tuple[str, ...]):
+        self._store = store
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name: str) -> "_Query":
+        return _Query(self._store, self.path + (name,))
+
+    def _resolve(self, data: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+        resolved = {}
+        for key, value in data.items():
+            if isinstance(value, Sentinel):
+                value = self._store.now()
+            elif isinstance(value, Increment):
+                value = current.get(key, 0) + value.value
+            resolved[key] = value
+        return resolved
+
+    async def get(self) -> _Snapshot:
+        return _Snapshot(self, self._store.docs.get(self.path))
+
+    async def set(self, data: Dict[str, Any]) -> None:
+        self._store.docs[self.path] = self._resolve(data, {})
+        self._store.update_times[self.path] = self._store.now()
+
+    async def update(self, data: Dict[str, Any], option: Optional["_WriteOption"] = None) -> None:
+        current = self._store.docs.get(self.path)
+        if current is None:
+            raise KeyError(f"No document to update: {'/'.join(self.path)}")
+        if (
+            option is not None
+            and self._store.update_times.get(self.path) != option.last_update_time
+        ):
+            raise FailedPrecondition(f"Document changed since read: {'/'.join(self.path)}")
+        current.update(self._resolve(data, current))
+        self._store.update_times[self.path] = self._store.now()
+
+    async def delete(self) -> None:
+        self._store.docs.pop(self.path, None)
+        self._store.update_times.pop(self.path, None)
+
+
+@dataclass(frozen=True)
+class _WriteOption:
+    last_update_time: Optional[float]
+
+
+class _Query:
+    def __init__(self, store: "InMemoryFirestore", path: Tuple[str, ...]):
+        self._store = store
+        self.path = path
+        self._order: Optional[Tuple[str, bool]] = None
+        self._limit: Optional[int] = None
+        self._nearest: Optional[Dict[str, Any]] = None
+        self._filters: Tuple[Tuple[str, Any], ...] = ()
+        self._projection: Optional[Tuple[str, ...]] = None
+
+    def _with(self, **changes: Any) -> "_Query":
+        query = copy.copy(self)
+        for name, value in changes.items():
+            setattr(query, f"_{name}", value)
+        return query
+
+    def document(self, doc_id: str) -> _DocumentRef:
+        return _DocumentRef(self._store, self.path + (doc_id,))
+
+    async def add(self, data: Dict[str, Any]) -> Tuple[None, _DocumentRef]:
+        ref = self.document(f"auto-{next(self._store.ids)}")
+        await ref.set(data)
+        return None, ref
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING") -> "_Query":
+        return self._with(order=(field_path, direction == "DESCENDING"))
+
+    def limit(self, count: int) -> "_Query":
+        return self._with(limit=count)
+
+    def where(self, *, filter: Any) -> "_Query":
+        # Equality FieldFilters only, which is all vector_search pre-filters with
+        assert filter.op_string == "==", filter.op_string
+        return self._with(filters=self._filters + ((filter.field_path, filter.value),))
+
+    def select(self, field_paths: Sequence[str]) -> "_Query":
+        return self._with(projection=tuple(field_paths))
+
+    def find_nearest(
+        self,
+        vector_field: str,
+        query_vector: Any,
+        distance_measure: Any,
+        limit: int,
+        distance_result_field: Optional[str] = None,
+        distance_threshold: Optional[float] = None,
+    ) -> "_Query":
+        nearest = {
+            "field": vector_field,
+            "query": list(query_vector),
+            "limit": limit,
+            "result_field": distance_result_field,
+            "threshold": distance_threshold,
+        }
+        return self._with(nearest=nearest)
+
+    def _snapshots(self) -> List[_Snapshot]:
+        depth = len(self.path) + 1
+        rows = [
+            (path, data)
+            for path, data in list(self._store.docs.items())
+            if len(path) == depth
+            and path[:-1] == self.path
+            and all(data.get(f) == v for f, v in self._filters)
+        ]
+        if self._nearest:
+            nearest = self._nearest
+
+            def distance(data: Dict[str, Any]) -> float:
+                # Cosine distance; the fake embeddings are unit vectors
+                vector = data.get(nearest["field"]) or []
+                return 1 - sum(a * b for a, b in zip(nearest["query"], vector, strict=False))
+
+            ranked = sorted(
+                ((distance(data), path, data) for path, data in rows), key=lambda r: r[0]
+            )
+            if nearest["threshold"] is not None:
+                ranked = [r for r in ranked if r[0] <= nearest["threshold"]]
+            rows = []
+            for d, path, data in ranked[: nearest["limit"]]:
+                if nearest["result_field"]:
+                    data = {**data, nearest["result_field"]: d}
+                rows.append((path, data))
+        else:
+            if self._order:
+                order, descending = self._order
+                rows.sort(key=lambda row: row[1].get(order, 0), reverse=descending)
+            if self._limit is not None:
+                rows = rows[: self._limit]
+        if self._projection is not None:
+            keep = set(self._projection)
+            if self._nearest and self._nearest["result_field"]:
+                keep.add(self._nearest["result_field"])
+            rows = [(path, {k: v for k, v in data.items() if k in keep}) for path, data in rows]
+        return [_Snapshot(_DocumentRef(self._store, path), data) for path, data in rows]
+
+    async def get(self) -> List[_Snapshot]:
+        await asyncio.sleep(self._store.latency)
+        return self._snapshots()
+
+    async def stream(self) -> AsyncIterator[_Snapshot]:
+        await asyncio.sleep(self._store.latency)
+        for snapshot in self._snapshots():
+            yield snapshot
+
+
+class InMemoryFirestore:
+    """Dict-backed stand-in for google.cloud.firestore.AsyncClient (single process only)."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.docs: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self.update_times: Dict[Tuple[str, ...], float] = {}
+        self.ids = itertools.count()
+        self._clock = 0.0
+
+    def now(self) -> float:
+        # Strictly increasing, so documents written in the same tick still order correctly.
+        self._clock = max(time.time(), self._clock + 1e-6)
+        return self._clock
+
+    def collection(self, name: str) -> _Query:
+        return _Query(self, (name,))
+
+    def write_option(self, last_update_time: Optional[float] = None) -> _WriteOption:
+        return _WriteOption(last_update_time)
+
+    def close(self) -> None:
+        pass
+
+    def seed_vectors(self, spec: EmbeddingSpec) -> None:
+        """
+        Loads the vector collections with fake embeddings of the chunks ingest embeds, and
+        their index metadata documents with `spec`'s fingerprint.
+        """
+        studies = json.loads((DATA_DIR / "case_studies.json").read_text())
+        projects = json.loads((DATA_DIR / "projects.json").read_text())
+        for collection, chunks in (
+            (CASE_STUDY_COLLECTION, case_study_chunks(studies)),
+            (PROJECT_COLLECTION, project_chunks(projects)),
+        ):
+            for doc_id, doc in chunks:
+                self.docs[(collection, doc_id)] = {
+                    **doc,
+                    "embedding": fake_embedding(doc["content"], spec.dimension),
+                }
+            self.docs[(INDEX_COLLECTION, collection)] = {
+                "fingerprint": spec.fingerprint,
+                "model": spec.model,
+                "dimension": spec.dimension,
+                "documents": len(chunks),
+            }
+
+
+# ── fake embedding / Cal.com server ───────────────────────────────────────────
+
+
+def create_remote_app(latency: float):
+    """Starlette app serving the Gemini embedContent and Cal.com slots endpoints."""
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def embed(request: Request) -> JSONResponse:
+        await asyncio.sleep(latency)
+        body = await request.json()
+        text = " ".join(p.get("text", "") for p in body["content"]["parts"])
+        dim = body.get("outputDimensionality", EMBEDDING_DIM)
+        return JSONResponse({"embedding": {"values": fake_embedding(text, dim)}})
+
+    async def slots(request: Request) -> JSONResponse:
+        await asyncio.sleep(latency)
+        day = request.query_params.get("startTime", "2026-01-01")[:10]
+        return JSONResponse({"data": {"slots": {day: [{"time": f"{day}T09:00:00Z"}]}}})
+
+    async def root(request: Request) -> JSONResponse:
+        return JSONResponse({})
+
+    return Starlette(
+        routes=[
+            Route("/v1beta/models/{model}", embed, methods=["POST"]),
+            Route("/v2/slots/available", slots, methods=["GET"]),
+            Route("/", root, methods=["GET", "HEAD"]),
+        ]
+    )
+
+
+class FakeRemoteServer:
+    """Runs `create_remote_app` under uvicorn on a free local port in a background thread."""
+
+    def __init__(self, latency: float = 0.05):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(
+                create_remote_app(latency), host="127.0.0.1", port=self.port, log_level="warning"
+            )
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self) -> "FakeRemoteServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("fake remote server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
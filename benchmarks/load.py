@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Offline load test for POST /api/v2/chat/stream. No Gemini quota, Firestore or Cal.com
+account is needed:
+
+- the agents' LLM is a scripted FakeReActLLM streaming ReAct tokens with configurable latency
+- Firestore (sessions + vector collections) is an in-memory stand-in
+- embedding and Cal.com calls go to a local fake HTTP server
+
+N concurrent clients drive the ASGI app directly (no sockets for the app itself), and the
+harness reports p50/p95/p99 time-to-first-token, token throughput, requests/s and peak RSS
+as JSON, appended to benchmarks/results/load.jsonl for comparison between commits.
+
+Usage:
+    uv run python -m benchmarks.load [--clients 20] [--requests 5] [--first-token-ms 300]
+        [--token-ms 10] [--answer-tokens 60] [--remote-ms 50] [--firestore-ms 2]
+        [--session-backend firestore|sqlite|memory] [--max-in-flight 8]
+        [--admission-queue 16] [--admission-timeout-s 10]
+        [--agent-llm-profiles '{"router_agent": {"model": "fast"}}'] [--fast-first-token-ms 100]
+        [--agent-mode react|function] [--degradation-mode auto|off|<tier>]
+        [--tool-memo-scope turn|session|off]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from benchmarks.common import STUB_ENV, percentile, record
+
+for _key, _value in STUB_ENV.items():
+    os.environ.setdefault(_key, _value)
+
+from benchmarks.fakes import (  # noqa: E402
+    SCENARIOS,
+    FakeFunctionCallingLLM,
+    FakeReActLLM,
+    FakeRemoteServer,
+    InMemoryFirestore,
+)
+
+STREAM_PATH = "/api/v2/chat/stream"
+
+
+@dataclass
+class LoadOptions:
+    clients: int = 20
+    requests: int = 5
+    first_token_ms: float = 300
+    token_ms: float = 10
+    answer_tokens: int = 60
+    remote_ms: float = 50
+    firestore_ms: float = 2
+    warmup: int = 1
+    # "firestore" runs FirestoreSessionStore against the in-memory Firestore stand-in
+    session_backend: str = "firestore"
+    # Admission control: concurrent workflow runs (0 = unlimited), queue size and wait
+    max_in_flight: int = 0
+    admission_queue: int = 16
+    admission_timeout_s: float = 10
+    # AGENT_LLM_PROFILES JSON; agents whose profile names a model other than GEMINI_MODEL
+    # get a fake LLM with `fast_first_token_ms` instead of `first_token_ms`
+    agent_llm_profiles: str = ""
+    # AGENT_MODE: "react" (FakeReActLLM) or "function" (FakeFunctionCallingLLM)
+    agent_mode: str = "react"
+    # DEGRADATION_MODE: "auto", "off" or a pinned tier name
+    degradation_mode: str = "auto"
+    # TOOL_MEMO_SCOPE: "turn", "session" or "off"
+    tool_memo_scope: str = "turn"
+    fast_first_token_ms: float = 100
+
+
+@dataclass
+class StreamResult:
+    scenario: str
+    status: int
+    ttft: Optional[float] = None
+    duration: float = 0.0
+    tokens: int = 0
+    events: Dict[str, int] = field(default_factory=dict)
+    timings: Dict[str, Any] = field(default_factory=dict)
+    chat_id: Optional[str] = None
+    last_event_id: Optional[str] = None
+    done_reason: Optional[str] = None
+    tier: Optional[str] = None
+    error: Optional[str] = None
+
+
+# ── offline app ───────────────────────────────────────────────────────────────
+
+
+@contextlib.contextmanager
+def _patched(target: Any, name: str, value: Any) -> Iterator[None]:
+    original = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+
+@contextlib.asynccontextmanager
+async def offline_app(
+    options: LoadOptions, remote_url: str, llms: Optional[List[Any]] = None
+) -> AsyncIterator[Any]:
+    """
+    Yields the FastAPI app, started, with every external dependency replaced by a fake.
+    The fake LLMs built for the agents are appended to `llms` when given.
+    """
+    from asgi_lifespan import LifespanManager
+
+    import src.app
+    from src.core import admission, agent_orchestrator, degradation, tool_memo, vector_store
+    from src.core.config import get_config, parse_llm_profiles
+
+    config = get_config()
+    db = InMemoryFirestore(latency=options.firestore_ms / 1000)
+    db.seed_vectors(vector_store.embedding_spec())
+
+    def fake_llm(profile: agent_orchestrator.LLMProfile) -> Any:
+        fast = profile.model != config.gemini_model
+        first_token_ms = options.fast_first_token_ms if fast else options.first_token_ms
+        cls = FakeFunctionCallingLLM if options.agent_mode == "function" else FakeReActLLM
+        llm = cls(
+            first_token_latency=first_token_ms / 1000,
+            token_latency=options.token_ms / 1000,
+            answer_tokens=options.answer_tokens,
+        )
+        if llms is not None:
+            llms.append(llm)
+        return llm
+
+    async def init_fake_firestore() -> InMemoryFirestore:
+        return db
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(_patched(config, "session_backend", options.session_backend))
+        if options.session_backend == "sqlite":
+            tmp = stack.enter_context(tempfile.TemporaryDirectory())
+            stack.enter_context(_patched(config, "sqlite_path", os.path.join(tmp, "bench.db")))
+        stack.enter_context(_patched(config, "gemini_api_base_url", remote_url))
+        stack.enter_context(_patched(config, "calcom_api_base_url", remote_url))
+        stack.enter_context(_patched(config, "calcom_username", "bench"))
+        stack.enter_context(_patched(config, "rate_limit_requests", 10**9))
+        stack.enter_context(_patched(src.app, "init_firestore", init_fake_firestore))
+        stack.enter_context(_patched(vector_store, "_firestore_client", db))
+        profiles = parse_llm_profiles(options.agent_llm_profiles)
+        stack.enter_context(_patched(config, "agent_llm_profiles", profiles))
+        stack.enter_context(_patched(config, "agent_mode", options.agent_mode))
+        stack.enter_context(_patched(agent_orchestrator, "_llm", fake_llm))
+        stack.enter_context(_patched(config, "tool_memo_scope", options.tool_memo_scope))
+        memos = tool_memo.SessionMemos(
+            config.tool_memo_session_ttl_seconds, config.tool_memo_session_max_chats
+        )
+        stack.enter_context(_patched(tool_memo, "sessions", memos))
+        stack.enter_context(_patched(agent_orchestrator, "_workflow", None))
+        stack.enter_context(_patched(agent_orchestrator, "_degraded", {}))
+        degrader = degradation.DegradationController(
+            options.degradation_mode,
+            config.degrade_rate_limits_per_minute,
+            config.degrade_p95_seconds,
+            config.degrade_recovery_seconds,
+        )
+        stack.enter_context(_patched(degradation, "controller", degrader))
+        cache = degradation.AnswerCache(config.answer_cache_size)
+        stack.enter_context(_patched(degradation, "answers", cache))
+        governor = admission.AdmissionController(
+            options.max_in_flight, options.admission_queue, options.admission_timeout_s
+        )
+        stack.enter_context(_patched(admission, "controller", governor))
+        async with LifespanManager(src.app.app) as manager:
+            yield manager.app
+
+
+# ── ASGI SSE client ───────────────────────────────────────────────────────────
+
+
+async def stream_chat(
+    app: Any,
+    message: str,
+    scenario: str,
+    disconnect_after_tokens: Optional[int] = None,
+    headers: Optional[Dict[str, str]] = None,
+    body_fields: Optional[Dict[str, Any]] = None,
+) -> StreamResult:
+    """
+    Sends one chat request straight into the ASGI app and timestamps the SSE body chunks
+    as the app emits them (httpx's ASGITransport would buffer the whole response).
+    With `disconnect_after_tokens`, the client hangs up after that many token events;
+    `headers` adds request headers (e.g. Idempotency-Key / Last-Event-ID for resumes) and
+    `body_fields` extra request body fields (e.g. deadlineSeconds).
+    """
+    from src.core.config import get_config
+
+    body = json.dumps({"message": message, **(body_fields or {})}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": STREAM_PATH,
+        "raw_path": STREAM_PATH.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"authorization", f"Bearer {get_config().api_key}".encode()),
+            *((k.lower().encode(), v.encode()) for k, v in (headers or {}).items()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    result = StreamResult(scenario=scenario, status=0)
+    finished = asyncio.Event()
+    hung_up = asyncio.Event()
+    request_sent = False
+    buffer = ""
+    start = time.perf_counter()
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        waits = [asyncio.ensure_future(e.wait()) for e in (finished, hung_up)]
+        await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waits:
+            waiter.cancel()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal buffer
+        if message["type"] == "http.response.start":
+            result.status = message["status"]
+        elif message["type"] == "http.response.body":
+            buffer += message.get("body", b"").decode()
+            while "\n\n" in buffer:
+                raw, buffer = buffer.split("\n\n", 1)
+                _on_event(raw)
+
+    def _on_event(raw: str) -> None:
+        lines = dict(line.split(": ", 1) for line in raw.splitlines() if ": " in line)
+        event = lines.get("event", "message")
+        result.last_event_id = lines.get("id", result.last_event_id)
+        result.events[event] = result.events.get(event, 0) + 1
+        if event == "meta":
+            meta = json.loads(lines["data"])
+            result.chat_id = meta["chatId"]
+            result.tier = meta.get("tier")
+        elif event == "token":
+            if result.ttft is None:
+                result.ttft = time.perf_counter() - start
+            result.tokens += len(json.loads(lines["data"])["text"].split())
+            if result.events["token"] == disconnect_after_tokens:
+                hung_up.set()
+        elif event == "done":
+            done = json.loads(lines["data"])
+            result.timings = done.get("timings") or {}
+            result.done_reason = done.get("reason")
+
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        finished.set()
+    result.duration = time.perf_counter() - start
+    if result.status != 200 and result.error is None:
+        result.error = f"HTTP {result.status}"
+    return result
+
+
+# ── load run ──────────────────────────────────────────────────────────────────
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def summarize(results: List[StreamResult], wall: float) -> Dict[str, Any]:
+    ok = [r for r in results if r.error is None]
+    ttfts = [r.ttft for r in ok if r.ttft is not None]
+    stream_rates = [
+        r.tokens / (r.duration - r.ttft) for r in ok if r.ttft is not None and r.duration > r.ttft
+    ]
+    tokens = sum(r.tokens for r in ok)
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "error_samples": sorted({r.error for r in results if r.error})[:5],
+        # Requests rejected by admission control (HTTP 503 or an SSE `busy` event)
+        "shed": sum(1 for r in results if r.status == 503 or "busy" in r.events),
+        # Turns cut short by TURN_DEADLINE_SECONDS / TURN_MAX_STEPS / TURN_MAX_HANDOFFS
+        "budget_exceeded": sum(1 for r in ok if r.done_reason and "exceeded" in r.done_reason),
+        # Turns per degradation tier, from the `meta` event
+        "tiers": {
+            tier: sum(1 for r in ok if r.tier == tier)
+            for tier in sorted({r.tier for r in ok if r.tier})
+        },
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(len(ok) / wall, 2) if wall else None,
+        "tokens_per_s": round(tokens / wall, 1) if wall else None,
+        "ttft_ms": {f"p{q}": _ms(percentile(ttfts, q)) for q in (50, 95, 99)},
+        "latency_ms": {f"p{q}": _ms(percentile([r.duration for r in ok], q)) for q in (50, 95, 99)},
+        "stream_tokens_per_s_p50": round(percentile(stream_rates, 50) or 0, 1),
+        # Server-side phase breakdown from the `timings` payload of each `done` event
+        "server_phases_p50_ms": {
+            phase: percentile([r.timings[phase] for r in ok if phase in r.timings], 50)
+            for phase in (
+                "admission_ms",
+                "session_ms",
+                "history_ms",
+                "first_token_ms",
+                "persist_ms",
+                "total_ms",
+            )
+        },
+        # Mean LLM step time per agent (prompt → last token), from `timings.llm_steps`
+        "llm_step_p50_ms_by_agent": {
+            agent: percentile(
+                [
+                    r.timings["llm_steps"][agent]["ms"] / r.timings["llm_steps"][agent]["steps"]
+                    for r in ok
+                    if agent in r.timings.get("llm_steps", {})
+                ],
+                50,
+            )
+            for agent in sorted({a for r in ok for a in r.timings.get("llm_steps", {})})
+        },
+        # Repeated tool calls answered from the tool memo, from `timings.tool_memo_hits`
+        "tool_memo_hits_per_turn": round(
+            sum(sum(r.timings.get("tool_memo_hits", {}).values()) for r in ok) / len(ok), 2
+        )
+        if ok
+        else None,
+        "by_scenario": {
+            s.name: {
+                "requests": sum(1 for r in ok if r.scenario == s.name),
+                "ttft_p50_ms": _ms(
+                    percentile([r.ttft for r in ok if r.scenario == s.name and r.ttft], 50)
+                ),
+            }
+            for s in SCENARIOS
+        },
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_load(options: LoadOptions, remote_url: str) -> Dict[str, Any]:
+    llms: List[Any] = []
+    async with offline_app(options, remote_url, llms) as app:
+        for i in range(options.warmup):
+            scenario = SCENARIOS[i % len(SCENARIOS)]
+            await stream_chat(app, scenario.prompt, scenario.name)
+        warmup_tokens = sum(llm.output_tokens for llm in llms)
+
+        async def client(index: int) -> List[StreamResult]:
+            out = []
+            for n in range(options.requests):
+                scenario = SCENARIOS[(index + n) % len(SCENARIOS)]
+                out.append(await stream_chat(app, scenario.prompt, scenario.name))
+            return out
+
+        start = time.perf_counter()
+        per_client = await asyncio.gather(*(client(i) for i in range(options.clients)))
+        wall = time.perf_counter() - start
+        generated = sum(llm.output_tokens for llm in llms) - warmup_tokens
+
+    results = [r for batch in per_client for r in batch]
+    return {
+        "options": asdict(options),
+        **summarize(results, wall),
+        # Tokens the (fake) LLM generated per turn, scaffolding and tool calls included;
+        # compare --agent-mode react vs function
+        "llm_output_tokens_per_turn": round(generated / len(results), 1) if results else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test for the SSE chat endpoint")
+    defaults = LoadOptions()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--no-record", action="store_true", help="Print only, don't append")
+    parser.add_argument("--verbose", action="store_true", help="Keep app INFO logging")
+    args = parser.parse_args()
+    options = LoadOptions(**{k: getattr(args, k) for k in asdict(defaults)})
+
+    import src.app  # noqa: F401  (configures logging)
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    with FakeRemoteServer(latency=options.remote_ms / 1000) as remote:
+        result = asyncio.run(run_load(options, remote.url))
+    if not args.no_record:
+        result = record("load", result)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
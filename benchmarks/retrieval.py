@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Compares retrieval modes (lexical BM25, vector, hybrid RRF) on the labeled queries in
+benchmarks/retrieval_queries.json: recall@k and MRR over the relevant slugs, and search
+latency, and the bytes a find_nearest query returns with and without the field projection
+vector_search applies. The "profile" queries measure search_profile instead: recall over its citations and
+the prompt tokens it adds against the whole-file tools. Each run is appended as one JSON
+line to benchmarks/results/retrieval.jsonl.
+
+Usage:
+    uv run python -m benchmarks.retrieval [--k 3] [--remote-ms 50] [--firestore-ms 2]
+    uv run python -m benchmarks.retrieval --live   # real Gemini embeddings + Firestore
+
+Offline, embeddings come from the fake server (hashed bag of words) and Firestore is the
+in-memory stand-in seeded with the ingest chunks, so vector recall there measures the
+plumbing rather than embedding quality; use --live for real recall numbers.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import STUB_ENV, percentile, record
+
+QUERIES = Path(__file__).resolve().parent / "retrieval_queries.json"
+
+
+async def evaluate(mode: str, queries: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    from src.core import retrieval, vector_store
+    from src.core.config import get_config
+
+    config = get_config()
+    original, vector_search = config.retrieval_mode, vector_store.vector_search
+    vector_calls = 0
+
+    async def counted(*args: Any, **kwargs: Any) -> List[dict]:
+        nonlocal vector_calls
+        vector_calls += 1
+        return await vector_search(*args, **kwargs)
+
+    config.retrieval_mode = mode
+    vector_store.vector_search = counted
+    latencies, recalls, reciprocal_ranks = [], [], []
+    try:
+        for item in queries:
+            start = time.perf_counter()
+            docs = await retrieval.search(item["collection"], item["query"], n_results=k)
+            latencies.append(time.perf_counter() - start)
+            slugs = [doc.get("slug") for doc in docs]
+            relevant = set(item["relevant"])
+            recalls.append(len(relevant & set(slugs)) / len(relevant))
+            rank = next((i for i, slug in enumerate(slugs, start=1) if slug in relevant), None)
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+    finally:
+        config.retrieval_mode = original
+        vector_store.vector_search = vector_search
+    return {
+        f"recall_at_{k}": round(sum(recalls) / len(recalls), 3),
+        "mrr": round(sum(reciprocal_ranks) / len(reciprocal_ranks), 3),
+        # Queries that needed an embedding + kNN round trip
+        "vector_calls": vector_calls,
+        "latency_ms": {f"p{q}": round((percentile(latencies, q) or 0) * 1000, 2) for q in (50, 95)},
+    }
+
+
+def evaluate_profile(queries: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    """search_profile vs. the whole-file tools an agent would otherwise call."""
+    from src.core import tools
+    from src.core.tool_output import estimate_tokens, shape_tool_output, split_artifacts
+
+    whole_file = {
+        "bio": tools.get_bio_tool_function,
+        "work": tools.get_work_experience_tool_function,
+        "education": tools.get_education,
+        "cert": tools.get_certifications,
+        "skills": tools.get_skills_tool_function,
+    }
+
+    def tokens(result: Any) -> int:
+        return estimate_tokens(shape_tool_output("benchmark", split_artifacts(result)[0]))
+
+    latencies, recalls, passage_tokens, file_tokens = [], [], [], []
+    for item in queries:
+        start = time.perf_counter()
+        result = tools.search_profile(item["query"], limit=k)
+        latencies.append(time.perf_counter() - start)
+        slugs = {c["slug"] for c in result.get("_citations", [])}
+        relevant = set(item["relevant"])
+        recalls.append(len(relevant & slugs) / len(relevant))
+        passage_tokens.append(tokens(result))
+        sources = {slug.split("-")[0] for slug in relevant}
+        file_tokens.append(sum(tokens(whole_file[source]()) for source in sources))
+    return {
+        "queries": len(queries),
+        f"recall_at_{k}": round(sum(recalls) / len(recalls), 3),
+        # Estimated prompt tokens added per answer: top-k passages vs. whole files
+        "tool_output_tokens_mean": round(sum(passage_tokens) / len(passage_tokens), 1),
+        "whole_file_tokens_mean": round(sum(file_tokens) / len(file_tokens), 1),
+        "latency_ms": {f"p{q}": round((percentile(latencies, q) or 0) * 1000, 2) for q in (50, 95)},
+    }
+
+
+async def vector_payload(queries: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    """Mean bytes per find_nearest result set: projected fields vs. whole documents."""
+    from src.core import vector_store
+    from src.core.corpus import DOCUMENT_FIELDS
+
+    db = vector_store.get_vector_db()
+    sizes: Dict[str, List[int]] = {"projected": [], "full_documents": []}
+    for item in queries:
+        collection = item["collection"]
+        embedding = await vector_store.embed_text(item["query"])
+        for name, fields in (("projected", DOCUMENT_FIELDS[collection]), ("full_documents", None)):
+            options = vector_store.SearchOptions((), fields, None)
+            docs = await vector_store.nearest_query(db, collection, embedding, k, options).get()
+            payload = [doc.to_dict() for doc in docs]
+            sizes[name].append(len(json.dumps(payload, default=list).encode()))
+    return {f"{name}_bytes_mean": round(sum(v) / len(v)) for name, v in sizes.items()}
+
+
+async def run(k: int) -> Dict[str, Any]:
+    queries = json.loads(QUERIES.read_text())
+    profile = [q for q in queries if q["collection"] == "profile"]
+    searchable = [q for q in queries if q["collection"] != "profile"]
+    results = {}
+    for mode in ("lexical", "vector", "hybrid"):
+        await evaluate(mode, searchable[:2], k)  # warm-up: index build, connections
+        results[mode] = await evaluate(mode, searchable, k)
+    evaluate_profile(profile[:2], k)
+    return {
+        "queries": len(searchable),
+        "k": k,
+        "modes": results,
+        "vector_payload": await vector_payload(searchable, k),
+        "profile": evaluate_profile(profile, k),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall and latency per retrieval mode")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--remote-ms", type=float, default=50)
+    parser.add_argument("--firestore-ms", type=float, default=2)
+    parser.add_argument("--live", action="store_true", help="Use the configured Gemini/Firestore")
+    parser.add_argument("--no-record", action="store_true", help="Print only, don't append")
+    args = parser.parse_args()
+
+    if not args.live:
+        for key, value in STUB_ENV.items():
+            os.environ.setdefault(key, value)
+    logging.basicConfig(level=logging.WARNING)
+
+    from benchmarks.fakes import FakeRemoteServer, InMemoryFirestore
+    from src.core import vector_store
+    from src.core.config import get_config
+
+    with contextlib.ExitStack() as stack:
+        if not args.live:
+            remote = stack.enter_context(FakeRemoteServer(latency=args.remote_ms / 1000))
+            db = InMemoryFirestore(latency=args.firestore_ms / 1000)
+            db.seed_vectors(vector_store.embedding_spec())
+            get_config().gemini_api_base_url = remote.url
+            vector_store._firestore_client = db  # type: ignore[assignment]
+        result = {"live": args.live, **asyncio.run(run(args.k))}
+
+    if not args.no_record:
+        result = record("retrieval", result)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
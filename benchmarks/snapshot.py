@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Recall vs. size of the embedding snapshot formats (src/core/snapshot.py). The case study and
+project chunks are embedded once, written as an int8, float16 and float32 snapshot, and every
+query in benchmarks/retrieval_queries.json plus every chunk's title is ranked against each:
+overlap of the top k with the float32 top k, recall@k over the labeled slugs, bytes on disk,
+open (mmap) time and search latency. Each run is appended as one JSON line to
+benchmarks/results/snapshot.jsonl.
+
+Usage:
+    uv run python -m benchmarks.snapshot [--k 3]
+    uv run python -m benchmarks.snapshot --live   # real Gemini embeddings
+
+Offline, embeddings are the fake server's hashed bag of words: sparse vectors that quantize
+almost losslessly, so the quantization error shows up properly only with --live.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import STUB_ENV, percentile, record
+from benchmarks.retrieval import QUERIES
+
+
+async def embed_all(texts: List[str], live: bool) -> List[List[float]]:
+    if not live:
+        from benchmarks.fakes import fake_embedding
+
+        return [fake_embedding(text) for text in texts]
+    from src.core.vector_store import embed_text
+
+    embeddings = []
+    for text in texts:
+        embeddings.append(await embed_text(text))
+        await asyncio.sleep(0.1)  # free-tier rate limits, as in scripts/ingest.py
+    return embeddings
+
+
+def size_on_disk(directory: Path) -> int:
+    return sum(f.stat().st_size for f in directory.iterdir())
+
+
+def evaluate(
+    directory: Path,
+    queries: List[Dict[str, Any]],
+    vectors: List[List[float]],
+    exact: List[List[str]],
+    k: int,
+) -> Dict[str, Any]:
+    from src.core.snapshot import EmbeddingSnapshot
+
+    start = time.perf_counter()
+    snapshot = EmbeddingSnapshot(directory)
+    open_ms = (time.perf_counter() - start) * 1000
+    latencies, overlaps, recalls = [], [], []
+    for query, vector, expected in zip(queries, vectors, exact, strict=True):
+        start = time.perf_counter()
+        hits = snapshot.search(vector, k)
+        latencies.append(time.perf_counter() - start)
+        overlaps.append(len({doc_id for doc_id, _, _ in hits} & set(expected)) / len(expected))
+        if query.get("relevant"):
+            relevant = set(query["relevant"])
+            recalls.append(len(relevant & {doc["slug"] for _, doc, _ in hits}) / len(relevant))
+    return {
+        "bytes_on_disk": size_on_disk(directory),
+        "vector_bytes": snapshot.nbytes,
+        # Share of the float32 top k that the snapshot also returns
+        f"overlap_at_{k}_vs_float32": round(sum(overlaps) / len(overlaps), 4),
+        f"labeled_recall_at_{k}": round(sum(recalls) / len(recalls), 3) if recalls else None,
+        "open_ms": round(open_ms, 3),
+        "search_ms": {f"p{q}": round((percentile(latencies, q) or 0) * 1000, 3) for q in (50, 95)},
+    }
+
+
+async def run(k: int, live: bool) -> Dict[str, Any]:
+    from src.core.corpus import (
+        CASE_STUDY_COLLECTION,
+        PROJECT_COLLECTION,
+        case_study_chunks,
+        project_chunks,
+    )
+    from src.core.snapshot import DTYPES, EmbeddingSnapshot, write_snapshot
+    from src.utils.utils import _read_data_file
+
+    labeled = json.loads(QUERIES.read_text())
+    corpora = {
+        CASE_STUDY_COLLECTION: case_study_chunks(_read_data_file("case_studies.json", True)),
+        PROJECT_COLLECTION: project_chunks(_read_data_file("projects.json", True)),
+    }
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for collection, chunks in corpora.items():
+            queries = [q for q in labeled if q["collection"] == collection]
+            queries += [{"query": title} for title in sorted({d["title"] for _, d in chunks})]
+            embeddings = await embed_all([doc["content"] for _, doc in chunks], live)
+            vectors = await embed_all([q["query"] for q in queries], live)
+
+            reference = write_snapshot(
+                Path(tmp) / collection / "reference", chunks, embeddings, "float32"
+            )
+            exact_snapshot = EmbeddingSnapshot(reference)
+            exact = [[doc_id for doc_id, _, _ in exact_snapshot.search(v, k)] for v in vectors]
+
+            per_dtype = {}
+            for dtype in DTYPES:
+                directory = write_snapshot(
+                    Path(tmp) / collection / dtype, chunks, embeddings, dtype
+                )
+                per_dtype[dtype] = evaluate(directory, queries, vectors, exact, k)
+            results[collection] = {
+                "chunks": len(chunks),
+                "dim": exact_snapshot.dim,
+                "queries": len(queries),
+                "dtypes": per_dtype,
+            }
+    return {"k": k, "collections": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall vs. size per embedding snapshot dtype")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--live", action="store_true", help="Embed with the configured Gemini key")
+    parser.add_argument("--no-record", action="store_true", help="Print only, don't append")
+    args = parser.parse_args()
+
+    if not args.live:
+        for key, value in STUB_ENV.items():
+            os.environ.setdefault(key, value)
+    logging.basicConfig(level=logging.WARNING)
+
+    result = {"live": args.live, **asyncio.run(run(args.k, args.live))}
+    if not args.no_record:
+        result = record("snapshot", result)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Measures cold-start cost: import time of src.app (via `python -X importtime`), time to
+lifespan-ready and time to the first served request, in both startup modes. Each run
+is appended as one JSON line to benchmarks/results/startup.jsonl so changes can be
+compared across commits.
+
+Usage:
+    uv run python -m benchmarks.startup [--runs 3] [--top 15]
+
+Runs offline with stub credentials: unless GOOGLE_APPLICATION_CREDENTIALS is set, sessions
+use the in-memory store (SESSION_BACKEND=memory), only local embedding snapshots are
+verified (EMBEDDING_INDEX_CHECK=snapshot), and network warm-ups made by the prewarm step fail
+fast and show up under "errors" rather than aborting the run.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.common import ROOT, STUB_ENV, record
+
+
+def _env(**extra: str) -> Dict[str, str]:
+    env = {**os.environ, **STUB_ENV, **extra}
+    env.setdefault("PHOENIX_CLIENT_HEADERS", "")
+    if not env.get("GOOGLE_APPLICATION_CREDENTIALS"):
+        env.setdefault("SESSION_BACKEND", "memory")
+        # Without credentials the Firestore client would spend seconds probing for them
+        env.setdefault("EMBEDDING_INDEX_CHECK", "snapshot")
+    return env
+
+
+def import_profile(top: int) -> Dict[str, object]:
+    """Runs `python -X importtime -c 'import src.app'` and returns the heaviest modules."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.app"],
+        cwd=ROOT,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line.split("|", 2))
+        rows.append((name, int(self_us.split(":")[-1]), int(cumulative_us)))
+    total = next((cum for name, _, cum in rows if name == "src.app"), None)
+    heaviest = sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+    return {
+        "src_app_ms": round(total / 1000, 1) if total else None,
+        "top_cumulative_ms": {name: round(cum / 1000, 1) for name, _, cum in heaviest},
+    }
+
+
+def _child(mode: str) -> None:
+    """Runs inside a fresh interpreter: import, lifespan, first request."""
+    import asyncio
+
+    t0 = time.perf_counter()
+
+    async def main() -> Dict[str, object]:
+        import httpx
+        from asgi_lifespan import LifespanManager
+
+        from src.app import app
+
+        imported = time.perf_counter()
+        async with LifespanManager(app):
+            ready = time.perf_counter()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                await client.get("/api/v2/health")
+            first = time.perf_counter()
+            report = app.state.startup.report()
+        return {
+            "mode": mode,
+            "import_ms": round((imported - t0) * 1000, 1),
+            "ready_ms": round((ready - t0) * 1000, 1),
+            "first_request_ms": round((first - t0) * 1000, 1),
+            "phases_ms": report["phases_ms"],
+            "errors": report["errors"],
+        }
+
+    print(json.dumps(asyncio.run(main())))
+
+
+def measure(mode: str, runs: int) -> Dict[str, object]:
+    samples: List[Dict[str, object]] = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child", mode],
+            cwd=ROOT,
+            env=_env(STARTUP_MODE=mode),
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if proc.returncode != 0:
+            return {"mode": mode, "error": proc.stderr.strip().splitlines()[-1:]}
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    def median(key: str) -> float:
+        return statistics.median(float(s[key]) for s in samples)  # type: ignore[arg-type]
+
+    return {
+        "mode": mode,
+        "runs": runs,
+        "import_ms": median("import_ms"),
+        "ready_ms": median("ready_ms"),
+        "first_request_ms": median("first_request_ms"),
+        "phases_ms": samples[-1]["phases_ms"],
+        "errors": samples[-1]["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--child", choices=["lazy", "prewarm"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child)
+        return
+
+    result = record(
+        "startup",
+        {
+            "imports": import_profile(args.top),
+            "modes": [measure(mode, args.runs) for mode in ("lazy", "prewarm")],
+        },
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
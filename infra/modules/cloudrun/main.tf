@@ -43,6 +43,12 @@ resource "google_cloud_run_v2_service" "backend" {
         value = var.calcom_event_slug
       }
 
+      # Warm imports, data and connections during startup_cpu_boost, before traffic.
+      env {
+        name  = "STARTUP_MODE"
+        value = "prewarm"
+      }
+
       dynamic "env" {
         for_each = var.secret_env_vars
         content {
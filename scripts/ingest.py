@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 """
 Builds Firestore vector collections from case_studies.json and projects.json.
+The chunks are defined in src/core/corpus.py, which the app's BM25 index is built from too.
 
 Prerequisites:
   1. Run `terraform apply` (creates the Firestore database)
   2. Create vector indexes (one-time, see below)
-  3. Set GEMINI_API_KEY and GCP_PROJECT_ID in .env
+  3. Set GEMINI_API_KEY and GCP_PROJECT_ID in .env (and EMBEDDING_DIMENSION, if not 768)
 
-Create vector indexes before first run:
+Create vector indexes before first run, with "dimension" set to EMBEDDING_DIMENSION:
     gcloud alpha firestore indexes composite create \
       --project=$GCP_PROJECT_ID \
       --collection-group=case_study_embeddings \
@@ -20,10 +21,29 @@ Create vector indexes before first run:
       --query-scope=COLLECTION \
       --field-config field-path=embedding,vector-config='{"dimension":"768","flat":"{}"}'
 
+    # For searches pre-filtered on category (add one per filter field that is used)
+    gcloud alpha firestore indexes composite create \
+      --project=$GCP_PROJECT_ID \
+      --collection-group=project_embeddings \
+      --query-scope=COLLECTION \
+      --field-config field-path=category,order=ASCENDING \
+      --field-config field-path=embedding,vector-config='{"dimension":"768","flat":"{}"}'
+
+Documents are embedded with the same client, model and dimension the app embeds queries
+with (src/core/embeddings.py), and each collection's fingerprint is recorded in
+embedding_indexes/<collection>; the app refuses to start against an index whose fingerprint
+differs from its own configuration. After changing the dimension, recreate the vector indexes
+and re-run this script.
+
+It also writes a memory-mapped embedding snapshot per collection (int8 by default, see
+src/core/snapshot.py) that the app ranks locally when EMBEDDING_SNAPSHOT_DIR points at it.
+
 Usage:
-    uv run scripts/ingest.py
+    uv run scripts/ingest.py [--snapshot-dir snapshots] [--snapshot-dtype int8|float16|float32]
+    uv run scripts/ingest.py --no-snapshot
 """
 
+import argparse
 import json
 import logging
 import os
@@ -33,11 +53,20 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import httpx
 from dotenv import load_dotenv
-from google.cloud.firestore import Client
+from google.cloud.firestore import SERVER_TIMESTAMP, Client
 from google.cloud.firestore_v1.vector import Vector
 
+from src.core.corpus import (
+    CASE_STUDY_COLLECTION,
+    PROJECT_COLLECTION,
+    Chunk,
+    case_study_chunks,
+    project_chunks,
+)
+from src.core.embeddings import INDEX_COLLECTION, EmbeddingClient, EmbeddingSpec
+from src.core.snapshot import DTYPES, write_snapshot
+
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
@@ -45,98 +74,76 @@ logger = logging.getLogger(__name__)
 DATA_DIR = Path(__file__).parent.parent / "data"
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-GEMINI_EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-2")
 
 if not GEMINI_API_KEY:
     raise SystemExit("GEMINI_API_KEY is required")
 
-
-def embed_text(text: str) -> list[float]:
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_EMBEDDING_MODEL}:embedContent"
-    payload = {
-        "model": f"models/{GEMINI_EMBEDDING_MODEL}",
-        "content": {"parts": [{"text": text}]},
-        "outputDimensionality": 768,
-    }
-
-    resp = httpx.post(
-        url,
-        params={"key": GEMINI_API_KEY},
-        json=payload,
-        timeout=15.0,
-    )
-    resp.raise_for_status()
-    return resp.json()["embedding"]["values"]
-
-
-def ingest_case_studies(db: Client) -> None:
-    collection = db.collection("case_study_embeddings")
-    studies = json.loads((DATA_DIR / "case_studies.json").read_text())
-    count = 0
-
-    for study in studies:
-        slug = study["slug"]
-        title = study["title"]
-        sections: dict[str, str] = {
-            "challenge": study.get("challenge", ""),
-            "approach": study.get("approach", ""),
-            "results": study.get("results", ""),
-            "retrospective": study.get("retrospective", ""),
+# Same settings (and defaults) as src/core/config.py, which can't be loaded without API_KEY
+EMBEDDINGS = EmbeddingClient(
+    EmbeddingSpec(
+        os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-2"),
+        int(os.getenv("EMBEDDING_DIMENSION", "768")),
+    ),
+    GEMINI_API_KEY,
+    os.getenv("GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com"),
+)
+
+
+def ingest(db: Client, collection_name: str, chunks: list[Chunk]) -> list[list[float]]:
+    """Embeds and upserts `chunks`, then records the index fingerprint; returns the embeddings."""
+    collection = db.collection(collection_name)
+    embeddings = []
+    for doc_id, doc in chunks:
+        embedding = EMBEDDINGS.embed_sync(doc["content"])
+        collection.document(doc_id).set({**doc, "embedding": Vector(embedding)})
+        embeddings.append(embedding)
+        time.sleep(0.1)  # stay within free-tier rate limits
+
+    spec = EMBEDDINGS.spec
+    db.collection(INDEX_COLLECTION).document(collection_name).set(
+        {
+            "fingerprint": spec.fingerprint,
+            "model": spec.model,
+            "dimension": spec.dimension,
+            "documents": len(chunks),
+            "updated_at": SERVER_TIMESTAMP,
         }
-        for i, decision in enumerate(study.get("decisions", [])):
-            sections[f"decision_{i}"] = decision
-
-        for section, text in sections.items():
-            if not text:
-                continue
-            doc_id = f"{slug}__{section}"
-            content = f"{title} — {section}: {text}"
-            embedding = embed_text(content)
-            collection.document(doc_id).set(
-                {
-                    "slug": slug,
-                    "section": section,
-                    "title": title,
-                    "content": content,
-                    "embedding": Vector(embedding),
-                }
-            )
-            count += 1
-            time.sleep(0.1)  # stay within free-tier rate limits
-
-    logger.info("case_study_embeddings: %d documents upserted", count)
-
-
-def ingest_projects(db: Client) -> None:
-    collection = db.collection("project_embeddings")
-    projects = json.loads((DATA_DIR / "projects.json").read_text())
-
-    for project in projects:
-        slug = project["slug"]
-        tech = ", ".join(project.get("technologies", []))
-        content = f"{project['title']}: {project.get('description', '')} Technologies: {tech}"
-        embedding = embed_text(content)
-        collection.document(slug).set(
-            {
-                "slug": slug,
-                "title": project["title"],
-                "category": project.get("category", ""),
-                "type": project.get("type", ""),
-                "status": project.get("status", ""),
-                "content": content,
-                "embedding": Vector(embedding),
-            }
-        )
-        time.sleep(0.1)
-
-    logger.info("project_embeddings: %d documents upserted", len(projects))
+    )
+    logger.info("%s: %d documents upserted (%s)", collection_name, len(chunks), spec.fingerprint)
+    return embeddings
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Embed data/ chunks into Firestore")
+    parser.add_argument(
+        "--snapshot-dir",
+        default=os.getenv("EMBEDDING_SNAPSHOT_DIR") or "snapshots",
+        help="Where to write the local embedding snapshots (see src/core/snapshot.py)",
+    )
+    parser.add_argument("--snapshot-dtype", choices=DTYPES, default="int8")
+    parser.add_argument("--no-snapshot", action="store_true", help="Only upsert into Firestore")
+    args = parser.parse_args()
+
     db = Client(project=GCP_PROJECT_ID or None)
     logger.info("Connected to Firestore project: %s", GCP_PROJECT_ID or "(default ADC)")
-    ingest_case_studies(db)
-    ingest_projects(db)
+    studies = json.loads((DATA_DIR / "case_studies.json").read_text())
+    projects = json.loads((DATA_DIR / "projects.json").read_text())
+    for collection_name, chunks in (
+        (CASE_STUDY_COLLECTION, case_study_chunks(studies)),
+        (PROJECT_COLLECTION, project_chunks(projects)),
+    ):
+        embeddings = ingest(db, collection_name, chunks)
+        if not args.no_snapshot:
+            directory = write_snapshot(
+                Path(args.snapshot_dir) / collection_name,
+                chunks,
+                embeddings,
+                dtype=args.snapshot_dtype,
+                fingerprint=EMBEDDINGS.spec.fingerprint,
+            )
+            logger.info(
+                "%s: %s snapshot written to %s", collection_name, args.snapshot_dtype, directory
+            )
     logger.info("Ingest complete.")
 
 
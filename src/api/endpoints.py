@@ -1,12 +1,26 @@
+import asyncio
 import json
 import logging
+import time
 from datetime import datetime, timezone
-from typing import AsyncGenerator
-
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import StreamingResponse
-
-from src.core.database import get_firestore_db
+from typing import Any, AsyncGenerator, Coroutine, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from src.core import (
+    admission,
+    chat_lock,
+    deadline,
+    degradation,
+    metrics,
+    profiler,
+    timing,
+    tool_memo,
+    tracing,
+    turns,
+)
+from src.core.config import get_config
 from src.core.models import (
     ActionData,
     ChatHistoryResponse,
@@ -15,13 +29,27 @@ from src.core.models import (
     ChatStreamRequest,
     Message,
 )
-from src.core.security import rate_limited_api_key, validate_api_key
+from src.core.security import (
+    rate_limited_api_key,
+    validate_api_key,
+    validate_profiler_token,
+)
 from src.core.services import ChatbotService
+from src.core.session_store import MAX_HISTORY, get_session_store
 
 logger = logging.getLogger(__name__)
+config = get_config()
 
 v1_router = APIRouter()
 v2_router = APIRouter()
+metrics_router = APIRouter()
+
+_CANCELLED = metrics.counter(
+    "chat_turns_cancelled_total", "Streaming turns cancelled (client_disconnect/superseded)"
+)
+
+# Running turns and workflow cancellations, referenced until they finish
+_background: set[asyncio.Task] = set()
 
 
 # ── helpers ───────────────────────────────────────────────────────────────────
@@ -32,7 +60,69 @@ def _sse(event: str, data: dict) -> str:
 
 
 def _service(request: Request) -> ChatbotService:
-    return ChatbotService(get_firestore_db(request))
+    return ChatbotService(get_session_store(request))
+
+
+async def _admit() -> admission.Ticket:
+    """Waits for a workflow slot; saturation becomes a 503 with Retry-After."""
+    try:
+        ticket = await admission.controller.acquire()
+    except admission.Saturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)},
+        ) from e
+    timing.add("admission", ticket.waited)
+    return ticket
+
+
+async def _hold_chat(chat_id: Optional[str], request: Request) -> Optional[chat_lock.Hold]:
+    """Serializes turns on an existing chat; a conflict the policy refuses becomes a 409."""
+    if not chat_id:
+        return None
+    try:
+        return await chat_lock.locks.acquire(chat_id, get_session_store(request))
+    except chat_lock.ChatBusy as e:
+        raise HTTPException(
+            status_code=409, detail="Another message in this chat is still being answered"
+        ) from e
+
+
+def _spawn(coro) -> None:
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _traced(name: str, coro: Coroutine[Any, Any, None], **attributes: Any) -> None:
+    """Awaits `coro` under a root span of its own, for tasks that outlive their request."""
+    with tracing.detached_span(name, **attributes):
+        await coro
+
+
+async def _detach_on_disconnect(request: Request, turn: turns.Turn, subscriber: object) -> None:
+    """Stops following the turn as soon as the client is gone."""
+    # The body is already read, so the next ASGI message is `http.disconnect`. A blocking
+    # receive() is used rather than polling request.is_disconnected(), which can drop the
+    # message when it passes through BaseHTTPMiddleware.
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+    turn.unsubscribe(subscriber)
+
+
+def _busy_stream(e: HTTPException) -> StreamingResponse:
+    retry_after = int((e.headers or {})["Retry-After"])
+
+    async def busy() -> AsyncGenerator[str, None]:
+        yield _sse("busy", {"retryAfter": retry_after, "message": e.detail})
+        yield _sse("done", {"chatId": None})
+
+    return StreamingResponse(
+        busy(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Retry-After": str(retry_after)},
+    )
 
 
 # ── v1 (deprecated) ───────────────────────────────────────────────────────────
@@ -47,9 +137,19 @@ def _service(request: Request) -> ChatbotService:
 async def chat_v1(request_data: ChatRequest, request: Request):
     """Synchronous chat endpoint. Deprecated — use POST /api/v2/chat/stream."""
     service = _service(request)
+    hold = await _hold_chat(request_data.chatId, request)
+    try:
+        ticket = await _admit()
+    except BaseException:
+        if hold:
+            hold.release()
+        raise
+    budget = deadline.TurnBudget.for_request(
+        config.turn_deadline_seconds, config.turn_max_steps, config.turn_max_handoffs
+    )
     try:
         chat_id = await service.get_or_create_session(request_data.chatId)
-        result = await service.generate_response(chat_id, request_data.message)
+        result = await service.generate_response(chat_id, request_data.message, budget)
         return ChatResponse(
             chatId=result["chatId"],
             message=result["message"],
@@ -61,6 +161,10 @@ async def chat_v1(request_data: ChatRequest, request: Request):
     except Exception as e:
         logger.error(f"v1 chat error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error") from e
+    finally:
+        ticket.release()
+        if hold:
+            hold.release()
 
 
 @v1_router.get(
@@ -68,7 +172,9 @@ async def chat_v1(request_data: ChatRequest, request: Request):
     response_model=ChatHistoryResponse,
     dependencies=[Depends(validate_api_key)],
 )
-async def get_history_v1(chat_id: str, limit: int = 50, request: Request = None):
+async def get_history_v1(
+    chat_id: str, limit: int = Query(50, ge=1, le=MAX_HISTORY), request: Request = None
+):
     service = _service(request)
     try:
         messages_data = await service.get_history(chat_id, limit)
@@ -118,39 +224,232 @@ async def stats_v1(request: Request):
 
 
 @v2_router.post("/chat/stream", dependencies=[Depends(rate_limited_api_key)])
-async def stream_chat_v2(request_data: ChatStreamRequest, request: Request):
+async def stream_chat_v2(
+    request_data: ChatStreamRequest,
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None, max_length=128),
+    last_event_id: Optional[str] = Header(default=None),
+):
     """
     Streaming chat endpoint. Returns Server-Sent Events.
     Events: meta | thinking | handoff | tool_call | tool_result | citation | action | token | done
+    The `done` event carries a `timings` breakdown (admission wait, session, history, first
+    token, tools, handoffs, persistence). When the instance is saturated the request is
+    rejected with 503 + Retry-After, or with a `busy` event if ADMISSION_BUSY_MODE=sse.
+    A second message on a chat whose previous turn is still running waits for it, gets a
+    409, or cancels it, depending on CHAT_TURN_POLICY.
+
+    A turn is bounded by TURN_DEADLINE_SECONDS and TURN_MAX_STEPS / TURN_MAX_HANDOFFS
+    (the body's `deadlineSeconds` / `maxSteps` can only tighten them). When a limit is hit
+    the partial answer is kept and `done` carries `"reason": "deadline_exceeded"` (or
+    `step_budget_exceeded` / `handoff_budget_exceeded`).
+
+    Every event has an `id`. Re-sending the request with `Last-Event-ID` and/or the same
+    `Idempotency-Key` attaches to the turn already running (or recently finished) and
+    replays what was missed, without re-running the workflow or re-saving the message.
     """
-    from src.core.agent_orchestrator import get_main_agent_workflow
+    resumed = await _find_turn(request_data, idempotency_key, last_event_id)
+    if resumed is not None:
+        turn, after = resumed
+        return _follow_response(request, turn, after)
+
+    # Reserved before the first await: a retry arriving while this request waits for the
+    # chat or an admission slot, or saves the message, waits for this turn (_find_turn)
+    # instead of starting a second one.
+    turns.registry.reserve(idempotency_key)
+    try:
+        hold = await _hold_chat(request_data.chatId, request)
+        try:
+            ticket = await _admit()
+        except HTTPException as e:
+            if hold:
+                hold.release()
+            if e.status_code == 503 and config.admission_busy_mode == "sse":
+                return _busy_stream(e)
+            raise
+
+        service = _service(request)
+        try:
+            chat_id = await service.get_or_create_session(request_data.chatId)
+            history_data = await service.get_history(chat_id)
+            llm_history = service.build_llm_history(history_data)
+
+            await service.save_message(chat_id, "user", request_data.message)
+        except BaseException:
+            ticket.release()
+            if hold:
+                hold.release()
+            raise
+
+        turn = turns.registry.start(chat_id, request_data.message, idempotency_key)
+    finally:
+        # Never started (busy, conflict, error): let a retry with the same key try again.
+        turns.registry.release(idempotency_key)
+    if hold:
+        hold.turn = turn
+    # The turn runs detached from this response so a dropped connection can be resumed;
+    # the admission slot and the chat hold are held by the run itself. It is traced as its
+    # own root (linked to this request): its spans can end after the request's span.
+    budget = deadline.TurnBudget.for_request(
+        config.turn_deadline_seconds,
+        config.turn_max_steps,
+        config.turn_max_handoffs,
+        requested_seconds=request_data.deadlineSeconds,
+        requested_steps=request_data.maxSteps,
+    )
+    _spawn(
+        _traced(
+            "chat.turn",
+            _run_turn(turn, service, llm_history, ticket, hold, budget),
+            **{"chat.id": turn.chat_id, "turn.id": turn.id},
+        )
+    )
+    return _follow_response(request, turn, 0)
 
-    service = _service(request)
-    chat_id = await service.get_or_create_session(request_data.chatId)
-    history_data = await service.get_history(chat_id)
-    llm_history = service.build_llm_history(history_data)
 
-    await service.save_message(chat_id, "user", request_data.message)
+async def _find_turn(
+    request_data: ChatStreamRequest, idempotency_key: Optional[str], last_event_id: Optional[str]
+) -> Optional[Tuple[turns.Turn, int]]:
+    """
+    The existing turn a retried request refers to, and the last event id it has seen. A
+    request whose Idempotency-Key is reserved by one that hasn't started its turn yet waits
+    for it, then attaches to that turn, or finds none if the first request gave up.
+    """
+    parsed = turns.parse_event_id(last_event_id)
+    if parsed is not None:
+        turn = turns.registry.get(parsed[0])
+        if turn is not None and turn.message == request_data.message:
+            turns.registry.resumed("last_event_id")
+            return turn, parsed[1]
+    while idempotency_key:
+        pending = turns.registry.pending(idempotency_key)
+        if pending is not None:
+            await pending.wait()
+            continue
+        turn = turns.registry.by_key(idempotency_key)
+        if turn is not None:
+            if turn.message != request_data.message or request_data.chatId not in (
+                None,
+                turn.chat_id,
+            ):
+                raise HTTPException(
+                    status_code=422, detail="Idempotency-Key was already used for another message"
+                )
+            turns.registry.resumed("idempotency_key")
+            return turn, 0
+        break
+    return None
+
+
+def _follow_response(request: Request, turn: turns.Turn, after: int) -> StreamingResponse:
+    async def follow() -> AsyncGenerator[str, None]:
+        subscriber = turn.subscribe()
+        watcher = asyncio.create_task(_detach_on_disconnect(request, turn, subscriber))
+        try:
+            async for chunk in turn.follow(subscriber, after):
+                yield chunk
+        finally:
+            watcher.cancel()
 
-    async def event_generator() -> AsyncGenerator[str, None]:
-        yield _sse("meta", {"chatId": chat_id, "agent": "router_agent"})
+    return StreamingResponse(
+        follow(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        agent_workflow = get_main_agent_workflow()
-        handler = agent_workflow.run(user_msg=request_data.message, chat_history=llm_history)
+
+async def _answer_from_cache(turn: turns.Turn, service: ChatbotService) -> dict:
+    """cached_only tier: replays a cached answer to the same question, or a short notice."""
+    cached = degradation.answers.get(turn.message)
+    text = cached["text"] if cached else degradation.DEGRADED_ANSWER
+    for citation in cached["citations"] if cached else []:
+        turn.emit("citation", citation)
+    if cached and cached["action"]:
+        turn.emit("action", cached["action"])
+    turn.emit("token", {"text": text})
+    await service.save_message(turn.chat_id, "assistant", text, agent="answer_cache")
+    return {"chatId": turn.chat_id, "reason": "degraded", "cached": cached is not None}
+
+
+async def _run_turn(
+    turn: turns.Turn,
+    service: ChatbotService,
+    llm_history: list,
+    ticket: admission.Ticket,
+    hold: Optional[chat_lock.Hold] = None,
+    budget: Optional[deadline.TurnBudget] = None,
+) -> None:
+    """Runs the agent workflow for one turn, writing its SSE events into the turn buffer."""
+    from llama_index.core.agent.workflow import AgentInput, AgentOutput
+
+    from src.core.agent_orchestrator import ToolArtifacts, get_main_agent_workflow
+
+    timer = timing.current()
+    chat_id = turn.chat_id
+    budget = budget or deadline.TurnBudget(0, 0, 0)
+    try:
+        tier = degradation.controller.tier()
+        root_agent = "router_agent"
+        if tier >= degradation.NO_ROUTER:
+            root_agent = degradation.route_by_keywords(turn.message)
+        turn.emit("meta", {"chatId": chat_id, "agent": root_agent, "tier": degradation.TIERS[tier]})
+        if tier == degradation.CACHED_ONLY:
+            replayed = await _answer_from_cache(turn, service)
+            if timer:
+                replayed["timings"] = timer.to_dict(timer.finish())
+            turn.finish(replayed)
+            return
+
+        started = time.perf_counter()
+        agent_workflow = get_main_agent_workflow(tier, root_agent)
+        # Both before run(), so the workflow's tasks inherit the deadline and the tool memo
+        budget.start(root_agent)
+        tool_memo.start(chat_id)
+        handler = agent_workflow.run(user_msg=turn.message, chat_history=llm_history)
+        turn.on_abandon = lambda: _spawn(handler.cancel_run())
+        if turn.abandoned:
+            turn.on_abandon()
 
         response_parts: list[str] = []
-        current_agent: str = "router_agent"
+        citations: list[dict] = []
+        action: Optional[dict] = None
+        current_agent: str = root_agent
         step_buffer: str = ""  # LLM output for current step (Answer: detection)
         in_answer_mode: bool = False
         answer_buffer: str = ""  # Text accumulated after Answer: (loop detection)
         answer_complete: bool = False  # True once the first answer ends
+        # Function-calling agents stream only answer text (tool calls arrive structured),
+        # so none of the ReAct marker scanning below applies.
+        plain_text = config.agent_mode == "function"
+        step_started: Optional[float] = None  # LLM step timing, per agent
 
         try:
-            async for event in handler.stream_events():
+            async for event in budget.within(handler.stream_events()):
+                if isinstance(event, AgentInput):
+                    if budget.step(event.current_agent_name):
+                        break
+                    step_started = time.perf_counter()
+                elif isinstance(event, AgentOutput) and step_started is not None:
+                    if timer:
+                        timer.llm_step(event.current_agent_name, time.perf_counter() - step_started)
+                    step_started = None
+
+                # ── citations / actions published by the tool wrapper ──────
+                if isinstance(event, ToolArtifacts):
+                    for citation in event.citations:
+                        turn.emit("citation", citation)
+                    citations.extend(event.citations)
+                    if event.action:
+                        turn.emit("action", event.action)
+                        action = event.action
+                    continue
+
                 # ── detect agent change (handoff) ──────────────────────────
                 event_agent = getattr(event, "current_agent_name", None)
                 if event_agent and event_agent != current_agent:
-                    yield _sse("handoff", {"from": current_agent, "to": event_agent})
+                    turn.emit("handoff", {"from": current_agent, "to": event_agent})
+                    if timer:
+                        timer.handoff(event_agent)
                     current_agent = event_agent
                     step_buffer = ""
                     in_answer_mode = False
@@ -163,6 +462,13 @@ async def stream_chat_v2(request_data: ChatStreamRequest, request: Request):
                     if current_agent == "router_agent":
                         continue
 
+                    if plain_text:
+                        response_parts.append(delta)
+                        if timer:
+                            timer.mark("first_token")
+                        turn.emit("token", {"text": delta})
+                        continue
+
                     if answer_complete:
                         continue  # Suppress post-answer looping
 
@@ -178,12 +484,14 @@ async def stream_chat_v2(request_data: ChatStreamRequest, request: Request):
                             safe = candidate[len(answer_buffer) : cut]
                             if safe:
                                 response_parts.append(safe)
-                                yield _sse("token", {"text": safe})
+                                turn.emit("token", {"text": safe})
                             answer_complete = True
                         else:
                             answer_buffer += delta
                             response_parts.append(delta)
-                            yield _sse("token", {"text": delta})
+                            if timer:
+                                timer.mark("first_token")
+                            turn.emit("token", {"text": delta})
                     else:
                         step_buffer += delta
                         if "Answer:" in step_buffer:
@@ -193,11 +501,14 @@ async def stream_chat_v2(request_data: ChatStreamRequest, request: Request):
                             if tail:
                                 answer_buffer = tail
                                 response_parts.append(tail)
-                                yield _sse("token", {"text": tail})
+                                if timer:
+                                    timer.mark("first_token")
+                                turn.emit("token", {"text": tail})
                     continue
 
                 # ── tool call (list of ToolSelection) ──────────────────────
-                tool_calls = getattr(event, "tool_calls", None)
+                # Taken from AgentOutput only: function-calling stream chunks repeat them.
+                tool_calls = event.tool_calls if isinstance(event, AgentOutput) else None
                 if tool_calls and not delta:
                     step_buffer = ""
                     in_answer_mode = False
@@ -209,8 +520,8 @@ async def stream_chat_v2(request_data: ChatStreamRequest, request: Request):
                             # Agent transition already emitted as handoff SSE above
                             continue
                         kwargs = getattr(tc, "tool_kwargs", {})
-                        yield _sse("thinking", {"agent": current_agent, "step": f"calling {name}"})
-                        yield _sse("tool_call", {"tool": name, "input": kwargs})
+                        turn.emit("thinking", {"agent": current_agent, "step": f"calling {name}"})
+                        turn.emit("tool_call", {"tool": name, "input": kwargs})
                     continue
 
                 # ── tool result ────────────────────────────────────────────
@@ -220,38 +531,64 @@ async def stream_chat_v2(request_data: ChatStreamRequest, request: Request):
                     in_answer_mode = False
                     answer_buffer = ""
                     answer_complete = False
-                    tool_call_obj = getattr(event, "tool_call", None)
-                    tool_name = getattr(tool_call_obj, "tool_name", "unknown")
-
-                    # Extract citations and actions embedded in the tool output
-                    try:
-                        raw = getattr(tool_output, "content", tool_output)
-                        output_data = json.loads(raw) if isinstance(raw, str) else raw
-                        if isinstance(output_data, dict):
-                            for citation in output_data.get("_citations", []):
-                                yield _sse("citation", citation)
-                            action = output_data.get("_action")
-                            if action:
-                                yield _sse("action", action)
-                    except Exception:
-                        pass
-
-                    yield _sse("tool_result", {"tool": tool_name, "result_summary": "done"})
+                    tool_name = getattr(event, "tool_name", "unknown")
 
-        except Exception as e:
-            logger.error(f"Streaming error for {chat_id}: {e}", exc_info=True)
+                    turn.emit("tool_result", {"tool": tool_name, "result_summary": "done"})
 
+        except Exception as e:
+            if degradation.is_rate_limit(e):
+                degradation.controller.record_rate_limit()
+            if not turn.abandoned:
+                logger.error(f"Streaming error for {chat_id}: {e}", exc_info=True)
+                tracing.mark_error(e)
+
+        done: dict = {"chatId": chat_id}
+        if budget.exceeded and not turn.abandoned:
+            # Out of time or steps: stop the run, keep what was streamed so far.
+            _spawn(handler.cancel_run())
+            logger.warning(
+                f"Turn on {chat_id} stopped ({budget.exceeded}) after {budget.steps} steps, "
+                f"{budget.handoffs} handoffs"
+            )
+            if not response_parts:
+                response_parts.append(deadline.OUT_OF_BUDGET_ANSWER)
+                turn.emit("token", {"text": deadline.OUT_OF_BUDGET_ANSWER})
+            done["truncated"] = True
+            done["reason"] = budget.exceeded
         final_text = "".join(response_parts)
+        if turn.abandoned:
+            # No client followed the turn for the grace period, or a newer message on the
+            # same chat superseded it (CHAT_TURN_POLICY=cancel): the run was cancelled.
+            _CANCELLED.inc(reason=turn.cancel_reason)
+            logger.info(f"Turn on {chat_id} cancelled mid-answer ({turn.cancel_reason})")
+            done["truncated"] = True
+            done["reason"] = turn.cancel_reason
         if final_text:
-            await service.save_message(chat_id, "assistant", final_text, agent=current_agent)
-
-        yield _sse("done", {"chatId": chat_id})
-
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
-    )
+            await service.save_message(
+                chat_id,
+                "assistant",
+                final_text,
+                agent=current_agent,
+                truncated=bool(done.get("truncated")),
+            )
+
+        if not done.get("truncated"):
+            degradation.controller.observe_turn(time.perf_counter() - started)
+            if final_text and not llm_history:
+                degradation.answers.put(turn.message, final_text, citations, action)
+
+        tracing.set_attributes(**{"chat.id": chat_id, "chat.agent": current_agent})
+        if timer:
+            done["timings"] = timer.to_dict(timer.finish())
+        turn.finish(done)
+    except Exception as e:
+        logger.error(f"Turn {turn.id} failed for {chat_id}: {e}", exc_info=True)
+    finally:
+        if not turn.done:
+            turn.finish({"chatId": chat_id})
+        ticket.release()
+        if hold:
+            hold.release()
 
 
 @v2_router.get(
@@ -259,12 +596,19 @@ async def stream_chat_v2(request_data: ChatStreamRequest, request: Request):
     response_model=ChatHistoryResponse,
     dependencies=[Depends(validate_api_key)],
 )
-async def get_history_v2(chat_id: str, limit: int = 50, request: Request = None):
+async def get_history_v2(
+    chat_id: str, limit: int = Query(50, ge=1, le=MAX_HISTORY), request: Request = None
+):
     service = _service(request)
     try:
         messages_data = await service.get_history(chat_id, limit)
         messages = [
-            Message(role=msg["role"], content=msg["content"], timestamp=msg.get("timestamp"))
+            Message(
+                role=msg["role"],
+                content=msg["content"],
+                timestamp=msg.get("timestamp"),
+                truncated=bool(msg.get("truncated")),
+            )
             for msg in messages_data
         ]
         return ChatHistoryResponse(chatId=chat_id, messages=messages, totalMessages=len(messages))
@@ -295,11 +639,43 @@ async def health_v2():
 @v2_router.get("/stats", dependencies=[Depends(validate_api_key)])
 async def stats_v2(request: Request):
     service = _service(request)
+    startup = getattr(request.app.state, "startup", None)
     try:
         return {
             "totalSessions": await service.count_sessions(),
+            "metrics": metrics.REGISTRY.snapshot(),
+            "startup": startup.report() if startup else None,
             "timestamp": datetime.now(timezone.utc),
         }
     except Exception as e:
         logger.error(f"Stats v2 error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error retrieving statistics") from e
+
+
+@v2_router.get("/debug/profiles", dependencies=[Depends(validate_profiler_token)])
+async def list_profiles():
+    """Most recent request profiles, newest first."""
+    return {"profiles": profiler.profiles.list(), "running": profiler.profiles.running}
+
+
+@v2_router.get("/debug/profiles/{profile_id}", dependencies=[Depends(validate_profiler_token)])
+async def get_profile(profile_id: str):
+    """A recorded profile in speedscope format — open it at https://www.speedscope.app."""
+    profile = profiler.profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return JSONResponse(
+        profile.to_speedscope(),
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+    )
+
+
+# ── metrics ───────────────────────────────────────────────────────────────────
+
+
+@metrics_router.get("/metrics", dependencies=[Depends(validate_api_key)])
+async def prometheus_metrics():
+    """Prometheus text exposition of the in-process metrics registry."""
+    return PlainTextResponse(
+        metrics.REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
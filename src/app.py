@@ -1,42 +1,65 @@
-import logging
-import os
-from contextlib import asynccontextmanager
+import time
 
-from dotenv import load_dotenv
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+_import_started = time.perf_counter()
+
+import logging  # noqa: E402
+from contextlib import asynccontextmanager  # noqa: E402
+
+from dotenv import load_dotenv  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
 
 load_dotenv()
 
-from src.api.endpoints import v1_router, v2_router  # noqa: E402
-from src.core.config import Config  # noqa: E402
+from src.api.endpoints import metrics_router, v1_router, v2_router  # noqa: E402
+from src.core.config import get_config  # noqa: E402
 from src.core.database import close_firestore, init_firestore  # noqa: E402
+from src.core.http_client import close_http_client  # noqa: E402
+from src.core.profiler import ProfilerMiddleware  # noqa: E402
 from src.core.security import SecurityHeadersMiddleware  # noqa: E402
+from src.core.session_store import create_session_store  # noqa: E402
+from src.core.startup import FirstRequestTimer, StartupTimer, prewarm  # noqa: E402
+from src.core.timing import ServerTimingMiddleware  # noqa: E402
+from src.core.tool_executor import shutdown_tool_executor  # noqa: E402
+from src.core.tracing import TracingMiddleware, setup_tracing, shutdown_tracing  # noqa: E402
 from src.utils.logger import setup_logging  # noqa: E402
 
 setup_logging()
 logger = logging.getLogger(__name__)
-config = Config()
-
+config = get_config()
 
-try:
-    if not os.getenv("PHOENIX_CLIENT_HEADERS"):
-        raise ValueError("PHOENIX_CLIENT_HEADERS not set")
-    from openinference.instrumentation.llama_index import LlamaIndexInstrumentor
-    from phoenix.otel import register
-
-    tracer_provider = register(project_name="lorenzobot")
-    LlamaIndexInstrumentor().instrument(tracer_provider=tracer_provider)
-    logger.info("Phoenix OpenTelemetry instrumentation registered")
-except Exception as e:
-    logger.warning(f"Phoenix instrumentation skipped: {e}")
+startup_timer = StartupTimer(started_at=_import_started)
+startup_timer.mark("imports", _import_started)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    app.state.db = await init_firestore()
+    with startup_timer.phase("instrumentation"):
+        setup_tracing()
+    app.state.db = None
+    if config.session_backend == "firestore":
+        started = time.perf_counter()
+        app.state.db = await init_firestore()
+        startup_timer.mark("firestore_client", started)
+    app.state.sessions = create_session_store(app.state.db)
+    if config.embedding_index_check != "off":
+        started = time.perf_counter()
+        from src.core.vector_store import verify_embedding_indexes
+
+        # Not a best-effort phase: an index built for another embedding model or dimension
+        # aborts startup (EmbeddingIndexMismatch).
+        await verify_embedding_indexes()
+        startup_timer.mark("embedding_indexes", started)
+    if config.startup_mode == "prewarm":
+        await prewarm(startup_timer, app.state.sessions)
+    startup_timer.mark_ready()
+    app.state.startup = startup_timer
     yield
+    await app.state.sessions.close()
     await close_firestore()
+    await close_http_client()
+    shutdown_tool_executor()
+    shutdown_tracing()
 
 
 app = FastAPI(
@@ -54,6 +77,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(SecurityHeadersMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(FirstRequestTimer, timer=startup_timer)
+app.add_middleware(ProfilerMiddleware)
+# Outermost, so the root span covers every other middleware and the whole SSE body
+app.add_middleware(TracingMiddleware)
 
 app.include_router(v1_router, prefix="/api/v1", tags=["v1 (deprecated)"])
 app.include_router(v2_router, prefix="/api/v2", tags=["v2"])
+app.include_router(metrics_router, tags=["ops"])
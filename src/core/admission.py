@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Optional
+
+from src.core import metrics
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# Concurrency governor in front of agent workflow runs. At most `max_in_flight` runs
+# execute at once; up to `max_queue` more wait (FIFO) for at most `queue_timeout` seconds.
+# Anything beyond that is shed immediately with a Retry-After estimate, so admitted
+# requests keep predictable latency instead of every stream slowing down together.
+
+_IN_FLIGHT = metrics.gauge("admission_in_flight", "Agent workflow runs currently executing")
+_QUEUE_DEPTH = metrics.gauge("admission_queue_depth", "Requests waiting for a workflow slot")
+_WAIT = metrics.histogram("admission_wait_seconds", "Time admitted requests spent queued")
+_REJECTED = metrics.counter(
+    "admission_rejected_total", "Requests shed by admission control (queue_full/timeout)"
+)
+
+
+class Saturated(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Instance saturated ({reason}), retry after {retry_after}s")
+
+
+class Ticket:
+    """An admitted run; release() is idempotent so every exit path can call it."""
+
+    def __init__(self, controller: "AdmissionController", waited: float):
+        self.waited = waited
+        self._controller = controller
+        self._started = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.perf_counter() - self._started)
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_run = 5.0  # EWMA of run duration, seeds the Retry-After estimate
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        slots = max(self.max_in_flight, 1)
+        return max(1, math.ceil(self._avg_run * (len(self._waiters) + 1) / slots))
+
+    async def acquire(self) -> Ticket:
+        """Waits for a run slot; raises Saturated when the queue is full or the wait times out."""
+        if self.max_in_flight <= 0:  # admission control disabled
+            return Ticket(self, 0.0)
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self._admit()
+            return Ticket(self, 0.0)
+        if len(self._waiters) >= self.max_queue:
+            raise self._saturated("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        _QUEUE_DEPTH.set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot in the same tick the wait ended: hand it on.
+                self._release(None)
+            else:
+                waiter.cancel()
+                self._remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._saturated("timeout") from e
+        waited = time.perf_counter() - start
+        _WAIT.observe(waited)
+        return Ticket(self, waited)
+
+    def _admit(self) -> None:
+        self.in_flight += 1
+        _IN_FLIGHT.set(self.in_flight)
+        _WAIT.observe(0.0)
+
+    def _saturated(self, reason: str) -> Saturated:
+        _REJECTED.inc(reason=reason)
+        logger.warning(
+            f"Shedding request ({reason}): {self.in_flight} running, {len(self._waiters)} queued"
+        )
+        return Saturated(reason, self.retry_after())
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        _QUEUE_DEPTH.set(len(self._waiters))
+
+    def _release(self, run_seconds: Optional[float]) -> None:
+        if self.max_in_flight <= 0:
+            return
+        if run_seconds is not None:
+            self._avg_run = 0.8 * self._avg_run + 0.2 * run_seconds
+        # Hand the slot straight to the oldest live waiter, keeping in_flight unchanged.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                _QUEUE_DEPTH.set(len(self._waiters))
+                return
+        _QUEUE_DEPTH.set(0)
+        self.in_flight -= 1
+        _IN_FLIGHT.set(self.in_flight)
+
+
+controller = AdmissionController(
+    config.max_in_flight_runs, config.admission_queue_size, config.admission_queue_timeout
+)
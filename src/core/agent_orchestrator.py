@@ -1,11 +1,20 @@
+import inspect
 import logging
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 from google.genai import types as genai_types
-from llama_index.core.agent.workflow import AgentWorkflow, ReActAgent
+from llama_index.core.agent.workflow import AgentWorkflow, FunctionAgent, ReActAgent
 from llama_index.core.tools import FunctionTool
+from llama_index.core.workflow import Context, Event
 from llama_index.llms.google_genai import GoogleGenAI
+from pydantic import Field
 
-from src.core.config import Config
+from src.core import degradation, timing, tool_memo, tracing
+from src.core.config import get_config
+from src.core.tool_executor import ToolKind, classify, run_tool
+from src.core.tool_memo import MemoScope
+from src.core.tool_output import shape_tool_output, split_artifacts
 from src.core.tools import (
     # AvailabilityAgent
     check_availability,
@@ -21,6 +30,7 @@ from src.core.tools import (
     get_stack_info,
     recommend_similar_project,
     search_case_study_content,
+    search_profile,
     # ProjectAgent
     search_projects,
     trigger_contact_action,
@@ -28,41 +38,161 @@ from src.core.tools import (
 from src.utils.utils import load_prompt
 
 logger = logging.getLogger(__name__)
-config = Config()
+config = get_config()
 
 
-def _llm() -> GoogleGenAI:
+class LLMProfile(NamedTuple):
+    model: str
+    temperature: float
+    max_tokens: int
+    thinking_budget: Optional[int] = None
+
+
+def llm_profile(agent: str) -> LLMProfile:
+    """The agent's AGENT_LLM_PROFILES entry over the "default" entry over GEMINI_*."""
+    overrides = {
+        **config.agent_llm_profiles.get("default", {}),
+        **config.agent_llm_profiles.get(agent, {}),
+    }
+    return LLMProfile(
+        model=overrides.get("model", config.gemini_model),
+        temperature=float(overrides.get("temperature", config.temperature)),
+        max_tokens=int(overrides.get("max_tokens", config.max_tokens)),
+        thinking_budget=overrides.get("thinking_budget"),
+    )
+
+
+def _llm(profile: LLMProfile) -> GoogleGenAI:
     # Disable AFC so LlamaIndex's ReAct loop manages tool-calling iterations.
     # AFC's default limit of 10 remote calls gets exhausted on complex multi-agent queries.
-    _no_afc = genai_types.GenerateContentConfig(
-        automatic_function_calling=genai_types.AutomaticFunctionCallingConfig(disable=True)
+    generation_config = genai_types.GenerateContentConfig(
+        automatic_function_calling=genai_types.AutomaticFunctionCallingConfig(disable=True),
+        thinking_config=(
+            genai_types.ThinkingConfig(thinking_budget=profile.thinking_budget)
+            if profile.thinking_budget is not None
+            else None
+        ),
     )
     return GoogleGenAI(
         api_key=config.gemini_api_key,
-        model=f"models/{config.gemini_model}",
-        temperature=config.temperature,
-        max_tokens=config.max_tokens,
-        generation_config=_no_afc,
+        model=f"models/{profile.model}",
+        temperature=profile.temperature,
+        max_tokens=profile.max_tokens,
+        generation_config=generation_config,
+    )
+
+
+class ToolArtifacts(Event):
+    """Citations and UI actions published by a tool call, streamed next to its ToolCallResult."""
+
+    tool_name: str
+    citations: List[Dict[str, Any]] = Field(default_factory=list)
+    action: Optional[Dict[str, Any]] = None
+
+
+def _tool(
+    fn, name: str, kind: Optional[ToolKind] = None, memo: MemoScope = MemoScope.TURN
+) -> FunctionTool:
+    # The wrapper takes the workflow Context so `_citations` / `_action` go to the event stream
+    # as a ToolArtifacts event, and only the remaining payload (compact JSON + token cap) is
+    # shown to the LLM. The SSE endpoint never has to parse tool output text.
+    # Sync tools are blocking by default (file I/O) and run on the bounded tool pool;
+    # pass kind=ToolKind.CHEAP_SYNC for pure in-memory tools to skip the thread hop.
+    # Repeated calls within the turn are answered from the tool memo; tools whose output is
+    # fixed in code pass memo=MemoScope.SESSION, tools with side effects memo=MemoScope.NONE.
+    tool_kind = classify(fn, kind)
+    sig = inspect.signature(fn)
+
+    async def _execute(kwargs: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        with tracing.span(f"tool.{name}", tool=name, kind=tool_kind.value):
+            result = await run_tool(name, tool_kind, fn, kwargs)
+        timing.record_tool(name, time.perf_counter() - start)
+        return result
+
+    async def _run(ctx: Context, **kwargs):
+        turn_memo = tool_memo.current()
+        if turn_memo is None:
+            result = await _execute(kwargs)
+        else:
+            key = tool_memo.call_key(name, sig, kwargs)
+            result = await turn_memo.call(name, key, memo, lambda: _execute(kwargs))
+        payload, citations, action = split_artifacts(result)
+        if citations or action:
+            ctx.write_event_to_stream(
+                ToolArtifacts(tool_name=name, citations=citations, action=action)
+            )
+        return shape_tool_output(name, payload)
+
+    ctx_param = inspect.Parameter(
+        "ctx", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Context
     )
+    _run.__signature__ = sig.replace(parameters=[ctx_param, *sig.parameters.values()])  # type: ignore[attr-defined]
+    _run.__name__ = fn.__name__
+    _run.__doc__ = fn.__doc__
+
+    return FunctionTool.from_defaults(fn=_run, name=name, description=fn.__doc__)
+
+
+_workflow: Optional[AgentWorkflow] = None
+# Reduced variants for the degradation tiers, keyed by (tier, root agent); built on first use.
+_degraded: Dict[Tuple[int, str], AgentWorkflow] = {}
 
 
-def _tool(fn, name: str) -> FunctionTool:
-    return FunctionTool.from_defaults(fn=fn, name=name, description=fn.__doc__)
+def get_main_agent_workflow(tier: int = 0, root_agent: str = "router_agent") -> AgentWorkflow:
+    """
+    Returns the process-wide AgentWorkflow. Agents keep no per-run state (that lives in the
+    run's Context), so one instance serves concurrent runs and is built once — at startup
+    when STARTUP_MODE=prewarm, otherwise on the first chat request.
 
+    `tier` > 0 returns the reduced workflow for that degradation tier (see
+    src/core/degradation.py), starting at `root_agent`.
+    """
+    global _workflow
+    if tier == 0 and root_agent == "router_agent":
+        if _workflow is None:
+            _workflow = _build_workflow()
+        return _workflow
+    key = (tier, root_agent)
+    if key not in _degraded:
+        _degraded[key] = _build_workflow(tier, root_agent)
+    return _degraded[key]
 
-def get_main_agent_workflow() -> AgentWorkflow:
-    llm = _llm()
 
-    router = ReActAgent(
+def _agent_class():
+    """ReActAgent or FunctionAgent, per AGENT_MODE. Both stream the events the SSE layer maps."""
+    if config.agent_mode == "react":
+        return ReActAgent
+    if config.agent_mode == "function":
+        return FunctionAgent
+    raise ValueError(f"Unknown AGENT_MODE: {config.agent_mode!r} (expected react or function)")
+
+
+def _build_workflow(tier: int = 0, root_agent: str = "router_agent") -> AgentWorkflow:
+    agent_cls = _agent_class()
+    # Agents with the same resolved profile share one client.
+    llms: Dict[LLMProfile, Any] = {}
+    semantic_tools = tier < degradation.NO_SEMANTIC_SEARCH
+
+    def llm_for(agent: str):
+        profile = llm_profile(agent)
+        if tier >= degradation.SMALL_MODEL:
+            profile = profile._replace(model=config.degraded_model)
+        if profile not in llms:
+            llms[profile] = _llm(profile)
+            logger.info(f"LLM profile for {agent}: {profile}")
+        return llms[profile]
+
+    router = agent_cls(
         name="router_agent",
         description="Routes the user's message to the right specialist agent.",
         system_prompt=load_prompt("router_agent"),
         tools=[],
-        llm=llm,
+        llm=llm_for("router_agent"),
         can_handoff_to=["project_agent", "technical_agent", "availability_agent", "contact_agent"],
     )
 
-    project = ReActAgent(
+    project = agent_cls(
         name="project_agent",
         description="Answers questions about Lorenzo's projects, portfolio, and case studies.",
         system_prompt=load_prompt("project_agent"),
@@ -70,28 +200,35 @@ def get_main_agent_workflow() -> AgentWorkflow:
             _tool(search_projects, "search_projects"),
             _tool(get_project_details, "get_project_details"),
             _tool(get_case_study, "get_case_study"),
-            _tool(search_case_study_content, "search_case_study_content"),
-            _tool(recommend_similar_project, "recommend_similar_project"),
+            *(
+                [
+                    _tool(search_case_study_content, "search_case_study_content"),
+                    _tool(recommend_similar_project, "recommend_similar_project"),
+                ]
+                if semantic_tools
+                else []
+            ),
         ],
-        llm=llm,
+        llm=llm_for("project_agent"),
         can_handoff_to=["router_agent", "technical_agent", "contact_agent"],
     )
 
-    technical = ReActAgent(
+    technical = agent_cls(
         name="technical_agent",
-        description="Answers questions about Lorenzo's technical skills, stack, education, and certifications.",
+        description="Answers questions about Lorenzo's technical skills, stack, education, certifications, and career background.",
         system_prompt=load_prompt("technical_agent"),
         tools=[
             _tool(get_stack_info, "get_stack_info"),
-            _tool(get_core_stack, "get_core_stack"),
+            _tool(get_core_stack, "get_core_stack", ToolKind.CHEAP_SYNC, memo=MemoScope.SESSION),
             _tool(get_certifications, "get_certifications"),
             _tool(get_education, "get_education"),
+            _tool(search_profile, "search_profile"),
         ],
-        llm=llm,
+        llm=llm_for("technical_agent"),
         can_handoff_to=["router_agent", "project_agent", "availability_agent"],
     )
 
-    availability = ReActAgent(
+    availability = agent_cls(
         name="availability_agent",
         description="Checks Lorenzo's availability for meetings and explains how he works.",
         system_prompt=load_prompt("availability_agent"),
@@ -99,25 +236,33 @@ def get_main_agent_workflow() -> AgentWorkflow:
             _tool(check_availability, "check_availability"),
             _tool(get_engagement_model, "get_engagement_model"),
         ],
-        llm=llm,
+        llm=llm_for("availability_agent"),
         can_handoff_to=["router_agent", "contact_agent"],
     )
 
-    contact = ReActAgent(
+    contact = agent_cls(
         name="contact_agent",
         description="Provides Lorenzo's contact information and opens the contact form.",
         system_prompt=load_prompt("contact_agent"),
         tools=[
             _tool(get_contact_info, "get_contact_info"),
-            _tool(trigger_contact_action, "trigger_contact_action"),
+            _tool(
+                trigger_contact_action,
+                "trigger_contact_action",
+                ToolKind.CHEAP_SYNC,
+                memo=MemoScope.NONE,
+            ),
         ],
-        llm=llm,
+        llm=llm_for("contact_agent"),
         can_handoff_to=["router_agent", "availability_agent"],
     )
 
     workflow = AgentWorkflow(
         agents=[router, project, technical, availability, contact],
-        root_agent="router_agent",
+        root_agent=root_agent,
+    )
+    logger.info(
+        f"Multi-agent AgentWorkflow initialized (router + 4 specialists, {config.agent_mode} "
+        f"mode, tier {degradation.TIERS[tier]}, root {root_agent})"
     )
-    logger.info("Multi-agent AgentWorkflow initialized (router + 4 specialists)")
     return workflow
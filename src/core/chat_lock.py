@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import uuid
+from typing import TYPE_CHECKING, Dict, Optional, Set
+
+from src.core import metrics
+from src.core.config import get_config
+
+if TYPE_CHECKING:
+    from src.core.session_store import SessionStore
+    from src.core.turns import Turn
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# Single-flight per chatId: overlapping turns on the same conversation (double submit,
+# several tabs) would each read the same history and interleave their writes. A second
+# turn is queued behind the first, rejected (409) or cancels the first, per
+# CHAT_TURN_POLICY. In-process holds cover one instance; with CHAT_LEASE_SECONDS > 0 the
+# holder also takes a renewable lease stored on the session document, which serializes
+# turns across instances (there a newer turn waits, it can't cancel a remote one).
+
+POLICIES = ("queue", "reject", "cancel")
+
+_CONFLICTS = metrics.counter(
+    "chat_turn_conflicts_total", "Turns that found another turn running on the same chat"
+)
+
+_LEASE_POLL_SECONDS = 0.25
+
+_background: Set[asyncio.Task] = set()
+
+
+class ChatBusy(Exception):
+    def __init__(self, chat_id: str, reason: str):
+        self.chat_id = chat_id
+        self.reason = reason
+        super().__init__(f"Chat {chat_id} busy ({reason})")
+
+
+class Hold:
+    """The right to run a turn on one chat. release() is idempotent."""
+
+    def __init__(self, locks: "ChatLocks", chat_id: str):
+        self.chat_id = chat_id
+        self.owner = uuid.uuid4().hex
+        self.turn: Optional["Turn"] = None
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._locks = locks
+        self._store: Optional["SessionStore"] = None
+        self._renewer: Optional[asyncio.Task] = None
+
+    def release(self) -> None:
+        if self.done.done():
+            return
+        self.done.set_result(None)
+        self._locks._forget(self)
+        if self._renewer is not None:
+            self._renewer.cancel()
+        if self._store is not None:
+            _spawn(self._store.release_lease(self.chat_id, self.owner))
+
+    def release_after(self, previous: Optional["Hold"]) -> None:
+        """
+        Releases once `previous` is done. A hold that gave up waiting (timeout, cancelled)
+        is released this way, so the holds queued behind it still wait for the turn ahead.
+        """
+        if previous is None or previous.done.done():
+            self.release()
+        else:
+            previous.done.add_done_callback(lambda _: self.release())
+
+
+class ChatLocks:
+    def __init__(self, policy: str, queue_timeout: float, lease_seconds: float):
+        if policy not in POLICIES:
+            raise ValueError(f"CHAT_TURN_POLICY must be one of {POLICIES}, got {policy!r}")
+        self.policy = policy
+        self.queue_timeout = queue_timeout
+        self.lease_seconds = lease_seconds
+        self._tails: Dict[str, Hold] = {}  # most recent hold per chat; earlier ones chain
+
+    def busy(self, chat_id: str) -> bool:
+        tail = self._tails.get(chat_id)
+        return tail is not None and not tail.done.done()
+
+    async def acquire(self, chat_id: str, store: Optional["SessionStore"] = None) -> Hold:
+        """Waits for the chat to be free (per policy); raises ChatBusy when it can't be."""
+        previous = self._tails.get(chat_id)
+        if previous is not None and previous.done.done():
+            previous = None
+        if previous is not None:
+            if self.policy == "reject":
+                _CONFLICTS.inc(policy=self.policy, outcome="rejected")
+                raise ChatBusy(chat_id, "in_progress")
+            if self.policy == "cancel" and previous.turn is not None:
+                previous.turn.cancel("superseded")
+                _CONFLICTS.inc(policy=self.policy, outcome="cancelled")
+            else:
+                _CONFLICTS.inc(policy=self.policy, outcome="queued")
+
+        # Become the tail before awaiting anything, so concurrent requests chain in order.
+        hold = Hold(self, chat_id)
+        self._tails[chat_id] = hold
+        try:
+            if previous is not None:
+                await asyncio.wait_for(asyncio.shield(previous.done), self.queue_timeout)
+            if self.lease_seconds > 0 and store is not None:
+                await self._take_lease(hold, store)
+        except TimeoutError as e:
+            hold.release_after(previous)
+            _CONFLICTS.inc(policy=self.policy, outcome="timeout")
+            raise ChatBusy(chat_id, "timeout") from e
+        except BaseException:
+            hold.release_after(previous)
+            raise
+        return hold
+
+    async def _take_lease(self, hold: Hold, store: "SessionStore") -> None:
+        deadline = asyncio.get_running_loop().time() + (
+            0 if self.policy == "reject" else self.queue_timeout
+        )
+        while not await store.acquire_lease(hold.chat_id, hold.owner, self.lease_seconds):
+            if asyncio.get_running_loop().time() >= deadline:
+                _CONFLICTS.inc(policy=self.policy, outcome="leased")
+                raise ChatBusy(hold.chat_id, "leased")
+            await asyncio.sleep(_LEASE_POLL_SECONDS)
+        hold._store = store
+        hold._renewer = asyncio.create_task(self._renew(hold, store))
+
+    async def _renew(self, hold: Hold, store: "SessionStore") -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await store.acquire_lease(hold.chat_id, hold.owner, self.lease_seconds):
+                logger.warning(f"Lost the turn lease on chat {hold.chat_id}")
+                return
+
+    def _forget(self, hold: Hold) -> None:
+        if self._tails.get(hold.chat_id) is hold:
+            del self._tails[hold.chat_id]
+
+
+def _spawn(coro) -> None:
+    task = asyncio.ensure_future(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+locks = ChatLocks(
+    config.chat_turn_policy, config.chat_turn_queue_timeout, config.chat_lease_seconds
+)
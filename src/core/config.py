@@ -1,5 +1,9 @@
+import functools
+import json
 import os
 
+LLM_PROFILE_KEYS = frozenset({"model", "temperature", "max_tokens", "thinking_budget"})
+
 
 class Config:
     def __init__(self):
@@ -13,20 +17,160 @@ class Config:
 
         self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-3.5-flash")
         self.gemini_embedding_model = os.getenv("GEMINI_EMBEDDING_MODEL", "gemini-embedding-2")
+        # Output dimension for documents and queries alike (256, 512 or 768); indexes built
+        # with another model or dimension are refused at startup (EMBEDDING_INDEX_CHECK)
+        self.embedding_dimension = int(os.getenv("EMBEDDING_DIMENSION", "768"))
+        # "all" checks each collection against the backend serving it: its local snapshot, or
+        # else its Firestore metadata (one round trip before ready). "snapshot" skips the
+        # Firestore reads, for offline runs without credentials
+        self.embedding_index_check = os.getenv("EMBEDDING_INDEX_CHECK", "all").lower()
+        self.gemini_api_base_url = os.getenv(
+            "GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com"
+        ).rstrip("/")
         self.temperature = float(os.getenv("GEMINI_TEMPERATURE", "0.7"))
         self.max_tokens = int(os.getenv("GEMINI_MAX_TOKENS", "2048"))
+        # "react": agents emit Thought/Action/Answer text that is parsed; "function": native
+        # tool calling (FunctionAgent), answer text streams as-is
+        self.agent_mode = os.getenv("AGENT_MODE", "react").lower()
+        # Per-agent LLM profiles as JSON, e.g. {"router_agent": {"model": "gemini-3.5-flash-lite",
+        # "temperature": 0, "max_tokens": 256, "thinking_budget": 0}}. A "default" entry applies
+        # to every agent; keys left out fall back to the GEMINI_* settings above.
+        self.agent_llm_profiles = parse_llm_profiles(os.getenv("AGENT_LLM_PROFILES", ""))
         self.max_memory_messages = int(os.getenv("MAX_MEMORY_MESSAGES", "20"))
+        # Hard cap on the (estimated) tokens a single tool result may add to the prompt; 0 disables it
+        self.tool_output_max_tokens = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "1500"))
+        # Worker threads for blocking (file I/O) tools, kept off the event loop
+        self.tool_thread_pool_size = int(os.getenv("TOOL_THREAD_POOL_SIZE", "4"))
+
+        # Case study / project search (see src/core/retrieval.py): "hybrid" (BM25 + vector,
+        # fused with reciprocal rank fusion), "vector" or "lexical". In hybrid mode, queries
+        # of at most RETRIEVAL_LEXICAL_MAX_TERMS terms with a keyword hit skip the embedding.
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+        self.retrieval_lexical_max_terms = int(os.getenv("RETRIEVAL_LEXICAL_MAX_TERMS", "2"))
+        self.retrieval_rrf_k = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+        # Directory of the memory-mapped embedding snapshots scripts/ingest.py writes (see
+        # src/core/snapshot.py). When set, vector search ranks locally instead of querying
+        # Firestore; collections without a snapshot still go to Firestore.
+        self.embedding_snapshot_dir = os.getenv("EMBEDDING_SNAPSHOT_DIR", "")
+        # Vector matches further than this cosine distance (0..2) are dropped; 0 disables
+        self.vector_distance_threshold = float(os.getenv("VECTOR_DISTANCE_THRESHOLD", "0"))
+
+        # Memoization of repeated tool calls (see src/core/tool_memo.py): "turn", "session"
+        # (session-safe tools are also reused across a chat's turns) or "off"
+        self.tool_memo_scope = os.getenv("TOOL_MEMO_SCOPE", "turn").lower()
+        self.tool_memo_session_ttl_seconds = float(
+            os.getenv("TOOL_MEMO_SESSION_TTL_SECONDS", "600")
+        )
+        self.tool_memo_session_max_chats = int(os.getenv("TOOL_MEMO_SESSION_MAX_CHATS", "1000"))
 
         self.rate_limit_requests = int(os.getenv("RATE_LIMIT_REQUESTS", "30"))
         self.rate_limit_window = int(os.getenv("RATE_LIMIT_WINDOW", "60"))
 
         self.gcp_project_id = os.getenv("GCP_PROJECT_ID")
 
+        # Chat session persistence: "firestore", "sqlite" (single VM) or "memory" (dev/tests)
+        self.session_backend = os.getenv("SESSION_BACKEND", "firestore").lower()
+        self.sqlite_path = os.getenv("SQLITE_PATH", "sessions.db")
+
         # Cal.com booking integration
         self.calcom_username = os.getenv("CALCOM_USERNAME")
         self.calcom_api_key = os.getenv("CALCOM_API_KEY")
         self.calcom_event_slug = os.getenv("CALCOM_EVENT_SLUG", "30min")
+        self.calcom_api_base_url = os.getenv("CALCOM_API_BASE_URL", "https://api.cal.com").rstrip(
+            "/"
+        )
+
+        # Resilience for remote dependencies (embedding, Firestore vector queries, Cal.com)
+        self.dependency_timeouts = {
+            "embedding": float(os.getenv("EMBEDDING_TIMEOUT", "8")),
+            "firestore_vector": float(os.getenv("FIRESTORE_VECTOR_TIMEOUT", "8")),
+            "calcom": float(os.getenv("CALCOM_TIMEOUT", "8")),
+        }
+        self.hedged_dependencies = {
+            d.strip() for d in os.getenv("HEDGED_DEPENDENCIES", "").split(",") if d.strip()
+        }
+        self.circuit_failure_threshold = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.circuit_reset_seconds = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+        # Cold start: "lazy" defers all warm-up to the first request, "prewarm" warms the data
+        # catalog, agent workflow, HTTP and Firestore connections in the lifespan hook
+        self.startup_mode = os.getenv("STARTUP_MODE", "lazy")
+        self.prewarm_embedding = os.getenv("PREWARM_EMBEDDING", "false").lower() == "true"
+
+        # OpenTelemetry tracing (needs the `otel` dependency group):
+        # none | console | file | otlp | phoenix. Phoenix stays the default when it is configured.
+        default_exporter = "phoenix" if os.getenv("PHOENIX_CLIENT_HEADERS") else "none"
+        self.trace_exporter = os.getenv("TRACE_EXPORTER", default_exporter).lower()
+        self.trace_file = os.getenv("TRACE_FILE", "traces.jsonl")
+        # Head sampling keeps this fraction of traces; tail sampling adds every errored
+        # trace and every turn slower than TRACE_SLOW_TURN_SECONDS.
+        self.trace_sample_ratio = float(os.getenv("TRACE_SAMPLE_RATIO", "0.1"))
+        self.trace_slow_seconds = float(os.getenv("TRACE_SLOW_TURN_SECONDS", "8"))
+        # Full-fidelity LlamaIndex (LLM, agent step) spans on top of the first-party ones
+        self.trace_llm_spans = (
+            os.getenv("TRACE_LLM_SPANS", str(self.trace_exporter == "phoenix")).lower() == "true"
+        )
+
+        # Admission control for agent workflow runs (0 disables the limit). Requests that
+        # can't get a slot within the queue timeout are shed with 503 + Retry-After, or with
+        # an SSE `busy` event when ADMISSION_BUSY_MODE=sse.
+        self.max_in_flight_runs = int(os.getenv("MAX_IN_FLIGHT_RUNS", "8"))
+        self.admission_queue_size = int(os.getenv("ADMISSION_QUEUE_SIZE", "16"))
+        self.admission_queue_timeout = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+        self.admission_busy_mode = os.getenv("ADMISSION_BUSY_MODE", "http").lower()
+
+        # Resumable SSE: seconds a turn keeps running with no client attached (0 cancels on
+        # disconnect), and how long / how much of finished turns is kept for replay
+        self.stream_resume_grace_seconds = float(os.getenv("STREAM_RESUME_GRACE_SECONDS", "10"))
+        self.turn_buffer_ttl_seconds = float(os.getenv("TURN_BUFFER_TTL_SECONDS", "120"))
+        self.turn_buffer_max_events = int(os.getenv("TURN_BUFFER_MAX_EVENTS", "5000"))
+        self.turn_buffer_max_turns = int(os.getenv("TURN_BUFFER_MAX_TURNS", "500"))
+
+        # End-to-end budget per chat turn (0 = unlimited). Requests can only tighten these.
+        self.turn_deadline_seconds = float(os.getenv("TURN_DEADLINE_SECONDS", "45"))
+        self.turn_max_steps = int(os.getenv("TURN_MAX_STEPS", "12"))
+        self.turn_max_handoffs = int(os.getenv("TURN_MAX_HANDOFFS", "4"))
+
+        # Adaptive degradation (see src/core/degradation.py): "auto", "off", or a tier name to
+        # pin it (full, no_semantic_search, small_model, no_router, cached_only)
+        self.degradation_mode = os.getenv("DEGRADATION_MODE", "auto").lower()
+        self.degrade_rate_limits_per_minute = int(os.getenv("DEGRADE_RATE_LIMITS_PER_MINUTE", "5"))
+        self.degrade_p95_seconds = float(os.getenv("DEGRADE_P95_SECONDS", "20"))
+        self.degrade_recovery_seconds = float(os.getenv("DEGRADE_RECOVERY_SECONDS", "30"))
+        self.degraded_model = os.getenv("DEGRADED_MODEL", "gemini-3.5-flash-lite")
+        self.answer_cache_size = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+
+        # Overlapping turns on one chatId: "queue" (wait for the running one), "reject" (409)
+        # or "cancel" (stop the running one). CHAT_LEASE_SECONDS > 0 also takes a lease on
+        # the session document so turns are serialized across instances.
+        self.chat_turn_policy = os.getenv("CHAT_TURN_POLICY", "queue").lower()
+        self.chat_turn_queue_timeout = float(os.getenv("CHAT_TURN_QUEUE_TIMEOUT_SECONDS", "30"))
+        self.chat_lease_seconds = float(os.getenv("CHAT_LEASE_SECONDS", "0"))
+
+        # Per-request sampling profiler, triggered by `X-Debug-Profile: <PROFILER_TOKEN>`;
+        # disabled while the token is unset
+        self.profiler_token = os.getenv("PROFILER_TOKEN")
+        self.profiler_interval_ms = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+        self.profiler_max_concurrent = int(os.getenv("PROFILER_MAX_CONCURRENT", "1"))
+        self.profiler_keep = int(os.getenv("PROFILER_KEEP", "20"))
 
         self.allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
         self.port = int(os.getenv("PORT", "8080"))
         self.env = os.getenv("ENV", "development")
+
+
+def parse_llm_profiles(raw: str) -> dict:
+    profiles = json.loads(raw) if raw.strip() else {}
+    if not isinstance(profiles, dict):
+        raise ValueError("AGENT_LLM_PROFILES must be a JSON object keyed by agent name")
+    for agent, profile in profiles.items():
+        unknown = set(profile) - LLM_PROFILE_KEYS
+        if unknown:
+            raise ValueError(f"AGENT_LLM_PROFILES[{agent!r}] has unknown keys: {sorted(unknown)}")
+    return profiles
+
+
+@functools.lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Process-wide Config, read from the environment once."""
+    return Config()
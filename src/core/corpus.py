@@ -0,0 +1,178 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+# The retrieval units for case studies and projects. scripts/ingest.py embeds exactly these
+# documents into Firestore and the local lexical index is built from them, so a document
+# id means the same chunk on both sides of a hybrid search.
+# The profile files are split into passages (a bio paragraph, a job bullet, one degree, a
+# certification, a skill group) for the lexical-only profile index.
+
+CASE_STUDY_COLLECTION = "case_study_embeddings"
+PROJECT_COLLECTION = "project_embeddings"
+PROFILE_COLLECTION = "profile"
+
+# (data file, is_json), in the order profile_passages() takes their contents
+PROFILE_SOURCES = (
+    ("bio.txt", False),
+    ("work_experience.json", True),
+    ("education.json", True),
+    ("certifications.json", True),
+    ("skills.json", True),
+)
+# A term in a passage's heading (role, degree, certification, skill group) counts double.
+PROFILE_FIELD_BOOSTS = {"heading": 2.0, "text": 1.0}
+
+Chunk = Tuple[str, Dict[str, Any]]  # (document id, document without the embedding)
+
+# Fields stored next to each document's embedding; vector queries fetch only these.
+DOCUMENT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    CASE_STUDY_COLLECTION: ("slug", "section", "title", "content"),
+    PROJECT_COLLECTION: ("slug", "title", "category", "type", "status", "content"),
+}
+# Metadata a search can be restricted to by equality, per collection
+FILTER_FIELDS: Dict[str, Tuple[str, ...]] = {
+    CASE_STUDY_COLLECTION: (),
+    PROJECT_COLLECTION: ("category", "type", "status"),
+}
+
+
+def chunk_id(doc: Dict[str, Any]) -> str:
+    """The document id ingest gives a chunk, rebuilt from its fields (vector hits carry none)."""
+    section = doc.get("section")
+    return f"{doc['slug']}__{section}" if section else doc["slug"]
+
+
+def case_study_chunks(studies: Iterable[Dict[str, Any]]) -> List[Chunk]:
+    """One chunk per non-empty section (challenge, approach, results, retrospective, decisions)."""
+    chunks = []
+    for study in studies:
+        slug = study["slug"]
+        title = study["title"]
+        sections: Dict[str, str] = {
+            "challenge": study.get("challenge", ""),
+            "approach": study.get("approach", ""),
+            "results": study.get("results", ""),
+            "retrospective": study.get("retrospective", ""),
+        }
+        for i, decision in enumerate(study.get("decisions", [])):
+            sections[f"decision_{i}"] = decision
+
+        for section, text in sections.items():
+            if not text:
+                continue
+            chunks.append(
+                (
+                    f"{slug}__{section}",
+                    {
+                        "slug": slug,
+                        "section": section,
+                        "title": title,
+                        "content": f"{title} — {section}: {text}",
+                    },
+                )
+            )
+    return chunks
+
+
+def project_chunks(projects: Iterable[Dict[str, Any]]) -> List[Chunk]:
+    """One chunk per project: title, description and technologies."""
+    chunks = []
+    for project in projects:
+        tech = ", ".join(project.get("technologies", []))
+        chunks.append(
+            (
+                project["slug"],
+                {
+                    "slug": project["slug"],
+                    "title": project["title"],
+                    "category": project.get("category", ""),
+                    "type": project.get("type", ""),
+                    "status": project.get("status", ""),
+                    "content": f"{project['title']}: {project.get('description', '')} Technologies: {tech}",
+                },
+            )
+        )
+    return chunks
+
+
+def _passage(
+    kind: str, slug: str, label: str, heading: str, text: str, source: str
+) -> Dict[str, Any]:
+    return {
+        "source": source,
+        "kind": kind,
+        "slug": slug,
+        "label": label,
+        "heading": heading,
+        "text": text,
+    }
+
+
+def profile_passages(
+    bio: str,
+    work: List[Dict[str, Any]],
+    education: List[Dict[str, Any]],
+    certifications: List[Dict[str, Any]],
+    skills: Dict[str, Any],
+) -> List[Chunk]:
+    """Passages of the profile files, each with the citation (kind/slug/label) it backs."""
+    passages: List[Chunk] = []
+    for i, paragraph in enumerate(p.strip() for p in bio.split("\n\n")):
+        if paragraph:
+            passages.append((f"bio-{i}", _passage("profile", "bio", "Bio", "", paragraph, "bio")))
+
+    for i, job in enumerate(work):
+        heading = f"{job['title']} — {job['company']}"
+        summary = f"{job.get('location', '')}, {job.get('period', '')} ({job.get('type', '')})"
+        entries = [summary, *job.get("description", [])]
+        for j, text in enumerate(entries):
+            passages.append(
+                (f"work-{i}-{j}", _passage("profile", f"work-{i}", heading, heading, text, "work"))
+            )
+
+    for i, school in enumerate(education):
+        heading = f"{school['degree']} — {school['institution']}"
+        details = [
+            f"{school.get('period', '')} ({school.get('status', '')})",
+            f"Grade: {school['grade']}" if school.get("grade") else "",
+            "Focus: " + "; ".join(school.get("focus", [])),
+            school.get("notes", ""),
+        ]
+        text = ". ".join(d for d in details if d)
+        passages.append(
+            (
+                f"education-{i}",
+                _passage("profile", f"education-{i}", heading, heading, text, "education"),
+            )
+        )
+
+    for i, cert in enumerate(certifications):
+        # Same slugs as get_certifications, so both tools cite a certification identically
+        passages.append(
+            (
+                f"cert-{i}",
+                _passage(
+                    "certification",
+                    f"cert-{i}",
+                    cert["name"],
+                    cert["name"],
+                    str(cert.get("year", "")),
+                    "certifications",
+                ),
+            )
+        )
+
+    for group, value in skills.items():
+        levels = value.items() if isinstance(value, dict) else [("", value)]
+        name = group.replace("_", " ")
+        for level, items in levels:
+            heading = f"{name} ({level})" if level else name
+            slug = f"skills-{group.replace('_', '-')}"
+            passages.append(
+                (
+                    f"{slug}-{level}" if level else slug,
+                    _passage(
+                        "profile", slug, f"Skills: {name}", heading, ", ".join(items), "skills"
+                    ),
+                )
+            )
+    return passages
@@ -4,10 +4,10 @@ from typing import Optional
 from fastapi import Request
 from google.cloud.firestore import AsyncClient
 
-from src.core.config import Config
+from src.core.config import get_config
 
 logger = logging.getLogger(__name__)
-config = Config()
+config = get_config()
 
 _firestore_client: Optional[AsyncClient] = None
 
@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+from typing import AsyncIterator, Optional, TypeVar
+
+from src.core import metrics
+
+T = TypeVar("T")
+
+# End-to-end budget for one chat turn: a deadline plus caps on agent steps (LLM calls) and
+# handoffs. The deadline is kept in a contextvar (event-loop time) that tasks spawned by
+# the workflow inherit, so remote dependency calls shrink their own timeouts to what is
+# left of the turn instead of each spending a full timeout. When any limit is hit the
+# turn stops streaming, the workflow run is cancelled and `done` carries the reason.
+
+DEADLINE_EXCEEDED = "deadline_exceeded"
+STEP_BUDGET_EXCEEDED = "step_budget_exceeded"
+HANDOFF_BUDGET_EXCEEDED = "handoff_budget_exceeded"
+
+# Answer given when a turn runs out of budget before any answer text was produced
+OUT_OF_BUDGET_ANSWER = (
+    "Sorry, I couldn't finish looking into that in time. Could you try again, "
+    "or ask a narrower question?"
+)
+
+_EXCEEDED = metrics.counter(
+    "chat_turn_budget_exceeded_total", "Turns stopped by their deadline or step/handoff budget"
+)
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "turn_deadline", default=None
+)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current turn's deadline; None outside a bounded turn."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+def without_deadline() -> contextvars.Context:
+    """A copy of the current context without the turn deadline, for work shared by turns."""
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return context
+
+
+def clamp(timeout: float) -> float:
+    """`timeout`, shortened to the time left in the current turn (never below 0)."""
+    left = remaining()
+    return timeout if left is None else max(0.0, min(timeout, left))
+
+
+def _limit(configured: float, requested: Optional[float]) -> float:
+    # A request may tighten a limit but not lift it; 0 means unlimited.
+    if requested is None:
+        return configured
+    return min(configured, requested) if configured > 0 else requested
+
+
+class TurnBudget:
+    def __init__(self, seconds: float, max_steps: int, max_handoffs: int):
+        self.seconds = seconds
+        self.max_steps = max_steps
+        self.max_handoffs = max_handoffs
+        self.steps = 0
+        self.handoffs = 0
+        self.exceeded: Optional[str] = None
+        self.deadline: Optional[float] = None
+        self._agent = "router_agent"
+
+    @classmethod
+    def for_request(
+        cls,
+        seconds: float,
+        max_steps: int,
+        max_handoffs: int,
+        requested_seconds: Optional[float] = None,
+        requested_steps: Optional[int] = None,
+    ) -> "TurnBudget":
+        return cls(
+            _limit(seconds, requested_seconds),
+            int(_limit(max_steps, requested_steps)),
+            max_handoffs,
+        )
+
+    def start(self, first_agent: str = "router_agent") -> None:
+        """Starts the clock and publishes the deadline to this task's context."""
+        self._agent = first_agent
+        if self.seconds > 0:
+            self.deadline = asyncio.get_running_loop().time() + self.seconds
+            _deadline.set(self.deadline)
+
+    def step(self, agent: str) -> bool:
+        """Counts an agent step about to call the LLM; True when it would exceed the budget."""
+        if agent != self._agent:
+            self._agent = agent
+            self.handoffs += 1
+            if self.max_handoffs > 0 and self.handoffs > self.max_handoffs:
+                return self._exceed(HANDOFF_BUDGET_EXCEEDED)
+        self.steps += 1
+        if self.max_steps > 0 and self.steps > self.max_steps:
+            return self._exceed(STEP_BUDGET_EXCEEDED)
+        return False
+
+    def _exceed(self, reason: str) -> bool:
+        if self.exceeded is None:
+            self.exceeded = reason
+            _EXCEEDED.inc(reason=reason)
+        return True
+
+    async def within(self, events: AsyncIterator[T]) -> AsyncIterator[T]:
+        """Relays `events` until they end or the deadline passes."""
+        iterator = events.__aiter__()
+        while True:
+            try:
+                async with asyncio.timeout_at(self.deadline):
+                    event = await anext(iterator)
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                self._exceed(DEADLINE_EXCEEDED)
+                return
+            yield event
@@ -0,0 +1,192 @@
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from src.core import admission, metrics
+from src.core.config import get_config
+from src.core.resilience import LatencyWindow
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# Load shedding by quality instead of by refusal. Three live signals are turned into a
+# pressure ratio (1.0 = at the configured limit):
+#   - workflow runs in flight + queued, over MAX_IN_FLIGHT_RUNS
+#   - Gemini 429s in the last minute, over DEGRADE_RATE_LIMITS_PER_MINUTE
+#   - p95 latency of the turns that finished in the last 5 minutes, over DEGRADE_P95_SECONDS
+# and the highest one picks a tier. Each tier keeps the cuts of the previous ones:
+#   1 no_semantic_search  project agent uses the static tools only (no embedding/vector calls)
+#   2 small_model         every agent runs on DEGRADED_MODEL
+#   3 no_router           the turn starts at a keyword-picked specialist, skipping a step
+#   4 cached_only         only answers cached from earlier turns are served
+# Tiers go up as soon as pressure rises and come down one at a time, after pressure has
+# stayed below the current tier for DEGRADE_RECOVERY_SECONDS.
+
+TIERS = ("full", "no_semantic_search", "small_model", "no_router", "cached_only")
+FULL, NO_SEMANTIC_SEARCH, SMALL_MODEL, NO_ROUTER, CACHED_ONLY = range(len(TIERS))
+
+# Answer given in the cached_only tier when there is no cached answer
+DEGRADED_ANSWER = (
+    "I'm handling a lot of conversations right now, so I can only give quick answers. "
+    "Please ask again in a minute for a full one."
+)
+
+# Pressure at which each tier (index) starts.
+_THRESHOLDS = (0.0, 1.0, 1.5, 2.0, 3.0)
+
+_TIER = metrics.gauge("degradation_tier", "Current degradation tier (0 = full service)")
+_TRANSITIONS = metrics.counter("degradation_transitions_total", "Degradation tier changes")
+_CACHED = metrics.counter("degraded_answers_total", "cached_only turns by outcome (hit/miss)")
+
+_RATE_LIMIT_WINDOW = 60.0
+# Turn latencies age out too: in cached_only no full turn runs, so nothing would refresh them.
+_LATENCY_WINDOW = 300.0
+
+
+def is_rate_limit(exc: BaseException) -> bool:
+    """True for Gemini quota errors (HTTP 429 / RESOURCE_EXHAUSTED), however wrapped."""
+    seen = set()
+    current: Optional[BaseException] = exc
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if 429 in (getattr(current, "code", None), getattr(current, "status_code", None)):
+            return True
+        if "RESOURCE_EXHAUSTED" in str(current):
+            return True
+        current = current.__cause__ or current.__context__
+    return False
+
+
+class DegradationController:
+    def __init__(
+        self,
+        mode: str,
+        rate_limits_per_minute: int,
+        p95_seconds: float,
+        recovery_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.mode = mode
+        self.rate_limits_per_minute = rate_limits_per_minute
+        self.p95_seconds = p95_seconds
+        self.recovery_seconds = recovery_seconds
+        self._clock = clock
+        self._rate_limits: Deque[float] = deque()
+        self._latencies = LatencyWindow(
+            size=100, min_samples=10, max_age=_LATENCY_WINDOW, clock=clock
+        )
+        self._tier = FULL
+        self._calm_since: Optional[float] = None
+
+    def record_rate_limit(self) -> None:
+        self._rate_limits.append(self._clock())
+
+    def observe_turn(self, seconds: float) -> None:
+        self._latencies.add(seconds)
+
+    def pressure(self) -> Dict[str, float]:
+        now = self._clock()
+        while self._rate_limits and now - self._rate_limits[0] > _RATE_LIMIT_WINDOW:
+            self._rate_limits.popleft()
+        governor = admission.controller
+        signals = {"load": 0.0, "rate_limits": 0.0, "latency": 0.0}
+        if governor.max_in_flight > 0:
+            signals["load"] = (governor.in_flight + governor.queue_depth) / governor.max_in_flight
+        if self.rate_limits_per_minute > 0:
+            signals["rate_limits"] = len(self._rate_limits) / self.rate_limits_per_minute
+        p95 = self._latencies.percentile(0.95)
+        if p95 is not None and self.p95_seconds > 0:
+            signals["latency"] = p95 / self.p95_seconds
+        return signals
+
+    def tier(self) -> int:
+        """The tier for a turn starting now (re-evaluated on every call)."""
+        if self.mode == "off":
+            return FULL
+        if self.mode in TIERS:  # pinned by the operator
+            return self._set(TIERS.index(self.mode))
+
+        pressure = max(self.pressure().values())
+        target = max(i for i, threshold in enumerate(_THRESHOLDS) if pressure >= threshold)
+        now = self._clock()
+        if target >= self._tier:
+            self._calm_since = None
+            return self._set(target)
+        if self._calm_since is None:
+            self._calm_since = now
+        elif now - self._calm_since >= self.recovery_seconds:
+            self._calm_since = now
+            return self._set(self._tier - 1)
+        return self._tier
+
+    def _set(self, tier: int) -> int:
+        if tier != self._tier:
+            logger.warning(f"Degradation tier {TIERS[self._tier]} -> {TIERS[tier]}")
+            _TRANSITIONS.inc(to=TIERS[tier])
+            self._tier = tier
+        _TIER.set(tier)
+        return tier
+
+
+controller = DegradationController(
+    config.degradation_mode,
+    config.degrade_rate_limits_per_minute,
+    config.degrade_p95_seconds,
+    config.degrade_recovery_seconds,
+)
+
+
+# ── routing without the router (no_router tier) ───────────────────────────────
+
+_ROUTES = (
+    ("contact_agent", re.compile(r"\b(contact|e-?mail|reach|hire|linkedin|phone)\b", re.I)),
+    ("availability_agent", re.compile(r"\b(availab\w*|free|meeting|call|book|schedul\w*)\b", re.I)),
+    (
+        "technical_agent",
+        re.compile(
+            r"\b(stack|skills?|tech\w*|languages?|certif\w*|educat\w*|degree|career|background)\b",
+            re.I,
+        ),
+    ),
+)
+
+
+def route_by_keywords(message: str) -> str:
+    """Specialist for a message by keyword, defaulting to the project agent."""
+    return next((agent for agent, pattern in _ROUTES if pattern.search(message)), "project_agent")
+
+
+# ── cached answers (cached_only tier) ─────────────────────────────────────────
+
+
+def _key(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+class AnswerCache:
+    """Latest full answer per first-turn question, with its citations and action."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._answers: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def put(
+        self, message: str, text: str, citations: List[Dict[str, Any]], action: Optional[dict]
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        key = _key(message)
+        self._answers[key] = {"text": text, "citations": citations, "action": action}
+        self._answers.move_to_end(key)
+        while len(self._answers) > self.max_entries:
+            self._answers.popitem(last=False)
+
+    def get(self, message: str) -> Optional[Dict[str, Any]]:
+        answer = self._answers.get(_key(message))
+        _CACHED.inc(outcome="hit" if answer else "miss")
+        return answer
+
+
+answers = AnswerCache(config.answer_cache_size)
@@ -0,0 +1,101 @@
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# The one client for the Gemini embedContent endpoint, used by scripts/ingest.py for documents
+# and by vector_store.embed_text for queries, so both sides of a search ask for the same model
+# and output dimension and get vectors normalised the same way. Gemini embeddings are
+# Matryoshka-trained: a smaller outputDimensionality keeps the leading components, which are
+# then no longer unit length, hence the L2 normalisation of every vector.
+# Each index (a Firestore collection's metadata document, a local snapshot) records the
+# fingerprint of the spec it was built with; the app refuses to start against a different one.
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+DIMENSIONS = (256, 512, 768)
+# One document per vector collection: {fingerprint, model, dimension, documents, updated_at}
+INDEX_COLLECTION = "embedding_indexes"
+
+
+class EmbeddingIndexMismatch(RuntimeError):
+    """An index was built with another embedding model or dimension than the app queries with."""
+
+
+@dataclass(frozen=True)
+class EmbeddingSpec:
+    model: str
+    dimension: int = 768
+
+    def __post_init__(self) -> None:
+        if self.dimension not in DIMENSIONS:
+            raise ValueError(
+                f"EMBEDDING_DIMENSION must be one of {DIMENSIONS}, got {self.dimension}"
+            )
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.model}/{self.dimension}/l2"
+
+
+def l2_normalize(values: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def check_fingerprint(index: str, stored: Optional[str], spec: EmbeddingSpec) -> None:
+    """Raises EmbeddingIndexMismatch when `stored` differs; a missing one is only logged."""
+    if stored is None:
+        logger.warning(f"{index} has no embedding fingerprint; re-run scripts/ingest.py")
+    elif stored != spec.fingerprint:
+        raise EmbeddingIndexMismatch(
+            f"{index} was built with {stored} but queries use {spec.fingerprint}: re-run "
+            f"scripts/ingest.py or set GEMINI_EMBEDDING_MODEL / EMBEDDING_DIMENSION to match"
+        )
+
+
+class EmbeddingClient:
+    """Builds embedContent requests for `spec` and turns responses into unit vectors."""
+
+    def __init__(
+        self, spec: EmbeddingSpec, api_key: Optional[str], base_url: str = DEFAULT_BASE_URL
+    ):
+        self.spec = spec
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, text: str) -> Tuple[str, Dict[str, Any]]:
+        """(url, keyword arguments for httpx's post)"""
+        model = self.spec.model
+        return f"{self.base_url}/v1beta/models/{model}:embedContent", {
+            "params": {"key": self.api_key},
+            "json": {
+                "model": f"models/{model}",
+                "content": {"parts": [{"text": text}]},
+                "outputDimensionality": self.spec.dimension,
+            },
+        }
+
+    def parse(self, body: Dict[str, Any]) -> List[float]:
+        values = body["embedding"]["values"]
+        if len(values) != self.spec.dimension:
+            raise ValueError(
+                f"{self.spec.model} returned {len(values)} dimensions, "
+                f"expected {self.spec.dimension}"
+            )
+        return l2_normalize(values)
+
+    def embed_sync(self, text: str, timeout: float = 15.0) -> List[float]:
+        url, kwargs = self.request(text)
+        resp = httpx.post(url, timeout=timeout, **kwargs)
+        resp.raise_for_status()
+        return self.parse(resp.json())
+
+    async def embed(self, http: httpx.AsyncClient, text: str, timeout: float) -> List[float]:
+        url, kwargs = self.request(text)
+        resp = await http.post(url, timeout=timeout, **kwargs)
+        resp.raise_for_status()
+        return self.parse(resp.json())
@@ -0,0 +1,158 @@
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from src.core.corpus import (
+    CASE_STUDY_COLLECTION,
+    PROFILE_COLLECTION,
+    PROFILE_FIELD_BOOSTS,
+    PROFILE_SOURCES,
+    PROJECT_COLLECTION,
+    Chunk,
+    case_study_chunks,
+    profile_passages,
+    project_chunks,
+)
+from src.utils.utils import _read_data_file
+
+logger = logging.getLogger(__name__)
+
+# In-process BM25 over the same chunks scripts/ingest.py embeds. Exact terms ("Airflow",
+# "Bedrock", "ChromaDB") are matched without an embedding round trip, and the index keeps
+# search working while the embedding API or the Firestore vector index is unavailable.
+# A third, lexical-only index covers the profile files (bio, work experience, education,
+# certifications, skills) at paragraph/bullet granularity, with headings boosted.
+# Each corpus is at most a few hundred chunks, so an index is rebuilt whenever one of its
+# data files changes.
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from has have he his how i in is it its "
+    "lorenzo me of on or that the this to was what when where which who why with you".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric terms without stopwords; a trailing plural 's' is dropped."""
+    terms = []
+    for term in _TOKEN.findall(text.lower()):
+        if term in _STOPWORDS:
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+CONTENT_ONLY: Mapping[str, float] = {"content": 1.0}
+
+
+class BM25Index:
+    """
+    Okapi BM25 over (id, document) chunks. `fields` maps document fields to boosts: term
+    frequencies and lengths are summed across fields with those weights (BM25F-style), so
+    a match in a heading weighs more than one in body text.
+    """
+
+    def __init__(
+        self,
+        chunks: Sequence[Chunk],
+        fields: Mapping[str, float] = CONTENT_ONLY,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.k1 = k1
+        self.b = b
+        self._docs = list(chunks)
+        self._freqs: List[Dict[str, float]] = []
+        for _, doc in self._docs:
+            freqs: Dict[str, float] = {}
+            for name, boost in fields.items():
+                for term, count in Counter(tokenize(str(doc.get(name) or ""))).items():
+                    freqs[term] = freqs.get(term, 0.0) + boost * count
+            self._freqs.append(freqs)
+        self._lengths = [sum(freqs.values()) for freqs in self._freqs]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        postings: Dict[str, List[int]] = {}
+        for i, freqs in enumerate(self._freqs):
+            for term in freqs:
+                postings.setdefault(term, []).append(i)
+        self._postings = postings
+        n = len(self._docs)
+        self._idf = {
+            term: math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, ids in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def search(
+        self, query: str, n_results: int = 3, filters: Optional[Mapping[str, Any]] = None
+    ) -> List[Tuple[str, Dict[str, Any], float]]:
+        """
+        Top `n_results` (id, document copy, score) with a positive score, best first, among
+        the documents whose fields equal `filters`.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i in self._postings[term]:
+                if filters and any(self._docs[i][1].get(f) != v for f, v in filters.items()):
+                    continue
+                tf = self._freqs[i][term]
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / self._avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        return [(self._docs[i][0], dict(self._docs[i][1]), score) for i, score in best]
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[Tuple[str, Dict[str, Any]]]], k: int = 60
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Merges ranked (id, document) lists by summing 1 / (k + rank) per id. Needs no score
+    calibration between BM25 and cosine distance; the first list wins ties and duplicates.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, (doc_id, doc) in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (k + rank)
+            docs.setdefault(doc_id, doc)
+    ordered = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    return [(doc_id, docs[doc_id]) for doc_id in ordered]
+
+
+# collection → ((data file, is_json) pairs, chunk builder over their contents, field boosts)
+_SOURCES: Dict[str, Tuple[Tuple[Tuple[str, bool], ...], Any, Mapping[str, float]]] = {
+    CASE_STUDY_COLLECTION: ((("case_studies.json", True),), case_study_chunks, CONTENT_ONLY),
+    PROJECT_COLLECTION: ((("projects.json", True),), project_chunks, CONTENT_ONLY),
+    PROFILE_COLLECTION: (PROFILE_SOURCES, profile_passages, PROFILE_FIELD_BOOSTS),
+}
+# collection → (data objects the index was built from, index); _read_data_file returns a
+# new object when a file's mtime changes, which is what triggers a rebuild.
+_indexes: Dict[str, Tuple[Tuple[Any, ...], BM25Index]] = {}
+
+
+def get_index(collection_name: str) -> Optional[BM25Index]:
+    """The BM25 index for a collection; None when its source data can't be read."""
+    source = _SOURCES.get(collection_name)
+    if source is None:
+        return None
+    files, build, fields = source
+    data = tuple(_read_data_file(name, is_json=is_json) for name, is_json in files)
+    # _read_data_file reports failures as a message string instead of the parsed JSON
+    if any(is_json and isinstance(d, str) for (_, is_json), d in zip(files, data, strict=True)):
+        return None
+    cached = _indexes.get(collection_name)
+    if cached is not None and all(a is b for a, b in zip(cached[0], data, strict=True)):
+        return cached[1]
+    index = BM25Index(build(*data), fields)
+    _indexes[collection_name] = (data, index)
+    logger.info(f"BM25 index for {collection_name}: {len(index)} chunks")
+    return index
@@ -8,6 +8,8 @@ class Message(BaseModel):
     role: str = Field(..., pattern=r"^(user|assistant|system)$")
     content: str = Field(..., min_length=1, max_length=4000)
     timestamp: Optional[datetime] = None
+    # The answer was cut short because the client disconnected mid-stream
+    truncated: bool = False
 
     @field_validator("content")
     def validate_content(cls, v):
@@ -57,6 +59,9 @@ class ChatHistoryResponse(BaseModel):
 class ChatStreamRequest(BaseModel):
     chatId: Optional[str] = None
     message: str = Field(..., min_length=1, max_length=4000)
+    # Optional tighter limits for this turn (capped by TURN_DEADLINE_SECONDS / TURN_MAX_STEPS)
+    deadlineSeconds: Optional[float] = Field(default=None, gt=0, le=600)
+    maxSteps: Optional[int] = Field(default=None, ge=1, le=100)
 
     @field_validator("message")
     def validate_message(cls, v):
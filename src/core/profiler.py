@@ -0,0 +1,213 @@
+import asyncio
+import contextvars
+import hmac
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from types import FrameType
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core import metrics
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# Opt-in sampling profiler for single chat requests. A request carrying
+# `X-Debug-Profile: <PROFILER_TOKEN>` gets a sampler thread that snapshots the event-loop
+# thread's stack every PROFILER_INTERVAL_MS, keeping only the samples taken while one of
+# that request's tasks was running (tasks inherit the contextvar below, so the workflow's
+# agent tasks count too). The result is kept in memory as a speedscope profile
+# (https://www.speedscope.app) and fetched through GET /api/v2/debug/profiles/{id}.
+# At most PROFILER_MAX_CONCURRENT requests are profiled at once; others run unprofiled.
+
+PROFILE_HEADER = "x-debug-profile"
+PROFILED_PATHS = frozenset({"/api/v2/chat/stream", "/api/v1/chat"})
+
+_PROFILES = metrics.counter(
+    "profiled_requests_total", "Profiling requests by outcome (recorded/busy/denied)"
+)
+
+_active: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+
+_FrameKey = Tuple[str, str, int]
+
+
+def token_matches(value: Optional[str]) -> bool:
+    if not config.profiler_token or not value:
+        return False
+    return hmac.compare_digest(value.encode(), config.profiler_token.encode())
+
+
+class Profile:
+    """Samples of the loop thread's stack, attributed to one request."""
+
+    def __init__(self, path: str, loop: asyncio.AbstractEventLoop, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.interval = interval
+        self.created_at = time.time()
+        self.duration = 0.0
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+        self._frames: Dict[_FrameKey, int] = {}
+        self._samples: List[List[int]] = []
+        self._weights: List[float] = []
+        self._other = 0  # samples where the loop was busy with another request (or idle)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _sample(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self._loop_thread)
+            task = asyncio.current_task(self._loop)
+            context = task.get_context() if task is not None else None  # type: ignore[attr-defined]
+            if frame is None or context is None or context.get(_active) is not self:
+                self._other += 1
+            else:
+                self._samples.append(self._stack(frame))
+                self._weights.append(now - last)
+            last = now
+
+    def _stack(self, frame: Optional[FrameType]) -> List[int]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_qualname, code.co_filename, code.co_firstlineno)
+            index = self._frames.get(key)
+            if index is None:
+                index = self._frames[key] = len(self._frames)
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()  # speedscope wants root → leaf
+        return stack
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "path": self.path,
+            "created_at": self.created_at,
+            "duration_ms": round(self.duration * 1000, 1),
+            "samples": len(self._samples),
+            "other_samples": self._other,
+        }
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        frames = [{"name": n, "file": f, "line": line} for n, f, line in self._frames]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.path} {self.id}",
+            "exporter": "lorenzobot-profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": f"{self.path} (event loop, this request only)",
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": round(sum(self._weights), 6),
+                    "samples": self._samples,
+                    "weights": [round(w, 6) for w in self._weights],
+                }
+            ],
+        }
+
+
+class ProfileStore:
+    """Last `keep` finished profiles, plus the count of in-flight ones for the hard cap."""
+
+    def __init__(self, keep: int, max_concurrent: int):
+        self.keep = keep
+        self.max_concurrent = max_concurrent
+        self.running = 0
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+
+    def try_acquire(self) -> bool:
+        # Only touched from the event loop thread, so a plain counter is enough.
+        if self.running >= self.max_concurrent:
+            return False
+        self.running += 1
+        return True
+
+    def release(self, profile: Profile) -> None:
+        self.running -= 1
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.keep:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [p.summary() for p in reversed(self._profiles.values())]
+
+
+profiles = ProfileStore(config.profiler_keep, config.profiler_max_concurrent)
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware that profiles chat requests carrying a valid debug header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") not in PROFILED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        value = next((v for k, v in scope.get("headers", []) if k == PROFILE_HEADER.encode()), None)
+        if value is None:
+            await self.app(scope, receive, send)
+            return
+        if not token_matches(value.decode("latin-1")):
+            _PROFILES.inc(outcome="denied")
+            await self.app(scope, receive, send)
+            return
+        if not profiles.try_acquire():
+            _PROFILES.inc(outcome="busy")
+            await self.app(scope, receive, _with_header(send, b"busy"))
+            return
+
+        profile = Profile(
+            scope["path"], asyncio.get_running_loop(), config.profiler_interval_ms / 1000
+        )
+        token = _active.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, _with_header(send, profile.id.encode()))
+        finally:
+            _active.reset(token)
+            profile.stop()
+            profiles.release(profile)
+            _PROFILES.inc(outcome="recorded")
+            logger.info(
+                f"Profile {profile.id} recorded for {profile.path}: "
+                f"{len(profile._samples)} samples in {profile.duration:.2f}s"
+            )
+
+
+def _with_header(send, value: bytes):
+    async def send_with_header(message):
+        if message["type"] == "http.response.start":
+            headers = [*message.get("headers", []), (b"x-profile-id", value)]
+            message = {**message, "headers": headers}
+        await send(message)
+
+    return send_with_header
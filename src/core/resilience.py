@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import httpx
+from google.api_core.exceptions import GoogleAPICallError, RetryError
+
+from src.core import deadline, metrics, tracing
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+T = TypeVar("T")
+
+# Names of the remote dependencies the agent tools talk to.
+EMBEDDING = "embedding"
+FIRESTORE_VECTOR = "firestore_vector"
+CALCOM = "calcom"
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+_CALLS = metrics.counter(
+    "dependency_calls_total",
+    "Remote dependency calls by outcome (success/error/client_error/timeout/deadline/rejected)",
+)
+_HEDGES = metrics.counter("dependency_hedges_total", "Hedged second attempts fired")
+_LATENCY = metrics.histogram("dependency_latency_seconds", "Successful dependency call latency")
+_BREAKER_STATE = metrics.gauge(
+    "dependency_circuit_state", "Circuit breaker state (0=closed, 1=half-open, 2=open)"
+)
+
+
+class DependencyUnavailable(Exception):
+    """A dependency call was not attempted or did not finish within its budget."""
+
+    def __init__(self, dependency: str, reason: str):
+        super().__init__(f"{dependency} unavailable: {reason}")
+        self.dependency = dependency
+        self.reason = reason
+
+
+class CircuitOpenError(DependencyUnavailable):
+    def __init__(self, dependency: str):
+        super().__init__(dependency, "circuit open")
+
+
+class DependencyTimeout(DependencyUnavailable):
+    def __init__(self, dependency: str, timeout: float):
+        super().__init__(dependency, f"timed out after {timeout:.1f}s")
+
+
+def is_dependency_failure(exc: Exception) -> bool:
+    """
+    Whether `exc` counts against the dependency's circuit breaker: 5xx responses and
+    transport errors do. Client errors (a 4xx such as a bad API key or input, Firestore's
+    FailedPrecondition for a missing index) say nothing about the dependency's health.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    if isinstance(exc, GoogleAPICallError):
+        return exc.code is None or exc.code >= 500
+    return isinstance(exc, (httpx.TransportError, OSError, RetryError))
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. Opens after `failure_threshold` consecutive failures,
+    lets a single trial call through after `reset_timeout` seconds, and closes on success.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        # Read at scrape time, so the gauge turns half-open once reset_timeout has passed
+        # even while no call comes in.
+        _BREAKER_STATE.set_function(lambda: _STATE_VALUES[self.state], dependency=name)
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info(f"Circuit for {self.name} closed")
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_in_flight or (
+            self._opened_at is None and self._failures >= self.failure_threshold
+        ):
+            logger.warning(f"Circuit for {self.name} opened after {self._failures} failure(s)")
+            self._opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """Frees the half-open trial slot without judging the dependency (e.g. caller cancelled)."""
+        self._trial_in_flight = False
+
+
+class LatencyWindow:
+    """
+    Rolling window of recent successful latencies, used to pick the hedge delay. With
+    `max_age`, samples older than that many seconds no longer count.
+    """
+
+    def __init__(
+        self,
+        size: int = 200,
+        min_samples: int = 20,
+        max_age: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._samples: deque[Tuple[float, float]] = deque(maxlen=size)  # (added at, seconds)
+        self.min_samples = min_samples
+        self.max_age = max_age
+        self._clock = clock
+
+    def add(self, seconds: float) -> None:
+        self._samples.append((self._clock(), seconds))
+
+    def percentile(self, q: float) -> Optional[float]:
+        if self.max_age is not None:
+            now = self._clock()
+            while self._samples and now - self._samples[0][0] > self.max_age:
+                self._samples.popleft()
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(seconds for _, seconds in self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Dependency:
+    """
+    Wraps calls to one remote dependency with a timeout budget, optional hedging at the
+    observed p95 latency, and a circuit breaker. Callers pass a zero-arg coroutine factory
+    so a hedged second attempt can be issued.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        hedge: bool = False,
+        breaker: Optional[CircuitBreaker] = None,
+        latencies: Optional[LatencyWindow] = None,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.hedge = hedge
+        self.breaker = breaker or CircuitBreaker(
+            name, config.circuit_failure_threshold, config.circuit_reset_seconds
+        )
+        self.latencies = latencies or LatencyWindow()
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p95 = self.latencies.percentile(0.95)
+        if p95 is None or p95 >= self.timeout:
+            return None
+        return p95
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        with tracing.span(f"dependency.{self.name}", dependency=self.name):
+            return await self._call(fn)
+
+    async def _call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        if not self.breaker.allow():
+            _CALLS.inc(dependency=self.name, outcome="rejected")
+            raise CircuitOpenError(self.name)
+
+        # Never outlive the chat turn's deadline; running out of turn time isn't the
+        # dependency's fault, so that case gets no breaker verdict.
+        timeout = deadline.clamp(self.timeout)
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout):
+                result = await self._attempt(fn)
+        except TimeoutError as e:
+            if timeout < self.timeout:
+                self.breaker.release_trial()
+                _CALLS.inc(dependency=self.name, outcome="deadline")
+            else:
+                self.breaker.record_failure()
+                _CALLS.inc(dependency=self.name, outcome="timeout")
+            raise DependencyTimeout(self.name, timeout) from e
+        except asyncio.CancelledError:
+            # Caller gave up — not the dependency's fault, so no breaker verdict.
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            if is_dependency_failure(e):
+                self.breaker.record_failure()
+                _CALLS.inc(dependency=self.name, outcome="error")
+            else:
+                # The dependency answered; the request was wrong. Passed through as-is.
+                self.breaker.release_trial()
+                _CALLS.inc(dependency=self.name, outcome="client_error")
+            raise
+
+        elapsed = time.perf_counter() - start
+        self.breaker.record_success()
+        self.latencies.add(elapsed)
+        _CALLS.inc(dependency=self.name, outcome="success")
+        _LATENCY.observe(elapsed, dependency=self.name)
+        return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]]) -> T:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await fn()
+
+        tasks = [asyncio.ensure_future(fn())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+
+            _HEDGES.inc(dependency=self.name)
+            tasks.append(asyncio.ensure_future(fn()))
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+
+_dependencies: Dict[str, Dependency] = {}
+
+
+def get_dependency(name: str) -> Dependency:
+    """Returns the process-wide resilience wrapper for a named dependency."""
+    dep = _dependencies.get(name)
+    if dep is None:
+        dep = Dependency(
+            name,
+            timeout=config.dependency_timeouts.get(name, 10.0),
+            hedge=name in config.hedged_dependencies,
+        )
+        _dependencies[name] = dep
+    return dep
@@ -0,0 +1,84 @@
+import logging
+from typing import Any, Dict, List, Mapping, Optional
+
+from src.core import lexical, metrics
+from src.core.config import get_config
+from src.core.corpus import chunk_id
+from src.core.resilience import DependencyUnavailable
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# Search over the case study / project chunks, per RETRIEVAL_MODE:
+#   hybrid   BM25 and vector results fused with reciprocal rank fusion. Short keyword
+#            queries ("Airflow", "ChromaDB") that BM25 matches are answered lexically
+#            without the embedding call, and when the embedding API or the vector index is
+#            unavailable the BM25 results are served alone.
+#   vector   embedding + Firestore kNN only (the previous behaviour)
+#   lexical  BM25 only; no remote calls at all
+# Results have the shape of the Firestore documents (no embedding), whichever path served them;
+# vector hits also carry their cosine distance.
+
+MODES = ("hybrid", "vector", "lexical")
+
+_SEARCHES = metrics.counter(
+    "retrieval_searches_total", "Case study / project searches by collection and serving path"
+)
+
+if config.retrieval_mode not in MODES:
+    raise ValueError(f"RETRIEVAL_MODE must be one of {MODES}, got {config.retrieval_mode!r}")
+
+# Each ranking contributes this many candidates to the fusion, per requested result.
+_CANDIDATES_PER_RESULT = 3
+
+
+async def search(
+    collection_name: str,
+    query: str,
+    n_results: int = 3,
+    filters: Optional[Mapping[str, str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Top `n_results` documents of `collection_name` for `query`, restricted to those whose
+    fields equal `filters` (e.g. {"category": "nlp-ml"}) on both the BM25 and vector side.
+    Raises like vector_search (FailedPrecondition / DependencyUnavailable) only when the
+    vector path fails and there is no lexical result to fall back on.
+    """
+    from google.api_core.exceptions import FailedPrecondition
+
+    from src.core.vector_store import vector_search
+
+    mode = config.retrieval_mode
+    index = lexical.get_index(collection_name) if mode != "vector" else None
+    hits = index.search(query, n_results * _CANDIDATES_PER_RESULT, filters) if index else []
+    ranked = [(doc_id, doc) for doc_id, doc, _ in hits]
+
+    if mode == "lexical" or (
+        ranked and len(lexical.tokenize(query)) <= config.retrieval_lexical_max_terms
+    ):
+        _SEARCHES.inc(collection=collection_name, path="lexical")
+        return [doc for _, doc in ranked[:n_results]]
+
+    try:
+        docs = await vector_search(
+            collection_name,
+            query,
+            n_results * _CANDIDATES_PER_RESULT if ranked else n_results,
+            filters=filters,
+        )
+    except (DependencyUnavailable, FailedPrecondition) as e:
+        if not ranked:
+            raise
+        logger.warning(f"Vector search on {collection_name} failed, serving BM25 results: {e}")
+        _SEARCHES.inc(collection=collection_name, path="lexical_fallback")
+        return [doc for _, doc in ranked[:n_results]]
+
+    if not ranked:
+        _SEARCHES.inc(collection=collection_name, path="vector")
+        return docs[:n_results]
+
+    _SEARCHES.inc(collection=collection_name, path="hybrid")
+    fused = lexical.reciprocal_rank_fusion(
+        [[(chunk_id(doc), doc) for doc in docs], ranked], k=config.retrieval_rrf_k
+    )
+    return [doc for _, doc in fused[:n_results]]
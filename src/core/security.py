@@ -2,18 +2,19 @@ import logging
 import os
 import time
 from collections import defaultdict
-from typing import DefaultDict
+from typing import DefaultDict, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 
-from src.core.config import Config
+from src.core.config import get_config
+from src.core.profiler import token_matches
 
 security = HTTPBearer(auto_error=False)
 logger = logging.getLogger(__name__)
-config = Config()
+config = get_config()
 
 # Rate limiting storage
 rate_limit_storage: DefaultDict[str, list[float]] = defaultdict(list)
@@ -100,3 +101,16 @@ async def rate_limited_api_key(validated_key: str = Depends(validate_api_key)):
             detail="Rate limit exceeded. Please wait before sending more messages.",
         )
     # If successful, no return value is strictly needed for this dependency
+
+
+async def validate_profiler_token(
+    _: str = Depends(validate_api_key),
+    x_debug_profile: Optional[str] = Header(default=None),
+):
+    """
+    Dependency for the profile download endpoints: API key plus the profiler token in the
+    X-Debug-Profile header. Answers 404 rather than 401 so the endpoints stay invisible.
+    """
+
+    if not token_matches(x_debug_profile):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
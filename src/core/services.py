@@ -1,49 +1,37 @@
 import logging
+import time
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from google.cloud.firestore import SERVER_TIMESTAMP, AsyncClient, Increment
-from llama_index.core.llms import ChatMessage, MessageRole
-
-from src.core.config import Config
+from src.core import deadline, degradation, timing, tool_memo, tracing
+from src.core.config import get_config
+from src.core.session_store import SessionStore
 from src.core.tools import (
     get_contact_info_tool_function,
     get_projects_tool_function,
     get_skills_tool_function,
 )
 
-logger = logging.getLogger(__name__)
-config = Config()
+if TYPE_CHECKING:
+    from llama_index.core.llms import ChatMessage
 
-_SESSIONS = "chat_sessions"
-_MESSAGES = "messages"
+logger = logging.getLogger(__name__)
+config = get_config()
 
 
 class ChatbotService:
-    def __init__(self, db: AsyncClient):
-        self.db = db
+    def __init__(self, store: SessionStore):
+        self.store = store
 
     # ── session management ────────────────────────────────────────────────────
 
     async def get_or_create_session(self, chat_id: Optional[str]) -> str:
-        if chat_id:
-            doc = await self.db.collection(_SESSIONS).document(chat_id).get()
-            if doc.exists:
+        with timing.phase("session"), tracing.span("sessions.get_or_create"):
+            if chat_id and await self.store.get_session(chat_id) is not None:
                 return chat_id
 
-        new_id = str(uuid.uuid4())
-        await (
-            self.db.collection(_SESSIONS)
-            .document(new_id)
-            .set(
-                {
-                    "created_at": SERVER_TIMESTAMP,
-                    "updated_at": SERVER_TIMESTAMP,
-                    "last_message_preview": "",
-                    "message_count": 0,
-                }
-            )
-        )
+            new_id = str(uuid.uuid4())
+            await self.store.create_session(new_id)
         logger.info(f"New session created: {new_id}")
         return new_id
 
@@ -56,73 +44,41 @@ class ChatbotService:
         tool_calls: Optional[List] = None,
         citations: Optional[List] = None,
         actions: Optional[List] = None,
+        truncated: bool = False,
     ) -> None:
-        await (
-            self.db.collection(_SESSIONS)
-            .document(chat_id)
-            .collection(_MESSAGES)
-            .add(
-                {
-                    "role": role,
-                    "content": content,
-                    "agent": agent,
-                    "tool_calls": tool_calls,
-                    "citations": citations,
-                    "actions": actions,
-                    "timestamp": SERVER_TIMESTAMP,
-                }
-            )
-        )
-        await (
-            self.db.collection(_SESSIONS)
-            .document(chat_id)
-            .update(
-                {
-                    "updated_at": SERVER_TIMESTAMP,
-                    "last_message_preview": content[:100],
-                    "message_count": Increment(1),
-                }
-            )
-        )
+        message = {
+            "role": role,
+            "content": content,
+            "agent": agent,
+            "tool_calls": tool_calls,
+            "citations": citations,
+            "actions": actions,
+            "truncated": truncated,
+        }
+        with timing.phase("persist"), tracing.span("sessions.append_message", role=role):
+            await self.store.append_message(chat_id, message)
 
     async def get_history(self, chat_id: str, limit: int = 50) -> List[Dict[str, Any]]:
-        session_doc = await self.db.collection(_SESSIONS).document(chat_id).get()
-        if not session_doc.exists:
-            return []
-
-        query = (
-            self.db.collection(_SESSIONS)
-            .document(chat_id)
-            .collection(_MESSAGES)
-            .order_by("timestamp")
-            .limit(min(limit, 100))
-        )
-        docs = await query.get()
-        return [doc.to_dict() for doc in docs]
+        """Returns the last `limit` messages of the session, oldest first."""
+        with timing.phase("history"), tracing.span("sessions.get_messages", limit=limit):
+            return await self.store.get_messages(chat_id, limit)
 
     async def delete_session(self, chat_id: str) -> bool:
-        session_ref = self.db.collection(_SESSIONS).document(chat_id)
-        session_doc = await session_ref.get()
-        if not session_doc.exists:
+        tool_memo.sessions.forget(chat_id)
+        if not await self.store.delete_session(chat_id):
             return False
-
-        messages_ref = session_ref.collection(_MESSAGES)
-        async for doc in messages_ref.stream():
-            await doc.reference.delete()
-
-        await session_ref.delete()
         logger.info(f"Session deleted: {chat_id}")
         return True
 
     async def count_sessions(self) -> int:
-        count = 0
-        async for _ in self.db.collection(_SESSIONS).stream():
-            count += 1
-        return count
+        return await self.store.count_sessions()
 
     # ── history ↔ LlamaIndex format ───────────────────────────────────────────
 
-    def build_llm_history(self, messages: List[Dict[str, Any]]) -> List[ChatMessage]:
+    def build_llm_history(self, messages: List[Dict[str, Any]]) -> List["ChatMessage"]:
+        # Imported here: LlamaIndex is the heaviest import in the app and not needed at startup.
+        from llama_index.core.llms import ChatMessage, MessageRole
+
         history = []
         for msg in messages[-config.max_memory_messages :]:
             role = MessageRole.USER if msg["role"] == "user" else MessageRole.ASSISTANT
@@ -133,20 +89,78 @@ class ChatbotService:
 
     # ── v1 sync response (deprecated) ────────────────────────────────────────
 
-    async def generate_response(self, chat_id: str, user_message: str) -> Dict[str, Any]:
-        from src.core.agent_orchestrator import get_main_agent_workflow
+    async def generate_response(
+        self,
+        chat_id: str,
+        user_message: str,
+        budget: Optional[deadline.TurnBudget] = None,
+    ) -> Dict[str, Any]:
+        """One v1 turn, under the same budget and degradation tier as a streaming turn."""
         from src.core.models import ActionData
 
         history_data = await self.get_history(chat_id)
         llm_history = self.build_llm_history(history_data)
 
-        agent_workflow = get_main_agent_workflow()
+        action_data_dict = ActionData(action_type="display_message", data=None).model_dump()
+        agent = "main"
+        tier = degradation.controller.tier()
+        if tier == degradation.CACHED_ONLY:
+            cached = degradation.answers.get(user_message)
+            bot_response_text = cached["text"] if cached else degradation.DEGRADED_ANSWER
+            agent = "answer_cache"
+        else:
+            bot_response_text, action_data_dict = await self._run_workflow(
+                chat_id, user_message, llm_history, tier, budget or deadline.TurnBudget(0, 0, 0)
+            )
+
+        await self.save_message(chat_id, "user", user_message)
+        await self.save_message(chat_id, "assistant", bot_response_text, agent=agent)
+
+        return {
+            "chatId": chat_id,
+            "message": bot_response_text,
+            "action": action_data_dict,
+        }
+
+    async def _run_workflow(
+        self,
+        chat_id: str,
+        user_message: str,
+        llm_history: List["ChatMessage"],
+        tier: int,
+        budget: deadline.TurnBudget,
+    ) -> Tuple[str, Dict[str, Any]]:
+        from llama_index.core.agent.workflow import AgentInput
+
+        from src.core.agent_orchestrator import get_main_agent_workflow
+        from src.core.models import ActionData
+
+        root_agent = "router_agent"
+        if tier >= degradation.NO_ROUTER:
+            root_agent = degradation.route_by_keywords(user_message)
+        agent_workflow = get_main_agent_workflow(tier, root_agent)
         bot_response_text = ""
         action_data_dict = ActionData(action_type="display_message", data=None).model_dump()
 
         try:
+            started = time.perf_counter()
+            budget.start(root_agent)
+            tool_memo.start(chat_id)
             handler = agent_workflow.run(user_msg=user_message, chat_history=llm_history)
+            # Events are only watched for the step budget; the answer comes from the result.
+            async for event in budget.within(handler.stream_events()):
+                if isinstance(event, AgentInput) and budget.step(event.current_agent_name):
+                    break
+            if budget.exceeded:
+                await handler.cancel_run()
+                logger.warning(
+                    f"v1 turn on {chat_id} stopped ({budget.exceeded}) after {budget.steps} "
+                    f"steps, {budget.handoffs} handoffs"
+                )
+                return deadline.OUT_OF_BUDGET_ANSWER, action_data_dict
+
             final_response = await handler
+            degradation.controller.observe_turn(time.perf_counter() - started)
 
             if hasattr(final_response, "response") and final_response.response is not None:
                 resp = final_response.response
@@ -173,15 +187,10 @@ class ChatbotService:
                     ).model_dump()
 
         except Exception as e:
+            if degradation.is_rate_limit(e):
+                degradation.controller.record_rate_limit()
             logger.error(f"Agent error for {chat_id}: {e}", exc_info=True)
             bot_response_text = "I'm having trouble right now. Please try again later."
             action_data_dict = ActionData(action_type="display_message", data=None).model_dump()
 
-        await self.save_message(chat_id, "user", user_message)
-        await self.save_message(chat_id, "assistant", bot_response_text, agent="main")
-
-        return {
-            "chatId": chat_id,
-            "message": bot_response_text,
-            "action": action_data_dict,
-        }
+        return bot_response_text, action_data_dict
@@ -0,0 +1,488 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from fastapi import Request
+
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+T = TypeVar("T")
+
+SESSIONS = "chat_sessions"
+MESSAGES = "messages"
+
+# Hard cap on messages returned by one history read.
+MAX_HISTORY = 100
+
+
+class SessionStore(ABC):
+    """
+    Persistence for chat sessions and their messages.
+
+    Session dicts carry `created_at`, `updated_at`, `last_message_preview` and
+    `message_count`; message dicts carry `role`, `content`, `agent`, `tool_calls`,
+    `citations`, `actions`, `truncated` and `timestamp`. Timestamps are set by the store.
+
+    Sessions can also carry a turn lease (owner + expiry, epoch seconds) that serializes
+    chat turns across instances; see src/core/chat_lock.py.
+    """
+
+    name = ""
+
+    @abstractmethod
+    async def get_session(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the session dict, or None if it doesn't exist."""
+
+    @abstractmethod
+    async def create_session(self, chat_id: str) -> None: ...
+
+    @abstractmethod
+    async def append_message(self, chat_id: str, message: Dict[str, Any]) -> None:
+        """Stores a message and bumps the session's updated_at / preview / count."""
+
+    @abstractmethod
+    async def get_messages(self, chat_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Returns the last `limit` messages (capped at MAX_HISTORY), oldest first."""
+
+    @abstractmethod
+    async def delete_session(self, chat_id: str) -> bool:
+        """Deletes the session and its messages. Returns False if it didn't exist."""
+
+    @abstractmethod
+    async def count_sessions(self) -> int: ...
+
+    @abstractmethod
+    async def acquire_lease(self, chat_id: str, owner: str, ttl: float) -> bool:
+        """
+        Takes or renews the session's turn lease for `ttl` seconds. Returns False while
+        another owner holds an unexpired lease; a session that doesn't exist yet is free.
+        """
+
+    @abstractmethod
+    async def release_lease(self, chat_id: str, owner: str) -> None:
+        """Drops the lease if `owner` still holds it."""
+
+    async def close(self) -> None:  # noqa: B027 - optional hook, most stores hold nothing
+        """Releases connections/threads held by the store."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _preview(content: str) -> str:
+    return content[:100]
+
+
+def _lease_free(session: Dict[str, Any], owner: str, now: float) -> bool:
+    holder = session.get("lease_owner")
+    return holder is None or holder == owner or (session.get("lease_expires") or 0) < now
+
+
+# ── Firestore ─────────────────────────────────────────────────────────────────
+
+
+class FirestoreSessionStore(SessionStore):
+    """chat_sessions/{chatId} documents with a `messages` subcollection."""
+
+    name = "firestore"
+
+    def __init__(self, db):
+        self.db = db
+
+    def _session_ref(self, chat_id: str):
+        return self.db.collection(SESSIONS).document(chat_id)
+
+    async def get_session(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        doc = await self._session_ref(chat_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    async def create_session(self, chat_id: str) -> None:
+        from google.cloud.firestore import SERVER_TIMESTAMP
+
+        await self._session_ref(chat_id).set(
+            {
+                "created_at": SERVER_TIMESTAMP,
+                "updated_at": SERVER_TIMESTAMP,
+                "last_message_preview": "",
+                "message_count": 0,
+            }
+        )
+
+    async def append_message(self, chat_id: str, message: Dict[str, Any]) -> None:
+        from google.cloud.firestore import SERVER_TIMESTAMP, Increment
+
+        session_ref = self._session_ref(chat_id)
+        await session_ref.collection(MESSAGES).add({**message, "timestamp": SERVER_TIMESTAMP})
+        await session_ref.update(
+            {
+                "updated_at": SERVER_TIMESTAMP,
+                "last_message_preview": _preview(message["content"]),
+                "message_count": Increment(1),
+            }
+        )
+
+    async def get_messages(self, chat_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        from google.cloud.firestore import Query
+
+        limit = max(0, min(limit, MAX_HISTORY))
+        if limit == 0:  # Firestore has no "LIMIT 0"
+            return []
+        query = (
+            self._session_ref(chat_id)
+            .collection(MESSAGES)
+            .order_by("timestamp", direction=Query.DESCENDING)
+            .limit(limit)
+        )
+        docs = await query.get()
+        return [doc.to_dict() for doc in reversed(docs)]
+
+    async def delete_session(self, chat_id: str) -> bool:
+        session_ref = self._session_ref(chat_id)
+        if not (await session_ref.get()).exists:
+            return False
+        async for doc in session_ref.collection(MESSAGES).stream():
+            await doc.reference.delete()
+        await session_ref.delete()
+        return True
+
+    async def count_sessions(self) -> int:
+        count = 0
+        async for _ in self.db.collection(SESSIONS).stream():
+            count += 1
+        return count
+
+    async def acquire_lease(self, chat_id: str, owner: str, ttl: float) -> bool:
+        from google.api_core.exceptions import FailedPrecondition
+
+        # Read-check-write guarded by the document's update time: a concurrent writer
+        # (another instance's lease, or a message append) fails the write, and we re-read.
+        session_ref = self._session_ref(chat_id)
+        for _ in range(3):
+            doc = await session_ref.get()
+            if not doc.exists:
+                return True
+            now = time.time()
+            if not _lease_free(doc.to_dict(), owner, now):
+                return False
+            try:
+                await session_ref.update(
+                    {"lease_owner": owner, "lease_expires": now + ttl},
+                    option=self.db.write_option(last_update_time=doc.update_time),
+                )
+                return True
+            except FailedPrecondition:
+                continue
+        return False
+
+    async def release_lease(self, chat_id: str, owner: str) -> None:
+        from google.api_core.exceptions import FailedPrecondition
+
+        session_ref = self._session_ref(chat_id)
+        doc = await session_ref.get()
+        if not doc.exists or doc.to_dict().get("lease_owner") != owner:
+            return
+        try:
+            await session_ref.update(
+                {"lease_owner": None, "lease_expires": None},
+                option=self.db.write_option(last_update_time=doc.update_time),
+            )
+        except FailedPrecondition:
+            pass  # changed under us; the lease expires on its own
+
+
+# ── in-memory ─────────────────────────────────────────────────────────────────
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store for development, tests and benchmarks. Not shared across workers."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._messages: Dict[str, List[Dict[str, Any]]] = {}
+
+    async def get_session(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(chat_id)
+        return dict(session) if session is not None else None
+
+    async def create_session(self, chat_id: str) -> None:
+        now = _now()
+        self._sessions[chat_id] = {
+            "created_at": now,
+            "updated_at": now,
+            "last_message_preview": "",
+            "message_count": 0,
+        }
+        self._messages[chat_id] = []
+
+    async def append_message(self, chat_id: str, message: Dict[str, Any]) -> None:
+        session = self._sessions.get(chat_id)
+        if session is None:
+            raise KeyError(f"Unknown session: {chat_id}")
+        now = _now()
+        self._messages[chat_id].append({**message, "timestamp": now})
+        session.update(
+            updated_at=now,
+            last_message_preview=_preview(message["content"]),
+            message_count=session["message_count"] + 1,
+        )
+
+    async def get_messages(self, chat_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        messages = self._messages.get(chat_id, [])
+        return [dict(m) for m in messages[-min(limit, MAX_HISTORY) :]] if limit > 0 else []
+
+    async def delete_session(self, chat_id: str) -> bool:
+        if self._sessions.pop(chat_id, None) is None:
+            return False
+        self._messages.pop(chat_id, None)
+        return True
+
+    async def count_sessions(self) -> int:
+        return len(self._sessions)
+
+    async def acquire_lease(self, chat_id: str, owner: str, ttl: float) -> bool:
+        session = self._sessions.get(chat_id)
+        if session is None:
+            return True
+        now = time.time()
+        if not _lease_free(session, owner, now):
+            return False
+        session.update(lease_owner=owner, lease_expires=now + ttl)
+        return True
+
+    async def release_lease(self, chat_id: str, owner: str) -> None:
+        session = self._sessions.get(chat_id)
+        if session is not None and session.get("lease_owner") == owner:
+            session.update(lease_owner=None, lease_expires=None)
+
+
+# ── SQLite ────────────────────────────────────────────────────────────────────
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    chat_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    last_message_preview TEXT NOT NULL DEFAULT '',
+    message_count INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL REFERENCES chat_sessions(chat_id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    agent TEXT,
+    tool_calls TEXT,
+    citations TEXT,
+    actions TEXT,
+    truncated INTEGER NOT NULL DEFAULT 0,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_chat ON messages (chat_id, id);
+"""
+
+# Statements are module constants so sqlite3's per-connection statement cache reuses the
+# prepared statement on every call instead of re-parsing the SQL.
+_GET_SESSION = (
+    "SELECT created_at, updated_at, last_message_preview, message_count "
+    "FROM chat_sessions WHERE chat_id = ?"
+)
+_INSERT_SESSION = (
+    "INSERT OR IGNORE INTO chat_sessions "
+    "(chat_id, created_at, updated_at, last_message_preview, message_count) "
+    "VALUES (?, ?, ?, '', 0)"
+)
+_INSERT_MESSAGE = (
+    "INSERT INTO messages "
+    "(chat_id, role, content, agent, tool_calls, citations, actions, truncated, timestamp) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_TOUCH_SESSION = (
+    "UPDATE chat_sessions SET updated_at = ?, last_message_preview = ?, "
+    "message_count = message_count + 1 WHERE chat_id = ?"
+)
+_LAST_MESSAGES = (
+    "SELECT role, content, agent, tool_calls, citations, actions, truncated, timestamp FROM ("
+    "SELECT * FROM messages WHERE chat_id = ? ORDER BY id DESC LIMIT ?"
+    ") ORDER BY id"
+)
+_DELETE_SESSION = "DELETE FROM chat_sessions WHERE chat_id = ?"
+_COUNT_SESSIONS = "SELECT COUNT(*) FROM chat_sessions"
+_TAKE_LEASE = (
+    "UPDATE chat_sessions SET lease_owner = ?, lease_expires = ? WHERE chat_id = ? "
+    "AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires < ?)"
+)
+_SESSION_EXISTS = "SELECT 1 FROM chat_sessions WHERE chat_id = ?"
+_RELEASE_LEASE = (
+    "UPDATE chat_sessions SET lease_owner = NULL, lease_expires = NULL "
+    "WHERE chat_id = ? AND lease_owner = ?"
+)
+
+_JSON_FIELDS = ("tool_calls", "citations", "actions")
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Adds columns introduced after a database file was first created."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+    if "truncated" not in columns:
+        conn.execute("ALTER TABLE messages ADD COLUMN truncated INTEGER NOT NULL DEFAULT 0")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(chat_sessions)")}
+    if "lease_owner" not in columns:
+        conn.execute("ALTER TABLE chat_sessions ADD COLUMN lease_owner TEXT")
+        conn.execute("ALTER TABLE chat_sessions ADD COLUMN lease_expires REAL")
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Single-file store for running on one VM. One connection in WAL mode is owned by a
+    dedicated thread, so calls never block the event loop and writes are serialized
+    without SQLite lock contention.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-store")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Runs on the store thread; the connection never leaves it.
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(_SCHEMA)
+            _migrate(conn)
+            self._conn = conn
+            logger.info(f"SQLite session store opened at {self.path}")
+        return self._conn
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        def _call() -> T:
+            conn = self._connection()
+            with conn:  # one transaction per call
+                return fn(conn)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, _call)
+
+    async def get_session(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        row = await self._run(lambda c: c.execute(_GET_SESSION, (chat_id,)).fetchone())
+        if row is None:
+            return None
+        return {
+            "created_at": datetime.fromisoformat(row[0]),
+            "updated_at": datetime.fromisoformat(row[1]),
+            "last_message_preview": row[2],
+            "message_count": row[3],
+        }
+
+    async def create_session(self, chat_id: str) -> None:
+        now = _now().isoformat()
+        await self._run(lambda c: c.execute(_INSERT_SESSION, (chat_id, now, now)))
+
+    async def append_message(self, chat_id: str, message: Dict[str, Any]) -> None:
+        now = _now().isoformat()
+        params = (
+            chat_id,
+            message["role"],
+            message["content"],
+            message.get("agent"),
+            *(json.dumps(message[f]) if message.get(f) is not None else None for f in _JSON_FIELDS),
+            int(bool(message.get("truncated"))),
+            now,
+        )
+
+        def _append(c: sqlite3.Connection) -> None:
+            c.execute(_INSERT_MESSAGE, params)
+            c.execute(_TOUCH_SESSION, (now, _preview(message["content"]), chat_id))
+
+        await self._run(_append)
+
+    async def get_messages(self, chat_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = await self._run(
+            lambda c: c.execute(
+                _LAST_MESSAGES, (chat_id, max(0, min(limit, MAX_HISTORY)))
+            ).fetchall()
+        )
+        return [
+            {
+                "role": role,
+                "content": content,
+                "agent": agent,
+                "tool_calls": json.loads(tool_calls) if tool_calls else None,
+                "citations": json.loads(citations) if citations else None,
+                "actions": json.loads(actions) if actions else None,
+                "truncated": bool(truncated),
+                "timestamp": datetime.fromisoformat(timestamp),
+            }
+            for role, content, agent, tool_calls, citations, actions, truncated, timestamp in rows
+        ]
+
+    async def delete_session(self, chat_id: str) -> bool:
+        cursor = await self._run(lambda c: c.execute(_DELETE_SESSION, (chat_id,)))
+        return cursor.rowcount > 0
+
+    async def count_sessions(self) -> int:
+        row = await self._run(lambda c: c.execute(_COUNT_SESSIONS).fetchone())
+        return row[0]
+
+    async def acquire_lease(self, chat_id: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+
+        def _take(c: sqlite3.Connection) -> bool:
+            if c.execute(_TAKE_LEASE, (owner, now + ttl, chat_id, owner, now)).rowcount:
+                return True
+            return c.execute(_SESSION_EXISTS, (chat_id,)).fetchone() is None
+
+        return await self._run(_take)
+
+    async def release_lease(self, chat_id: str, owner: str) -> None:
+        await self._run(lambda c: c.execute(_RELEASE_LEASE, (chat_id, owner)))
+
+    async def close(self) -> None:
+        def _close() -> None:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, _close)
+        self._executor.shutdown(wait=True)
+
+
+# ── selection ─────────────────────────────────────────────────────────────────
+
+
+def create_session_store(db=None) -> SessionStore:
+    """
+    Builds the store selected by SESSION_BACKEND. `db` is the Firestore client, required
+    only for the firestore backend.
+    """
+    backend = config.session_backend
+    if backend == "firestore":
+        if db is None:
+            raise ValueError("The firestore session backend needs a Firestore client")
+        return FirestoreSessionStore(db)
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(config.sqlite_path)
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend!r} (expected firestore, memory or sqlite)")
+
+
+def get_session_store(request: Request) -> SessionStore:
+    return request.app.state.sessions
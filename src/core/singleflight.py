@@ -0,0 +1,83 @@
+import asyncio
+import functools
+import logging
+from typing import Any, Callable, Coroutine, Dict, Generic, Hashable, TypeVar
+
+from src.core import deadline, metrics
+from src.core.resilience import DependencyTimeout
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_LEADERS = metrics.counter("singleflight_leader_calls_total", "Calls that actually ran the work")
+_COALESCED = metrics.counter(
+    "singleflight_coalesced_calls_total", "Calls that awaited an identical in-flight call"
+)
+
+
+class _Flight(Generic[T]):
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent calls with the same key into one in-flight task.
+
+    - Every caller gets the same result, or the same exception.
+    - Cancelling one caller does not cancel the shared work for the others; the work
+      is only cancelled once every waiter has gone away.
+    - The work runs without the leader's turn deadline (see deadline.py); each caller
+      stops waiting at its own deadline instead, with a DependencyTimeout.
+    - Nothing is cached: once the task finishes, the next call starts fresh.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight[T]] = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, fn: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            loop = asyncio.get_running_loop()
+            flight = _Flight(loop.create_task(fn(), context=deadline.without_deadline()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(functools.partial(self._finish, key, flight))
+            _LEADERS.inc(group=self.name)
+        else:
+            _COALESCED.inc(group=self.name)
+            logger.debug(f"singleflight {self.name}: coalesced call for {key!r}")
+
+        left = deadline.remaining()
+        timeout = asyncio.timeout(left)
+        flight.waiters += 1
+        try:
+            async with timeout:
+                return await asyncio.shield(flight.task)
+        except (asyncio.CancelledError, TimeoutError) as e:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            if isinstance(e, TimeoutError) and timeout.expired():
+                raise DependencyTimeout(self.name, max(left or 0.0, 0.0)) from e
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: Hashable, flight: _Flight[T], task: "asyncio.Task[T]") -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the exception as retrieved even if every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a search query, used for coalescing keys."""
+    return " ".join(text.lower().split())
@@ -0,0 +1,188 @@
+import json
+import logging
+import mmap
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.config import get_config
+from src.core.corpus import Chunk
+
+logger = logging.getLogger(__name__)
+
+# Versioned on-disk embedding snapshot written by scripts/ingest.py, one directory per
+# collection:
+#   vectors.npy   (count, dim) int8 / float16 / float32 matrix of L2-normalised embeddings
+#   scales.npy    (count,) float32 per-row dequantisation factors (int8 only)
+#   content.bin   the chunks' UTF-8 content, back to back
+#   meta.json     format version, embedding fingerprint (see embeddings.py), dtype, and one
+#                 row per chunk: its id, its fields without content and the byte offset /
+#                 length of its content
+# The service opens the arrays and the content blob with mmap, so nothing is parsed or
+# copied at startup and every worker on the host shares the same page cache pages.
+
+SNAPSHOT_FORMAT = "lorenzobot-embeddings"
+SNAPSHOT_VERSION = 2
+DTYPES = ("int8", "float16", "float32")
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(stored matrix, per-row scales or None). int8 is symmetric, one scale per row."""
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.rint(matrix / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    if dtype in ("float16", "float32"):
+        return matrix.astype(dtype), None
+    raise ValueError(f"Snapshot dtype must be one of {DTYPES}, got {dtype!r}")
+
+
+def write_snapshot(
+    directory: Path,
+    chunks: Sequence[Chunk],
+    embeddings: Sequence[Sequence[float]],
+    dtype: str = "int8",
+    fingerprint: str = "",
+) -> Path:
+    """Writes `chunks` and their embeddings to `directory`; returns the directory."""
+    directory.mkdir(parents=True, exist_ok=True)
+    matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(chunks), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    stored, scales = quantize(matrix / norms, dtype)
+
+    rows, blob = [], bytearray()
+    for doc_id, doc in chunks:
+        content = doc.get("content", "").encode()
+        fields = {k: v for k, v in doc.items() if k != "content"}
+        rows.append({"id": doc_id, **fields, "offset": len(blob), "length": len(content)})
+        blob += content
+
+    # Write the metadata last: a snapshot without meta.json is never opened half-written.
+    (directory / "meta.json").unlink(missing_ok=True)
+    np.save(directory / "vectors.npy", stored)
+    if scales is not None:
+        np.save(directory / "scales.npy", scales)
+    else:
+        (directory / "scales.npy").unlink(missing_ok=True)
+    (directory / "content.bin").write_bytes(bytes(blob))
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": fingerprint,
+        "dtype": dtype,
+        "dim": int(matrix.shape[1]) if len(chunks) else 0,
+        "count": len(chunks),
+        "rows": rows,
+    }
+    (directory / "meta.json").write_text(json.dumps(meta, ensure_ascii=False))
+    return directory
+
+
+class EmbeddingSnapshot:
+    """A read-only, memory-mapped snapshot; `search` is an exact cosine scan over its rows."""
+
+    def __init__(self, directory: Path):
+        meta = json.loads((directory / "meta.json").read_text())
+        if meta.get("format") != SNAPSHOT_FORMAT or meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"{directory} is not a version {SNAPSHOT_VERSION} embedding snapshot "
+                f"(got {meta.get('format')!r} v{meta.get('version')}); re-run scripts/ingest.py"
+            )
+        self.directory = directory
+        self.fingerprint: Optional[str] = meta["fingerprint"] or None
+        self.dtype: str = meta["dtype"]
+        self.dim: int = meta["dim"]
+        self._rows: List[Dict[str, Any]] = meta["rows"]
+        self._vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+        self._scales = (
+            np.load(directory / "scales.npy", mmap_mode="r") if self.dtype == "int8" else None
+        )
+        if self._vectors.shape != (len(self._rows), self.dim):
+            raise ValueError(f"{directory}: vectors.npy does not match meta.json")
+        self._content: Optional[mmap.mmap] = None
+        with open(directory / "content.bin", "rb") as f:
+            if any(row["length"] for row in self._rows):  # mmap refuses empty files
+                self._content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the vector data (matrix + scales) on disk and in the page cache."""
+        return int(self._vectors.nbytes + (self._scales.nbytes if self._scales is not None else 0))
+
+    def scores(self, query_vector: Sequence[float]) -> np.ndarray:
+        """Cosine similarity of `query_vector` with every row."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (self.dim,):
+            raise ValueError(f"Query has {query.shape[0]} dimensions, snapshot has {self.dim}")
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = self._vectors @ query
+        return scores * self._scales if self._scales is not None else scores
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        n_results: int = 3,
+        filters: Optional[Mapping[str, Any]] = None,
+        max_distance: Optional[float] = None,
+    ) -> List[Tuple[str, Dict[str, Any], float]]:
+        """
+        Top `n_results` (id, document, cosine distance), nearest first, among the rows whose
+        fields equal `filters` and that are at most `max_distance` away.
+        """
+        if not self._rows:
+            return []
+        distances = 1.0 - self.scores(query_vector)
+        keep = np.ones(len(self._rows), dtype=bool)
+        if filters:
+            keep &= np.array([all(r.get(f) == v for f, v in filters.items()) for r in self._rows])
+        if max_distance is not None:
+            keep &= distances <= max_distance
+        candidates = np.flatnonzero(keep)
+        n = min(n_results, len(candidates))
+        if n == 0:
+            return []
+        top = candidates[np.argpartition(distances[candidates], n - 1)[:n]]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return [(self._rows[i]["id"], self._document(i), float(distances[i])) for i in top]
+
+    def _document(self, i: int) -> Dict[str, Any]:
+        row = self._rows[i]
+        doc = {k: v for k, v in row.items() if k not in ("id", "offset", "length")}
+        if self._content is not None:
+            doc["content"] = self._content[row["offset"] : row["offset"] + row["length"]].decode()
+        return doc
+
+
+# collection → snapshot, or None once opening it has failed / it doesn't exist
+_snapshots: Dict[str, Optional[EmbeddingSnapshot]] = {}
+
+
+def get_snapshot(collection_name: str) -> Optional[EmbeddingSnapshot]:
+    """The collection's snapshot under EMBEDDING_SNAPSHOT_DIR; None when unset or missing."""
+    # Read here rather than at import: scripts/ingest.py imports this module without the
+    # app's API keys set.
+    snapshot_dir = get_config().embedding_snapshot_dir
+    if not snapshot_dir:
+        return None
+    if collection_name not in _snapshots:
+        directory = Path(snapshot_dir) / collection_name
+        snapshot = None
+        if (directory / "meta.json").exists():
+            try:
+                snapshot = EmbeddingSnapshot(directory)
+                logger.info(
+                    f"Embedding snapshot {collection_name}: {len(snapshot)} x {snapshot.dim} "
+                    f"{snapshot.dtype} ({snapshot.nbytes} bytes)"
+                )
+            except (OSError, ValueError, KeyError) as e:
+                logger.error(f"Can't open embedding snapshot {directory}, using Firestore: {e}")
+        else:
+            logger.warning(f"No embedding snapshot at {directory}, using Firestore")
+        _snapshots[collection_name] = snapshot
+    return _snapshots[collection_name]
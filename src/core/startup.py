@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
+
+from src.core.config import get_config
+
+if TYPE_CHECKING:
+    from src.core.session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+
+class StartupTimer:
+    """Collects a per-phase timing breakdown of process startup and the first request."""
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.ready_at: Optional[float] = None
+        self.first_request: Optional[Dict[str, Any]] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            # Warm-up is best effort: record the failure and keep starting up.
+            self.errors[name] = str(e)
+            logger.warning(f"Startup phase '{name}' failed: {e}")
+        finally:
+            self.phases[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    def mark(self, name: str, since: float) -> None:
+        self.phases[name] = round((time.perf_counter() - since) * 1000, 2)
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+        breakdown = ", ".join(f"{k}={v}ms" for k, v in self.phases.items())
+        logger.info(f"Startup ready in {self._ms(self.ready_at)}ms ({breakdown})")
+
+    def record_first_request(self, path: str, duration: float) -> None:
+        if self.first_request is not None:
+            return
+        self.first_request = {
+            "path": path,
+            "duration_ms": round(duration * 1000, 2),
+            "since_start_ms": self._ms(time.perf_counter()),
+        }
+        logger.info(f"First request {path} served in {self.first_request['duration_ms']}ms")
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "mode": config.startup_mode,
+            "phases_ms": dict(self.phases),
+            "ready_ms": self._ms(self.ready_at) if self.ready_at else None,
+            "first_request": self.first_request,
+            "errors": dict(self.errors),
+        }
+
+    def _ms(self, t: float) -> float:
+        return round((t - self.started_at) * 1000, 2)
+
+
+class FirstRequestTimer:
+    """Pure ASGI middleware that records how long the first HTTP request took."""
+
+    def __init__(self, app, timer: StartupTimer):
+        self.app = app
+        self.timer = timer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.timer.first_request is not None:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.timer.record_first_request(scope.get("path", ""), time.perf_counter() - start)
+
+
+async def prewarm(timer: StartupTimer, sessions: "SessionStore") -> None:
+    """
+    Pays first-request costs before the instance takes traffic: data catalog, LlamaIndex
+    imports + workflow construction, pooled TLS connections, the session store connection,
+    the embedding snapshots' mappings and, optionally, one embedding round trip. Every step
+    is best effort.
+    """
+    from src.utils.utils import load_catalog
+
+    with timer.phase("catalog"):
+        await asyncio.to_thread(load_catalog)
+
+    with timer.phase("workflow"):
+        # Import + build off the loop; this is the heaviest part of a cold start.
+        from src.core import agent_orchestrator
+
+        await asyncio.to_thread(agent_orchestrator.get_main_agent_workflow)
+
+    with timer.phase("http"):
+        from src.core.http_client import get_http_client
+
+        client = get_http_client()
+        hosts = [f"{config.gemini_api_base_url}/"]
+        if config.calcom_username:
+            hosts.append(f"{config.calcom_api_base_url}/")
+        # Any response (even 404) means DNS + TLS are done and the connection is pooled.
+        await asyncio.gather(*(client.head(h, timeout=5.0) for h in hosts))
+
+    with timer.phase("session_store"):
+        await sessions.get_session("_warmup")
+
+    if config.embedding_snapshot_dir:
+        with timer.phase("embedding_snapshots"):
+            from src.core.corpus import CASE_STUDY_COLLECTION, PROJECT_COLLECTION
+            from src.core.snapshot import get_snapshot
+
+            for collection in (CASE_STUDY_COLLECTION, PROJECT_COLLECTION):
+                get_snapshot(collection)
+
+    if config.prewarm_embedding:
+        with timer.phase("embedding"):
+            from src.core.vector_store import embed_text
+
+            await embed_text("warm-up")
@@ -0,0 +1,162 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core import metrics
+
+# Per-request phase timers. The ServerTimingMiddleware puts a RequestTimer in a contextvar
+# for every HTTP request; services, tools and the SSE generator record into it through
+# the module-level helpers, which are no-ops outside a request. Cost per phase is two
+# perf_counter() calls and a histogram observe, so this stays on in production.
+
+_PHASE = metrics.histogram("request_phase_seconds", "Time spent per request phase")
+_TOOL = metrics.histogram("tool_call_seconds", "Agent tool call duration, including queueing")
+_LLM_STEP = metrics.histogram("llm_step_seconds", "Agent LLM step duration (prompt to last token)")
+
+_current: contextvars.ContextVar[Optional["RequestTimer"]] = contextvars.ContextVar(
+    "request_timer", default=None
+)
+
+
+class RequestTimer:
+    def __init__(self, endpoint: str = ""):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}  # accumulated seconds per phase
+        self.marks: Dict[str, float] = {}  # seconds since start, first occurrence only
+        self.tools: List[Dict[str, Any]] = []
+        self.handoffs: List[Dict[str, Any]] = []
+        self.llm_steps: Dict[str, Dict[str, Any]] = {}  # per agent: step count and total ms
+        self.tool_memo_hits: Dict[str, int] = {}  # duplicate tool calls served from the memo
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        _PHASE.observe(seconds, phase=name)
+
+    def mark(self, name: str) -> None:
+        if name not in self.marks:
+            seconds = self.elapsed()
+            self.marks[name] = seconds
+            _PHASE.observe(seconds, phase=name)
+
+    def tool(self, name: str, seconds: float) -> None:
+        self.tools.append({"tool": name, "ms": _ms(seconds)})
+        _TOOL.observe(seconds, tool=name)
+
+    def memo_hit(self, name: str) -> None:
+        self.tool_memo_hits[name] = self.tool_memo_hits.get(name, 0) + 1
+
+    def llm_step(self, agent: str, seconds: float) -> None:
+        entry = self.llm_steps.setdefault(agent, {"steps": 0, "ms": 0.0})
+        entry["steps"] += 1
+        entry["ms"] = round(entry["ms"] + seconds * 1000, 2)
+        _LLM_STEP.observe(seconds, agent=agent)
+
+    def handoff(self, to_agent: str) -> None:
+        self.handoffs.append({"to": to_agent, "at_ms": _ms(self.elapsed())})
+
+    def finish(self) -> float:
+        total = self.elapsed()
+        _PHASE.observe(total, phase="total")
+        return total
+
+    def to_dict(self, total: Optional[float] = None) -> Dict[str, Any]:
+        timings: Dict[str, Any] = {f"{k}_ms": _ms(v) for k, v in self.phases.items()}
+        timings.update({f"{k}_ms": _ms(v) for k, v in self.marks.items()})
+        timings["tools"] = self.tools
+        timings["handoffs"] = self.handoffs
+        timings["llm_steps"] = self.llm_steps
+        timings["tool_memo_hits"] = self.tool_memo_hits
+        timings["total_ms"] = _ms(self.elapsed() if total is None else total)
+        return timings
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{k};dur={_ms(v)}" for k, v in {**self.phases, **self.marks}.items()]
+        entries.extend(f"tool-{t['tool']};dur={t['ms']}" for t in self.tools)
+        entries.extend(f"llm-{agent};dur={s['ms']}" for agent, s in self.llm_steps.items())
+        entries.append(f"total;dur={_ms(total)}")
+        return ", ".join(entries)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def current() -> Optional[RequestTimer]:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Times the block into the current request's `name` phase (accumulates on repeats)."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def add(name: str, seconds: float) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def mark(name: str) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.mark(name)
+
+
+def record_tool(name: str, seconds: float) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.tool(name, seconds)
+
+
+def record_memo_hit(name: str) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.memo_hit(name)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: gives each HTTP request a RequestTimer and, for non-streaming
+    responses, reports its phases in a `Server-Timing` header. Streaming endpoints put the
+    same data in their final event instead, since headers are gone by then.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer(scope.get("path", ""))
+        token = _current.set(timer)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = next((v for k, v in headers if k == b"content-type"), b"")
+                if not content_type.startswith(b"text/event-stream"):
+                    total = timer.finish()
+                    headers.append((b"server-timing", timer.server_timing(total).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,94 @@
+import asyncio
+import contextvars
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Optional
+
+from src.core import metrics
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+
+class ToolKind(str, Enum):
+    ASYNC = "async"  # coroutine function, awaited on the event loop
+    CHEAP_SYNC = "cheap_sync"  # pure in-memory work, cheaper to run inline than to hop threads
+    BLOCKING_SYNC = "blocking_sync"  # file I/O / parsing, dispatched to the tool thread pool
+
+
+_POOL_SIZE = metrics.gauge("tool_pool_size", "Configured size of the blocking-tool thread pool")
+_POOL_ACTIVE = metrics.gauge("tool_pool_active", "Blocking tool calls currently running")
+_POOL_QUEUED = metrics.gauge("tool_pool_queued", "Blocking tool calls waiting for a pool thread")
+_TOOL_CALLS = metrics.counter("tool_calls_total", "Tool calls by tool and execution kind")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ThreadPoolExecutor:
+    """Returns the lazily-created, bounded thread pool for blocking tools."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            size = max(1, config.tool_thread_pool_size)
+            _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="tool")
+            _POOL_SIZE.set(size)
+            logger.info(f"Tool thread pool initialised ({size} workers)")
+        return _executor
+
+
+def shutdown_tool_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+            _POOL_SIZE.set(0)
+            logger.info("Tool thread pool shut down")
+
+
+def classify(fn: Callable[..., Any], kind: Optional[ToolKind] = None) -> ToolKind:
+    """Coroutines are ASYNC; sync functions are BLOCKING_SYNC unless explicitly marked cheap."""
+    if inspect.iscoroutinefunction(fn):
+        return ToolKind.ASYNC
+    return kind or ToolKind.BLOCKING_SYNC
+
+
+async def run_tool(name: str, kind: ToolKind, fn: Callable[..., Any], kwargs: dict) -> Any:
+    _TOOL_CALLS.inc(tool=name, kind=kind.value)
+    if kind is ToolKind.ASYNC:
+        return await fn(**kwargs)
+    if kind is ToolKind.CHEAP_SYNC:
+        return fn(**kwargs)
+
+    ctx = contextvars.copy_context()
+    dequeue_lock = threading.Lock()
+    dequeued = False
+
+    def _dequeue() -> None:
+        # Runs from the pool thread on start, or from the loop if the call is cancelled
+        # while still queued — whichever comes first updates the gauge.
+        nonlocal dequeued
+        with dequeue_lock:
+            if not dequeued:
+                dequeued = True
+                _POOL_QUEUED.dec()
+
+    def _call() -> Any:
+        _dequeue()
+        _POOL_ACTIVE.inc()
+        try:
+            return ctx.run(fn, **kwargs)
+        finally:
+            _POOL_ACTIVE.dec()
+
+    _POOL_QUEUED.inc()
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_tool_executor(), _call)
+    finally:
+        _dequeue()
@@ -0,0 +1,148 @@
+import asyncio
+import contextvars
+import inspect
+import json
+import logging
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.core import metrics, timing
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# Agents often call the same tool with the same arguments more than once per turn:
+# search_projects() in the project agent and again after a handoff, get_project_details(slug)
+# on a ReAct loop-back. A TurnMemo, kept in a contextvar that the workflow's tasks inherit,
+# returns the first result for every repeat, keyed on tool name + arguments (defaults
+# applied, JSON-canonicalized). Identical calls made concurrently share one execution, and
+# failures (exceptions or an {"error": ...} result) are never memoized, so the next call runs
+# the tool again.
+# With TOOL_MEMO_SCOPE=session, results of tools marked MemoScope.SESSION are also kept per
+# chat for TOOL_MEMO_SESSION_TTL_SECONDS. That bypasses the data files' mtime check, so only
+# tools whose output is fixed in code opt in; side-effecting tools are never memoized.
+
+SCOPES = ("off", "turn", "session")
+
+
+class MemoScope(str, Enum):
+    NONE = "none"  # side effects: always executed
+    TURN = "turn"  # reused within a turn
+    SESSION = "session"  # also across the chat's turns when TOOL_MEMO_SCOPE=session
+
+
+_HITS = metrics.counter(
+    "tool_memo_hits_total", "Duplicate tool calls answered from the memo, by tool and scope"
+)
+
+_memo: contextvars.ContextVar[Optional["TurnMemo"]] = contextvars.ContextVar(
+    "tool_memo", default=None
+)
+
+
+def call_key(name: str, signature: inspect.Signature, kwargs: Dict[str, Any]) -> str:
+    """`name` + arguments with defaults applied, so f() and f(detail="summary") match."""
+    try:
+        bound = signature.bind(**kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+    except TypeError:  # let the tool itself report bad arguments
+        arguments = kwargs
+    return name + json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class TurnMemo:
+    def __init__(self, session: Optional[Dict[str, "asyncio.Future[Any]"]] = None):
+        self._results: Dict[str, "asyncio.Future[Any]"] = {}
+        self._session = session
+        self.hits: Dict[str, int] = {}  # duplicate calls per tool
+
+    async def call(
+        self, name: str, key: str, scope: MemoScope, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        if scope is MemoScope.NONE:
+            return await fn()
+        shared = self._session if scope is MemoScope.SESSION else None
+        result = self._results.get(key)
+        hit_scope = "turn"
+        if result is None and shared is not None and key in shared:
+            result, hit_scope = shared[key], "session"
+        if result is not None:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            _HITS.inc(tool=name, scope=hit_scope)
+            timing.record_memo_hit(name)
+            return await asyncio.shield(result)
+
+        result = asyncio.ensure_future(fn())
+        self._results[key] = result
+        if shared is not None:
+            shared[key] = result
+        try:
+            value = await asyncio.shield(result)
+        except BaseException:
+            if not result.done():
+                result.cancel()
+            self._forget(key, result, shared)
+            raise
+        if isinstance(value, dict) and "error" in value:
+            self._forget(key, result, shared)
+        return value
+
+    def _forget(
+        self,
+        key: str,
+        result: "asyncio.Future[Any]",
+        shared: Optional[Dict[str, "asyncio.Future[Any]"]],
+    ) -> None:
+        if self._results.get(key) is result:
+            del self._results[key]
+        if shared is not None and shared.get(key) is result:
+            del shared[key]
+
+
+class SessionMemos:
+    """Per-chat results of session-scoped tools, LRU-bounded and expiring after `ttl`."""
+
+    def __init__(self, ttl: float, max_chats: int):
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self._chats: "OrderedDict[str, Tuple[float, Dict[str, asyncio.Future]]]" = OrderedDict()
+
+    def get(self, chat_id: str) -> Dict[str, "asyncio.Future[Any]"]:
+        now = time.monotonic()
+        entry = self._chats.get(chat_id)
+        if entry is None or now - entry[0] > self.ttl:
+            entry = (now, {})
+            self._chats[chat_id] = entry
+        self._chats.move_to_end(chat_id)
+        while len(self._chats) > self.max_chats:
+            self._chats.popitem(last=False)
+        return entry[1]
+
+    def forget(self, chat_id: str) -> None:
+        self._chats.pop(chat_id, None)
+
+
+if config.tool_memo_scope not in SCOPES:
+    raise ValueError(f"TOOL_MEMO_SCOPE must be one of {SCOPES}, got {config.tool_memo_scope!r}")
+
+sessions = SessionMemos(config.tool_memo_session_ttl_seconds, config.tool_memo_session_max_chats)
+
+
+def start(chat_id: Optional[str] = None) -> Optional[TurnMemo]:
+    """Gives the current task (and the workflow tasks it spawns) a fresh memo for one turn."""
+    if config.tool_memo_scope == "off":
+        return None
+    session = None
+    if config.tool_memo_scope == "session" and chat_id:
+        session = sessions.get(chat_id)
+    memo = TurnMemo(session)
+    _memo.set(memo)
+    return memo
+
+
+def current() -> Optional[TurnMemo]:
+    return _memo.get()
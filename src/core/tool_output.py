@@ -0,0 +1,85 @@
+import json
+import logging
+from typing import Any, Iterable, Optional
+
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# Rough characters-per-token ratio for Gemini on English text / compact JSON.
+# Only used to enforce a prompt budget, so an estimate is fine.
+_CHARS_PER_TOKEN = 4
+
+# Default projections for list results — enough for the LLM to pick a slug and drill down.
+PROJECT_SUMMARY_FIELDS = ("slug", "title", "summary", "category")
+CASE_STUDY_SUMMARY_FIELDS = ("slug", "title", "challenge", "approach", "results")
+
+
+def resolve_fields(
+    detail: str,
+    fields: Optional[Iterable[str]],
+    default: Iterable[str],
+) -> Optional[tuple[str, ...]]:
+    """
+    Picks the projection for a tool call.
+    Explicit `fields` win; detail='full' means no projection (None); anything else uses `default`.
+    """
+    if fields:
+        return tuple(fields)
+    if detail == "full":
+        return None
+    return tuple(default)
+
+
+def project_fields(item: dict, fields: Optional[Iterable[str]]) -> dict:
+    """Returns `item` restricted to `fields`, always keeping the slug. None returns `item` as is."""
+    if fields is None:
+        return item
+    wanted = {"slug", *fields}
+    return {k: v for k, v in item.items() if k in wanted}
+
+
+def split_artifacts(output: Any) -> tuple[Any, list[dict], Optional[dict]]:
+    """
+    Separates the `_citations` / `_action` side-channel fields from a tool result.
+    Returns (payload for the LLM, citations, action). Non-dict outputs pass through untouched.
+    """
+    if not isinstance(output, dict):
+        return output, [], None
+    payload = {k: v for k, v in output.items() if k not in ("_citations", "_action")}
+    return payload, list(output.get("_citations") or []), output.get("_action")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def shape_tool_output(tool_name: str, output: Any) -> str:
+    """
+    Serializes a tool result into the text the LLM sees.
+    Uses compact JSON and enforces TOOL_OUTPUT_MAX_TOKENS, truncating with an explicit marker
+    so the model knows to narrow the query instead of assuming it saw everything.
+    """
+    if isinstance(output, str):
+        text = output
+    else:
+        text = json.dumps(output, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    tokens = estimate_tokens(text)
+    cap = config.tool_output_max_tokens
+    truncated = cap > 0 and tokens > cap
+    if truncated:
+        text = (
+            text[: cap * _CHARS_PER_TOKEN]
+            + f" …[truncated: ~{tokens - cap} more tokens. Narrow the filters, pass a slug, or request fewer fields.]"
+        )
+
+    logger.info(
+        "tool_output %s: %d chars, ~%d tokens%s",
+        tool_name,
+        len(text),
+        tokens,
+        " (truncated)" if truncated else "",
+    )
+    return text
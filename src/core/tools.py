@@ -1,12 +1,19 @@
 import logging
 from datetime import date, timedelta
-from typing import Optional
-
-from src.core.config import Config
+from typing import List, Optional
+
+from src.core.config import get_config
+from src.core.resilience import CALCOM, DependencyUnavailable, get_dependency
+from src.core.tool_output import (
+    CASE_STUDY_SUMMARY_FIELDS,
+    PROJECT_SUMMARY_FIELDS,
+    project_fields,
+    resolve_fields,
+)
 from src.utils.utils import _read_data_file
 
 logger = logging.getLogger(__name__)
-config = Config()
+config = get_config()
 
 # ── Project Agent tools ───────────────────────────────────────────────────────
 
@@ -16,6 +23,8 @@ def search_projects(
     stack: Optional[str] = None,
     status: Optional[str] = None,
     type: Optional[str] = None,
+    detail: str = "summary",
+    fields: Optional[List[str]] = None,
 ) -> dict:
     """
     Searches Lorenzo's projects with optional filters.
@@ -23,7 +32,9 @@ def search_projects(
     - stack: any technology name (e.g. 'Python', 'FastAPI', 'LlamaIndex')
     - status: 'completed' or 'active'
     - type: 'personal' or 'professional'
-    Returns a list of matching projects.
+    - detail: 'summary' (slug, title, summary, category) or 'full'
+    - fields: explicit list of fields to return (e.g. ['technologies', 'metrics']); overrides detail
+    Returns a list of matching projects. Use get_project_details for everything about one project.
     """
     projects = _read_data_file("projects.json", is_json=True)
     if not isinstance(projects, list):
@@ -47,14 +58,19 @@ def search_projects(
         for p in results
         if p.get("slug")
     ]
+    projection = resolve_fields(detail, fields, PROJECT_SUMMARY_FIELDS)
     logger.info(f"search_projects: {len(results)} results (category={category}, stack={stack})")
-    return {"projects": results, "_citations": citations}
+    return {
+        "projects": [project_fields(p, projection) for p in results],
+        "_citations": citations,
+    }
 
 
-def get_project_details(slug: str) -> dict:
+def get_project_details(slug: str, fields: Optional[List[str]] = None) -> dict:
     """
     Returns full details for a specific project by its slug.
     Use this when the user asks about a specific project by name or wants to know more.
+    - fields: optional list of fields to return (e.g. ['technologies', 'metrics']); default is everything
     """
     projects = _read_data_file("projects.json", is_json=True)
     if not isinstance(projects, list):
@@ -68,12 +84,18 @@ def get_project_details(slug: str) -> dict:
 
     citations = [{"kind": "project", "slug": slug, "label": project["title"]}]
     logger.info(f"get_project_details: {slug}")
-    return {"project": project, "_citations": citations}
+    return {"project": project_fields(project, fields), "_citations": citations}
 
 
-def get_case_study(slug: str) -> dict:
+def get_case_study(
+    slug: str,
+    detail: str = "summary",
+    fields: Optional[List[str]] = None,
+) -> dict:
     """
-    Returns the structured case study for a project: challenge, approach, decisions, results, retrospective.
+    Returns the structured case study for a project.
+    - detail: 'summary' (challenge, approach, results) or 'full' (adds decisions, retrospective, stack)
+    - fields: explicit list of sections to return (e.g. ['decisions', 'retrospective']); overrides detail
     Available for: 'ai-customer-support-chatbot', 'data-warehouse-modernization', 'gentleman-closet'.
     """
     case_studies = _read_data_file("case_studies.json", is_json=True)
@@ -87,22 +109,23 @@ def get_case_study(slug: str) -> dict:
         }
 
     citations = [{"kind": "case-study", "slug": slug, "label": study["title"]}]
+    projection = resolve_fields(detail, fields, CASE_STUDY_SUMMARY_FIELDS)
     logger.info(f"get_case_study: {slug}")
-    return {"case_study": study, "_citations": citations}
+    return {"case_study": project_fields(study, projection), "_citations": citations}
 
 
 async def search_case_study_content(query: str) -> dict:
     """
-    Semantic search over Lorenzo's case study content: challenges, approach, decisions, results, retrospective.
+    Search over Lorenzo's case study content: challenges, approach, decisions, results, retrospective.
     Use when the user asks about the depth behind a specific project — why certain choices were made,
     what problems were encountered, or what was learned. Returns the most relevant sections with citations.
     """
     from google.api_core.exceptions import FailedPrecondition
 
-    from src.core.vector_store import vector_search
+    from src.core.retrieval import search
 
     try:
-        docs = await vector_search("case_study_embeddings", query, n_results=3)
+        docs = await search("case_study_embeddings", query, n_results=3)
         chunks = []
         seen_slugs: set = set()
         citations = []
@@ -121,6 +144,9 @@ async def search_case_study_content(query: str) -> dict:
                 )
         logger.info("search_case_study_content: %d chunks for query '%s'", len(chunks), query[:50])
         return {"chunks": chunks, "_citations": citations}
+    except DependencyUnavailable as e:
+        logger.warning("search_case_study_content: %s", e)
+        return {"error": "Search failed. Use get_case_study as a fallback."}
     except FailedPrecondition:
         logger.warning("search_case_study_content: Firestore vector index not ready")
         return {
@@ -132,18 +158,20 @@ async def search_case_study_content(query: str) -> dict:
         return {"error": "Search failed. Use get_case_study as a fallback."}
 
 
-async def recommend_similar_project(description: str) -> dict:
+async def recommend_similar_project(description: str, category: Optional[str] = None) -> dict:
     """
     Recommends Lorenzo's projects semantically similar to a given description.
     Use when the user describes a problem, domain, or use case and wants to know
     if Lorenzo has worked on something similar. Returns ranked matches with citations.
+    - category: optionally restrict to one of 'ai-agents', 'data-infra', 'nlp-ml'
     """
     from google.api_core.exceptions import FailedPrecondition
 
-    from src.core.vector_store import vector_search
+    from src.core.retrieval import search
 
+    filters = {"category": category.strip().lower()} if category else None
     try:
-        docs = await vector_search("project_embeddings", description, n_results=3)
+        docs = await search("project_embeddings", description, n_results=3, filters=filters)
         projects = []
         citations = []
         for doc in docs:
@@ -162,6 +190,9 @@ async def recommend_similar_project(description: str) -> dict:
             "recommend_similar_project: %d results for '%s'", len(projects), description[:50]
         )
         return {"similar_projects": projects, "_citations": citations}
+    except DependencyUnavailable as e:
+        logger.warning("recommend_similar_project: %s", e)
+        return {"error": "Recommendation failed. Use search_projects as a fallback."}
     except FailedPrecondition:
         logger.warning("recommend_similar_project: Firestore vector index not ready")
         return {
@@ -269,6 +300,42 @@ def get_education() -> dict:
     return {"education": education}
 
 
+_PROFILE_MAX_PASSAGES = 8
+
+
+def search_profile(query: str, limit: int = 4) -> dict:
+    """
+    Keyword search over Lorenzo's bio, work experience, education, certifications and skills.
+    Use for career history and background questions (past roles, employers, when he went
+    independent, degrees, courses, languages, hobbies). Returns only the few most relevant
+    passages with citations, not whole documents.
+    """
+    from src.core.corpus import PROFILE_COLLECTION
+    from src.core.lexical import get_index
+
+    index = get_index(PROFILE_COLLECTION)
+    if index is None:
+        return {"error": "Profile data unavailable"}
+
+    hits = index.search(query, max(1, min(limit, _PROFILE_MAX_PASSAGES)))
+    passages = []
+    citations: List[dict] = []
+    for _, doc, _ in hits:
+        passages.append(
+            {"source": doc["source"], "heading": doc["heading"] or None, "text": doc["text"]}
+        )
+        citation = {"kind": doc["kind"], "slug": doc["slug"], "label": doc["label"]}
+        if citation not in citations:
+            citations.append(citation)
+    logger.info("search_profile: %d passages for query '%s'", len(passages), query[:50])
+    if not passages:
+        return {
+            "passages": [],
+            "message": "No matching passages. Try get_education, get_certifications or get_stack_info.",
+        }
+    return {"passages": passages, "_citations": citations}
+
+
 # ── Availability Agent tools ──────────────────────────────────────────────────
 
 
@@ -283,6 +350,8 @@ async def check_availability(
     """
     import httpx
 
+    from src.core.http_client import get_http_client
+
     if not config.calcom_username:
         return {
             "available": None,
@@ -301,11 +370,17 @@ async def check_availability(
         "endTime": f"{end}T23:59:59Z",
     }
 
+    dep = get_dependency(CALCOM)
+
+    async def _fetch_slots() -> dict:
+        response = await get_http_client().get(
+            f"{config.calcom_api_base_url}/v2/slots/available", params=params, timeout=dep.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get("https://api.cal.com/v2/slots/available", params=params)
-            response.raise_for_status()
-            data = response.json()
+        data = await dep.call(_fetch_slots)
 
         slots = data.get("data", {}).get("slots", {})
         available_days = {day: times for day, times in slots.items() if times}
@@ -329,7 +404,7 @@ async def check_availability(
             "booking_url": booking_url,
         }
 
-    except httpx.HTTPError as e:
+    except (httpx.HTTPError, DependencyUnavailable) as e:
         logger.error(f"Cal.com API error: {e}")
         return {
             "available": None,
@@ -392,7 +467,7 @@ def get_projects_tool_function():
     **Specifically lists and describes Lorenzo Maiuri's key projects with links.**
     Useful when a user explicitly asks to see Lorenzo's portfolio, specific project examples, or a list of his work.
     """
-    return search_projects()
+    return search_projects(detail="full")
 
 
 def get_bio_tool_function():
@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core import metrics
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# First-party OpenTelemetry spans (HTTP request, chat turn, session store, dependencies, tools).
+# The SDK ships in the optional `otel` dependency group: without it every helper here is a
+# no-op, and with TRACE_EXPORTER=none (the default unless Phoenix is configured) no
+# provider is installed, so spans cost next to nothing.
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.context import Context
+    from opentelemetry.trace import Link, SpanKind, Status, StatusCode
+except ImportError:  # pragma: no cover - depends on the installed dependency groups
+    otel_trace = None  # type: ignore[assignment]
+
+try:
+    from opentelemetry.sdk.trace import SpanProcessor as _SpanProcessorBase
+    from opentelemetry.sdk.trace.export import SpanExporter as _SpanExporterBase
+    from opentelemetry.sdk.trace.export import SpanExportResult
+except ImportError:  # pragma: no cover
+    _SpanProcessorBase = object  # type: ignore[assignment,misc,unused-ignore]
+    _SpanExporterBase = object  # type: ignore[assignment,misc,unused-ignore]
+
+_KEPT = metrics.counter("traces_kept_total", "Traces exported, by reason (head/error/slow)")
+_DROPPED = metrics.counter("traces_dropped_total", "Traces discarded by the tail sampler")
+
+_tracer = otel_trace.get_tracer("lorenzobot") if otel_trace else None
+_provider: Any = None
+
+
+def head_sampled(trace_id: int, ratio: float) -> bool:
+    """Deterministic per-trace coin flip; the same rule as the SDK's TraceIdRatioBased."""
+    return (trace_id & ((1 << 64) - 1)) < int(ratio * (1 << 64))
+
+
+class TailSamplingProcessor(_SpanProcessorBase):
+    """
+    Exports a trace (to `delegate`, normally a BatchSpanProcessor) if it wins the
+    head-sampling coin flip, contains an errored span, or its local root took longer than
+    `slow_seconds`; everything else is dropped without ever reaching the exporter.
+    The coin flip happens when the root span starts, and a trace is buffered only while it
+    can still qualify as errored or slow: head-sampled traces and traces that already saw
+    an error are forwarded span by span. Buffers are released when the root ends.
+    Memory is bounded by `max_traces` open traces of at most `max_spans` spans each.
+    """
+
+    def __init__(
+        self,
+        delegate,
+        ratio: float,
+        slow_seconds: float,
+        max_traces: int = 1000,
+        max_spans: int = 512,
+    ):
+        self.delegate = delegate
+        self.ratio = ratio
+        self.slow_seconds = slow_seconds
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        # Open, not head-sampled traces: their buffered spans, or None once kept for an error
+        self._traces: "OrderedDict[int, Optional[List[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_root(span) -> bool:
+        return span.parent is None or span.parent.is_remote
+
+    def on_start(self, span, parent_context=None) -> None:
+        trace_id = span.context.trace_id
+        if not self._is_root(span) or head_sampled(trace_id, self.ratio):
+            return
+        with self._lock:
+            self._traces[trace_id] = []
+            if len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+                _DROPPED.inc(reason="overflow")
+
+    def on_end(self, span) -> None:
+        trace_id = span.context.trace_id
+        root = self._is_root(span)
+        if head_sampled(trace_id, self.ratio):
+            if root:
+                _KEPT.inc(reason="head")
+            self.delegate.on_end(span)
+            return
+
+        errored = span.status.status_code == StatusCode.ERROR
+        with self._lock:
+            if trace_id not in self._traces:
+                # Root already ended (or evicted on overflow): nothing left to decide.
+                _DROPPED.inc(reason="late")
+                return
+            spans = self._traces[trace_id]
+            if root:
+                del self._traces[trace_id]
+            elif spans is not None and errored:
+                self._traces[trace_id] = None
+            elif spans is not None:
+                if len(spans) < self.max_spans:
+                    spans.append(span)
+                return
+
+        if spans is None:  # already kept for an error
+            self.delegate.on_end(span)
+            return
+        reason = self.keep_reason(span, errored)
+        if reason is None:
+            _DROPPED.inc(reason="sampled_out")
+            return
+        _KEPT.inc(reason=reason)
+        for buffered in (*spans, span):
+            self.delegate.on_end(buffered)
+
+    def keep_reason(self, span, errored: bool) -> Optional[str]:
+        """Why a trace that lost the coin flip is kept, judged on an errored span or its root."""
+        if errored:
+            return "error"
+        if self._is_root(span) and (span.end_time - span.start_time) / 1e9 >= self.slow_seconds:
+            return "slow"
+        return None
+
+    def shutdown(self) -> None:
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+
+class JsonLinesSpanExporter(_SpanExporterBase):
+    """Appends one JSON span per line to a local file — for testing without a collector."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        lines = "".join(json.dumps(json.loads(s.to_json())) + "\n" for s in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _exporter(kind: str):
+    if kind == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+    if kind == "file":
+        return JsonLinesSpanExporter(config.trace_file)
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    if kind == "phoenix":
+        endpoint = os.getenv("PHOENIX_COLLECTOR_ENDPOINT", "http://localhost:6006")
+        raw = os.getenv("PHOENIX_CLIENT_HEADERS", "")
+        headers = dict(h.split("=", 1) for h in raw.split(",") if "=" in h)
+        return OTLPSpanExporter(endpoint=f"{endpoint.rstrip('/')}/v1/traces", headers=headers)
+    # "otlp": endpoint and headers from the standard OTEL_EXPORTER_OTLP_* variables
+    return OTLPSpanExporter()
+
+
+def setup_tracing() -> bool:
+    """Installs the tracer provider selected by TRACE_EXPORTER. Returns True if enabled."""
+    global _provider
+    kind = config.trace_exporter
+    if kind == "none":
+        logger.info("Tracing disabled (TRACE_EXPORTER=none)")
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(
+            resource=Resource.create(
+                {"service.name": "lorenzobot", "openinference.project.name": "lorenzobot"}
+            )
+        )
+        # Export happens on the batch processor's thread; a missing collector only
+        # costs dropped batches and a log line, never request latency.
+        provider.add_span_processor(
+            TailSamplingProcessor(
+                BatchSpanProcessor(_exporter(kind)),
+                ratio=config.trace_sample_ratio,
+                slow_seconds=config.trace_slow_seconds,
+            )
+        )
+        otel_trace.set_tracer_provider(provider)
+        _provider = provider
+    except Exception as e:
+        logger.warning(f"Tracing skipped: {e}")
+        return False
+
+    if config.trace_llm_spans:
+        try:
+            from openinference.instrumentation.llama_index import LlamaIndexInstrumentor
+
+            LlamaIndexInstrumentor().instrument(tracer_provider=provider)
+        except Exception as e:
+            logger.warning(f"LlamaIndex instrumentation skipped: {e}")
+
+    logger.info(
+        f"Tracing enabled: exporter={kind}, head ratio={config.trace_sample_ratio}, "
+        f"tail keeps errors and turns over {config.trace_slow_seconds}s"
+    )
+    return True
+
+
+def shutdown_tracing() -> None:
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+# ── span helpers ──────────────────────────────────────────────────────────────
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Child span of the current context; exceptions are recorded and mark it as errored."""
+    if _tracer is None or _provider is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as s:
+        yield s
+
+
+@contextmanager
+def detached_span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Root span of a new trace, linked to the current span. For work that outlives the
+    request that started it, whose spans would otherwise end after their parent.
+    """
+    if _tracer is None or _provider is None:
+        yield None
+        return
+    parent = otel_trace.get_current_span().get_span_context()
+    links = [Link(parent)] if parent.is_valid else []
+    with _tracer.start_as_current_span(
+        name, context=Context(), links=links, attributes=attributes
+    ) as s:
+        yield s
+
+
+def mark_error(exc: BaseException) -> None:
+    """Flags the current span as errored for exceptions that are handled, not raised."""
+    if _provider is None:
+        return
+    current = otel_trace.get_current_span()
+    current.record_exception(exc)
+    current.set_status(Status(StatusCode.ERROR, str(exc)))
+
+
+def set_attributes(**attributes: Any) -> None:
+    if _provider is not None:
+        otel_trace.get_current_span().set_attributes(attributes)
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware: one root SERVER span per HTTP request, covering the SSE body."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _provider is None:
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope.get("method", ""), scope.get("path", "")
+        attributes: Dict[str, Any] = {"http.method": method, "http.target": path}
+        with _tracer.start_as_current_span(  # type: ignore[union-attr]
+            f"{method} {path}", kind=SpanKind.SERVER, attributes=attributes
+        ) as root:
+
+            async def send_traced(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        root.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            await self.app(scope, receive, send_traced)
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, Deque, Dict, Optional, Set, Tuple
+
+from src.core import metrics
+from src.core.config import get_config
+
+logger = logging.getLogger(__name__)
+config = get_config()
+
+# A chat turn runs as a task of its own and writes its SSE events into a bounded buffer;
+# HTTP responses only follow that buffer. Every event carries `id: <turn id>:<seq>`, so a
+# client that lost its connection can re-POST with `Last-Event-ID` (or the same
+# `Idempotency-Key`) and continue from where it stopped instead of re-running the
+# workflow. When no client has followed the turn for STREAM_RESUME_GRACE_SECONDS the run
+# is cancelled; finished turns stay replayable for TURN_BUFFER_TTL_SECONDS.
+# Buffers are per process: with several instances, resumes need session affinity.
+
+_RESUMES = metrics.counter(
+    "stream_resumes_total", "Streams attached to an existing turn (last_event_id/idempotency_key)"
+)
+_BUFFERED = metrics.gauge("turn_buffers", "Chat turns held in the in-memory replay buffer")
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """`<turn id>:<seq>` → (turn id, seq); None for anything else."""
+    turn_id, _, seq = (value or "").strip().rpartition(":")
+    if not turn_id or not seq.isdigit():
+        return None
+    return turn_id, int(seq)
+
+
+class Turn:
+    def __init__(
+        self, chat_id: str, message: str, key: Optional[str], max_events: int, grace: float
+    ):
+        self.id = uuid.uuid4().hex
+        self.chat_id = chat_id
+        self.message = message
+        self.key = key
+        self.grace = grace
+        self.finished_at: Optional[float] = None
+        self.abandoned = False
+        self.cancel_reason: Optional[str] = None
+        self.on_abandon: Optional[Callable[[], None]] = None
+        self._events: Deque[str] = deque(maxlen=max_events)
+        self._next_seq = 1
+        self._wake = asyncio.Event()
+        self._subscribers: Set[object] = set()
+        self._abandon_timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def emit(self, event: str, data: dict) -> None:
+        self._events.append(
+            f"id: {self.id}:{self._next_seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+        )
+        self._next_seq += 1
+        self._notify()
+
+    def finish(self, done: dict) -> None:
+        """Emits the final `done` event and marks the turn complete."""
+        self.emit("done", done)
+        self.finished_at = time.monotonic()
+        if self._abandon_timer is not None:
+            self._abandon_timer.cancel()
+        self._notify()
+
+    def _notify(self) -> None:
+        wake, self._wake = self._wake, asyncio.Event()
+        wake.set()
+
+    # ── followers ─────────────────────────────────────────────────────────────
+
+    def subscribe(self) -> object:
+        subscriber = object()
+        self._subscribers.add(subscriber)
+        if self._abandon_timer is not None:
+            self._abandon_timer.cancel()
+            self._abandon_timer = None
+        return subscriber
+
+    def unsubscribe(self, subscriber: object) -> None:
+        """Idempotent. The last follower leaving starts the abandon grace period."""
+        if subscriber not in self._subscribers:
+            return
+        self._subscribers.discard(subscriber)
+        if self._subscribers or self.done:
+            return
+        if self.grace <= 0:
+            self._abandon()
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # generator finalized outside the loop (shutdown)
+            return
+        self._abandon_timer = loop.call_later(self.grace, self._abandon)
+
+    def _abandon(self) -> None:
+        if not self._subscribers:
+            self.cancel("client_disconnect")
+
+    def cancel(self, reason: str) -> None:
+        """Cancels the run, even while clients follow it (e.g. a newer turn superseded it)."""
+        if self.done or self.abandoned:
+            return
+        self.abandoned = True
+        self.cancel_reason = reason
+        if self.on_abandon is not None:
+            self.on_abandon()
+
+    async def follow(self, subscriber: object, after: int = 0) -> AsyncIterator[str]:
+        """Yields the encoded events after sequence number `after`, live until the turn ends."""
+        seq = after + 1
+        try:
+            while True:
+                wake = self._wake
+                while True:
+                    first = self._next_seq - len(self._events)
+                    seq = max(seq, first)  # older events were evicted from the buffer
+                    if seq >= self._next_seq:
+                        break
+                    yield self._events[seq - first]
+                    seq += 1
+                if self.done:
+                    return
+                if wake is not self._wake:  # new events arrived while yielding
+                    continue
+                await wake.wait()
+        finally:
+            self.unsubscribe(subscriber)
+
+
+class TurnRegistry:
+    def __init__(self, ttl: float, max_turns: int, max_events: int, grace: float):
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.max_events = max_events
+        self.grace = grace
+        self._turns: "OrderedDict[str, Turn]" = OrderedDict()
+        self._keys: Dict[str, str] = {}
+        # Idempotency keys of requests still waiting for their chat / an admission slot
+        self._pending: Dict[str, asyncio.Event] = {}
+
+    def reserve(self, key: Optional[str]) -> None:
+        """Marks `key` as taken by a request that hasn't started its turn yet."""
+        if key:
+            self._pending[key] = asyncio.Event()
+
+    def release(self, key: Optional[str]) -> None:
+        """Drops a reservation whose turn never started; no-op once `start` has run."""
+        pending = self._pending.pop(key, None) if key else None
+        if pending is not None:
+            pending.set()
+
+    def pending(self, key: str) -> Optional[asyncio.Event]:
+        """Set once the reserving request has started its turn or given up."""
+        return self._pending.get(key)
+
+    def start(self, chat_id: str, message: str, key: Optional[str] = None) -> Turn:
+        self._purge()
+        turn = Turn(chat_id, message, key, self.max_events, self.grace)
+        self._turns[turn.id] = turn
+        if key:
+            self._keys[key] = turn.id
+            self.release(key)
+        _BUFFERED.set(len(self._turns))
+        return turn
+
+    def get(self, turn_id: str) -> Optional[Turn]:
+        self._purge()
+        return self._turns.get(turn_id)
+
+    def by_key(self, key: str) -> Optional[Turn]:
+        self._purge()
+        turn_id = self._keys.get(key)
+        return self._turns.get(turn_id) if turn_id else None
+
+    def resumed(self, via: str) -> None:
+        _RESUMES.inc(via=via)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        finished = [t for t in self._turns.values() if t.finished_at is not None]
+        expired = [t for t in finished if now - t.finished_at > self.ttl]  # type: ignore[operator]
+        overflow = len(self._turns) - len(expired) - self.max_turns
+        if overflow > 0:
+            expired += [t for t in finished if t not in expired][:overflow]
+        for turn in expired:
+            del self._turns[turn.id]
+            if turn.key and self._keys.get(turn.key) == turn.id:
+                del self._keys[turn.key]
+        if expired:
+            _BUFFERED.set(len(self._turns))
+
+
+registry = TurnRegistry(
+    ttl=config.turn_buffer_ttl_seconds,
+    max_turns=config.turn_buffer_max_turns,
+    max_events=config.turn_buffer_max_events,
+    grace=config.stream_resume_grace_seconds,
+)
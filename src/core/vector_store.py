@@ -1,18 +1,48 @@
+import asyncio
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Mapping, NamedTuple, Optional, Sequence, Tuple
 
-import httpx
 from google.cloud.firestore import AsyncClient
+from google.cloud.firestore_v1.base_query import FieldFilter
 from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
 from google.cloud.firestore_v1.vector import Vector
 
-from src.core.config import Config
+from src.core import embeddings
+from src.core.config import get_config
+from src.core.corpus import (
+    CASE_STUDY_COLLECTION,
+    DOCUMENT_FIELDS,
+    FILTER_FIELDS,
+    PROJECT_COLLECTION,
+)
+from src.core.http_client import get_http_client
+from src.core.resilience import EMBEDDING, FIRESTORE_VECTOR, get_dependency
+from src.core.singleflight import SingleFlight, normalize_query
+
+if TYPE_CHECKING:
+    from src.core.snapshot import EmbeddingSnapshot
 
 logger = logging.getLogger(__name__)
-config = Config()
+config = get_config()
 
 _firestore_client: Optional[AsyncClient] = None
 
+# Result field find_nearest / the snapshot put each match's cosine distance in
+DISTANCE_FIELD = "distance"
+
+# What verify_embedding_indexes checks at startup: "all" (local snapshots and the Firestore
+# index metadata), "snapshot" (local snapshots only) or "off"
+INDEX_CHECKS = ("all", "snapshot", "off")
+
+if config.embedding_index_check not in INDEX_CHECKS:
+    raise ValueError(
+        f"EMBEDDING_INDEX_CHECK must be one of {INDEX_CHECKS}, got {config.embedding_index_check!r}"
+    )
+
+# Identical concurrent searches (e.g. a shared link bringing many visitors with the same
+# question) share one embedding + find_nearest round trip.
+_search_flights: SingleFlight[list[dict]] = SingleFlight("vector_search")
+
 
 def get_vector_db() -> AsyncClient:
     """Returns a lazily-initialised Firestore AsyncClient for vector operations."""
@@ -23,42 +53,162 @@ def get_vector_db() -> AsyncClient:
     return _firestore_client
 
 
+def get_snapshot(collection_name: str) -> Optional["EmbeddingSnapshot"]:
+    """The collection's local embedding snapshot, if EMBEDDING_SNAPSHOT_DIR has one."""
+    if not config.embedding_snapshot_dir:
+        return None
+    # Imported here so numpy stays off the startup path while snapshots are unused.
+    from src.core import snapshot
+
+    return snapshot.get_snapshot(collection_name)
+
+
+def embedding_spec() -> embeddings.EmbeddingSpec:
+    return embeddings.EmbeddingSpec(config.gemini_embedding_model, config.embedding_dimension)
+
+
 async def embed_text(text: str) -> list[float]:
-    """Calls the Google AI embedding REST endpoint and returns the vector."""
-    model = config.gemini_embedding_model
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:embedContent"
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.post(
-            url,
-            params={"key": config.gemini_api_key},
-            json={"model": f"models/{model}", "content": {"parts": [{"text": text}]}},
-        )
-        resp.raise_for_status()
-    return resp.json()["embedding"]["values"]
+    """
+    Embeds `text` with the same client, model and dimension scripts/ingest.py indexes with;
+    returns a unit vector. Guarded by the `embedding` dependency budget / circuit breaker
+    (see resilience.py).
+    """
+    # Built per call: tests and benchmarks repoint GEMINI_API_BASE_URL at runtime.
+    client = embeddings.EmbeddingClient(
+        embedding_spec(), config.gemini_api_key, config.gemini_api_base_url
+    )
+    dep = get_dependency(EMBEDDING)
+
+    async def _request() -> list[float]:
+        return await client.embed(get_http_client(), text, dep.timeout)
+
+    return await dep.call(_request)
+
+
+async def verify_embedding_indexes() -> None:
+    """
+    Raises EmbeddingIndexMismatch when a collection's index was built with another embedding
+    model or dimension than embed_text uses, so the app refuses to start instead of ranking
+    with incompatible vectors. Each collection is checked where its vectors are served from:
+    its snapshot, or else its Firestore metadata document (unless EMBEDDING_INDEX_CHECK is
+    "snapshot" or nothing queries Firestore). An unreadable index is only logged.
+    """
+    if config.embedding_index_check == "off":
+        return
+    spec = embedding_spec()
+    remote = []
+    for collection in (CASE_STUDY_COLLECTION, PROJECT_COLLECTION):
+        local = get_snapshot(collection)
+        if local is not None:
+            embeddings.check_fingerprint(f"Snapshot {local.directory}", local.fingerprint, spec)
+        elif config.embedding_index_check == "all" and config.retrieval_mode != "lexical":
+            remote.append(collection)
+
+    # Metadata documents are read concurrently: one round trip before ready, not one each.
+    stored = await asyncio.gather(*map(_index_fingerprint, remote), return_exceptions=True)
+    for collection, fingerprint in zip(remote, stored, strict=True):
+        if isinstance(fingerprint, BaseException):
+            logger.warning(f"Can't read the {collection} index fingerprint: {fingerprint}")
+            continue
+        embeddings.check_fingerprint(f"Firestore collection {collection}", fingerprint, spec)
+
+
+async def _index_fingerprint(collection_name: str) -> Optional[str]:
+    async def _read():
+        ref = get_vector_db().collection(embeddings.INDEX_COLLECTION).document(collection_name)
+        return await ref.get()
+
+    doc = await get_dependency(FIRESTORE_VECTOR).call(_read)
+    return (doc.to_dict() or {}).get("fingerprint") if doc.exists else None
+
+
+class SearchOptions(NamedTuple):
+    """A vector query's options, normalised so equal searches share a single-flight key."""
+
+    filters: Tuple[Tuple[str, str], ...]
+    fields: Optional[Tuple[str, ...]]
+    distance_threshold: Optional[float]
 
 
 async def vector_search(
     collection_name: str,
     query: str,
     n_results: int = 3,
+    filters: Optional[Mapping[str, str]] = None,
+    fields: Optional[Sequence[str]] = None,
+    distance_threshold: Optional[float] = None,
 ) -> list[dict]:
     """
-    Embeds `query` and runs Firestore find_nearest on `collection_name`.
-    Returns a list of document dicts (excluding the embedding field).
-    Raises RuntimeError if the vector index doesn't exist yet — caller should handle gracefully.
+    Embeds `query` and runs Firestore find_nearest on `collection_name`, or ranks the
+    collection's local embedding snapshot when EMBEDDING_SNAPSHOT_DIR has one.
+    `filters` restricts the search to documents whose FILTER_FIELDS equal the given values
+    (applied before the nearest-neighbour search), `fields` overrides the projection
+    (DOCUMENT_FIELDS by default; the embedding is never fetched), and `distance_threshold`
+    (VECTOR_DISTANCE_THRESHOLD by default) drops matches further away than that cosine
+    distance. Returns document dicts with their cosine distance under DISTANCE_FIELD.
+    Concurrent calls with the same (collection, normalized query, options) are coalesced.
+    Raises FailedPrecondition if the vector index doesn't exist yet (a filtered search needs
+    a composite index with the filter field), or DependencyUnavailable when a dependency is
+    over budget / its circuit is open — callers should handle both gracefully.
     """
+    filters = dict(filters or {})
+    unknown = set(filters) - set(FILTER_FIELDS.get(collection_name, ()))
+    if unknown:
+        raise ValueError(f"{collection_name} can't be filtered on {sorted(unknown)}")
+    if fields is None:
+        fields = DOCUMENT_FIELDS.get(collection_name)
+    if distance_threshold is None:
+        distance_threshold = config.vector_distance_threshold or None
+    options = SearchOptions(
+        tuple(sorted(filters.items())), tuple(fields) if fields else None, distance_threshold
+    )
+    key = (collection_name, normalize_query(query), n_results, options)
+    docs = await _search_flights.do(
+        key, lambda: _vector_search(collection_name, query, n_results, options)
+    )
+    # Callers share the result list; hand each one its own copies.
+    return [dict(doc) for doc in docs]
+
+
+def nearest_query(
+    db: AsyncClient,
+    collection_name: str,
+    embedding: Sequence[float],
+    n_results: int,
+    options: SearchOptions,
+) -> Any:
+    """The find_nearest query for `options`: equality pre-filters, projection, distances."""
+    query: Any = db.collection(collection_name)
+    for field, value in options.filters:
+        query = query.where(filter=FieldFilter(field, "==", value))
+    if options.fields:
+        # The distance only comes back with a projection if the projection names it
+        query = query.select((*options.fields, DISTANCE_FIELD))
+    return query.find_nearest(
+        vector_field="embedding",
+        query_vector=Vector(list(embedding)),
+        distance_measure=DistanceMeasure.COSINE,
+        limit=n_results,
+        distance_result_field=DISTANCE_FIELD,
+        distance_threshold=options.distance_threshold,
+    )
+
+
+async def _vector_search(
+    collection_name: str, query: str, n_results: int, options: SearchOptions
+) -> list[dict]:
     embedding = await embed_text(query)
+    local = get_snapshot(collection_name)
+    if local is not None:
+        # A scan over a few hundred mmapped rows is cheaper than the find_nearest round trip.
+        hits = local.search(embedding, n_results, dict(options.filters), options.distance_threshold)
+        return [{**doc, DISTANCE_FIELD: distance} for _, doc, distance in hits]
     db = get_vector_db()
 
-    results = await (
-        db.collection(collection_name)
-        .find_nearest(
-            vector_field="embedding",
-            query_vector=Vector(embedding),
-            distance_measure=DistanceMeasure.COSINE,
-            limit=n_results,
-        )
-        .get()
-    )
+    async def _query():
+        return await nearest_query(db, collection_name, embedding, n_results, options).get()
+
+    results = await get_dependency(FIRESTORE_VECTOR).call(_query)
 
+    # Without a projection (unknown collection) the embedding still comes back; drop it.
     return [{k: v for k, v in doc.to_dict().items() if k != "embedding"} for doc in results]
@@ -6,12 +6,35 @@ logger = logging.getLogger(__name__)
 
 _BASE_DIR = os.path.join(os.path.dirname(__file__), "..", "..")
 
+# Parsed data files keyed by path, validated against the file's mtime on every read so
+# edits to data/ are still picked up without a redeploy. Cached values are shared:
+# callers must treat them as read-only.
+_data_cache: dict[str, tuple[int, bool, object]] = {}
+
+DATA_FILES = {
+    "bio.txt": False,
+    "case_studies.json": True,
+    "certifications.json": True,
+    "contact.json": True,
+    "education.json": True,
+    "engagement.json": True,
+    "projects.json": True,
+    "skills.json": True,
+    "work_experience.json": True,
+}
+
 
 def _read_data_file(filename: str, is_json: bool = False):
     filepath = os.path.join(_BASE_DIR, "data", filename)
     try:
+        mtime = os.stat(filepath).st_mtime_ns
+        cached = _data_cache.get(filepath)
+        if cached and cached[0] == mtime and cached[1] == is_json:
+            return cached[2]
         with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f) if is_json else f.read()
+            data = json.load(f) if is_json else f.read()
+        _data_cache[filepath] = (mtime, is_json, data)
+        return data
     except FileNotFoundError:
         logger.error(f"Data file not found: {filepath}")
         return "Information currently unavailable."
@@ -34,3 +57,10 @@ def load_prompt(name: str) -> str:
     except Exception as e:
         logger.error(f"Error reading prompt {filepath}: {e}")
         return ""
+
+
+def load_catalog() -> int:
+    """Reads and caches every data file up front (startup prewarm). Returns the file count."""
+    for filename, is_json in DATA_FILES.items():
+        _read_data_file(filename, is_json=is_json)
+    return len(DATA_FILES)
@@ -1,5 +1,7 @@
+import asyncio
 import json
 import os
+import time
 
 import pytest
 import pytest_asyncio
@@ -19,8 +21,20 @@ if not TEST_API_KEY:
     pytest.skip("API_KEY not set in .env, skipping tests", allow_module_level=True)
 
 
+@pytest.fixture(autouse=True)
+def fresh_dependencies(monkeypatch):
+    """Fresh circuit breakers per test: a breaker opened by one test mustn't leak into the next."""
+    from src.core import resilience
+
+    monkeypatch.setattr(resilience, "_dependencies", {})
+
+
 @pytest_asyncio.fixture(scope="function")
-async def client():
+async def client(monkeypatch):
+    from src.core.config import get_config
+
+    # No Firestore index reads at startup; the check has a test of its own below.
+    monkeypatch.setattr(get_config(), "embedding_index_check", "off")
     async with LifespanManager(app) as manager:
         transport = ASGITransport(app=manager.app)
         async with AsyncClient(transport=transport, base_url=BASE_URL) as ac:
@@ -92,7 +106,7 @@ def test_search_projects_by_category():
 def test_search_projects_by_stack():
     from src.core.tools import search_projects
 
-    result = search_projects(stack="Python")
+    result = search_projects(stack="Python", detail="full")
     assert len(result["projects"]) > 0
     for p in result["projects"]:
         assert any("Python" in t for t in p["technologies"])
@@ -101,12 +115,28 @@ def test_search_projects_by_stack():
 def test_search_projects_by_type():
     from src.core.tools import search_projects
 
-    personal = search_projects(type="personal")
-    professional = search_projects(type="professional")
+    personal = search_projects(type="personal", fields=["type"])
+    professional = search_projects(type="professional", fields=["type"])
     assert all(p["type"] == "personal" for p in personal["projects"])
     assert all(p["type"] == "professional" for p in professional["projects"])
 
 
+def test_search_projects_compact_by_default():
+    from src.core.tools import search_projects
+
+    result = search_projects()
+    for p in result["projects"]:
+        assert set(p) <= {"slug", "title", "summary", "category"}
+
+
+def test_search_projects_fields_drill_down():
+    from src.core.tools import search_projects
+
+    result = search_projects(fields=["technologies"])
+    for p in result["projects"]:
+        assert set(p) == {"slug", "technologies"}
+
+
 def test_get_project_details_found():
     from src.core.tools import get_project_details
 
@@ -136,6 +166,29 @@ def test_get_case_study_found():
     assert result["_citations"][0]["kind"] == "case-study"
 
 
+def test_get_case_study_sections():
+    from src.core.tools import get_case_study
+
+    summary = get_case_study("ai-customer-support-chatbot")["case_study"]
+    assert "decisions" not in summary
+
+    full = get_case_study("ai-customer-support-chatbot", detail="full")["case_study"]
+    assert "decisions" in full
+
+    only = get_case_study("ai-customer-support-chatbot", fields=["retrospective"])["case_study"]
+    assert set(only) == {"slug", "retrospective"}
+
+
+def test_shape_tool_output_caps_tokens(monkeypatch):
+    from src.core import tool_output
+
+    monkeypatch.setattr(tool_output.config, "tool_output_max_tokens", 10)
+    text = tool_output.shape_tool_output("search_projects", {"projects": ["x" * 500]})
+    assert text.startswith('{"projects":')
+    assert "[truncated:" in text
+    assert len(text) < 200
+
+
 def test_get_case_study_not_found():
     from src.core.tools import get_case_study
 
@@ -223,6 +276,1219 @@ def test_trigger_contact_action():
     assert result["_action"]["action_type"] == "open_contact_modal"
 
 
+# ── tool wrapper ──────────────────────────────────────────────────────────────
+
+
+class _RecordingContext:
+    """Stands in for the workflow Context: records events written to the stream."""
+
+    def __init__(self):
+        self.events = []
+
+    def write_event_to_stream(self, event):
+        self.events.append(event)
+
+
+@pytest.mark.asyncio
+async def test_tool_wrapper_publishes_citations_out_of_band():
+    from src.core.agent_orchestrator import ToolArtifacts, _tool
+    from src.core.tools import get_project_details
+
+    ctx = _RecordingContext()
+    tool = _tool(get_project_details, "get_project_details")
+    assert "ctx" not in tool.metadata.fn_schema.model_json_schema()["properties"]
+
+    output = await tool.acall(ctx=ctx, slug="news-chatbot")
+    payload = json.loads(output.content)
+    assert "_citations" not in payload
+    assert payload["project"]["slug"] == "news-chatbot"
+
+    [artifacts] = ctx.events
+    assert isinstance(artifacts, ToolArtifacts)
+    assert artifacts.citations[0] == {
+        "kind": "project",
+        "slug": "news-chatbot",
+        "label": payload["project"]["title"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_tool_wrapper_publishes_action():
+    from src.core.agent_orchestrator import _tool
+    from src.core.tools import trigger_contact_action
+
+    ctx = _RecordingContext()
+    output = await _tool(trigger_contact_action, "trigger_contact_action").acall(ctx=ctx)
+    assert "_action" not in json.loads(output.content)
+    assert ctx.events[0].action["action_type"] == "open_contact_modal"
+
+
+@pytest.mark.asyncio
+async def test_blocking_tool_does_not_stall_other_streams():
+    """A slow sync tool runs on the tool pool while other streams keep getting ticks."""
+    import asyncio
+    import gc
+    import time
+
+    from src.core.agent_orchestrator import _tool
+
+    def slow_tool() -> dict:
+        """Blocks for a while, like a cold file read."""
+        time.sleep(0.3)
+        return {"ok": True}
+
+    gaps: list[float] = []
+
+    async def token_stream():
+        last = time.perf_counter()
+        for _ in range(30):
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    gc.collect()  # a full collection mid-measurement would stall the loop, not the tool
+    tool = _tool(slow_tool, "slow_tool")
+    output, _ = await asyncio.gather(tool.acall(ctx=_RecordingContext()), token_stream())
+    assert json.loads(output.content) == {"ok": True}
+    assert max(gaps) < 0.1
+
+
+@pytest.mark.asyncio
+async def test_tool_memo_reuses_results_within_a_turn_and_session(monkeypatch):
+    from src.core import tool_memo
+    from src.core.agent_orchestrator import _tool
+    from src.core.tool_memo import MemoScope
+
+    calls: list[str] = []
+
+    def lookup(slug: str, detail: str = "summary") -> dict:
+        """Reads a project."""
+        calls.append(slug)
+        return {"slug": slug, "_citations": [{"kind": "project", "slug": slug}]}
+
+    def side_effect() -> dict:
+        """Opens the contact form."""
+        calls.append("contact")
+        return {"ok": True}
+
+    monkeypatch.setattr(tool_memo.config, "tool_memo_scope", "session")
+    cached = _tool(lookup, "lookup", memo=MemoScope.SESSION)
+    uncached = _tool(side_effect, "contact", memo=MemoScope.NONE)
+    ctx = _RecordingContext()
+
+    memo = tool_memo.start("chat-1")
+    first = await cached.acall(ctx=ctx, slug="rag")
+    again = await cached.acall(ctx=ctx, slug="rag", detail="summary")  # same call, defaults applied
+    await uncached.acall(ctx=ctx)
+    await uncached.acall(ctx=ctx)
+    assert again.content == first.content and len(ctx.events) == 2  # citations re-published
+    assert calls == ["rag", "contact", "contact"] and memo.hits == {"lookup": 1}
+
+    tool_memo.start("chat-1")  # next turn on the same chat
+    await cached.acall(ctx=ctx, slug="rag")
+    tool_memo.start("chat-2")
+    await cached.acall(ctx=ctx, slug="rag")
+    assert calls == ["rag", "contact", "contact", "rag"]
+
+
+@pytest.mark.asyncio
+async def test_tool_memo_never_keeps_error_results(monkeypatch):
+    from src.core import tool_memo
+    from src.core.agent_orchestrator import _tool
+    from src.core.tool_memo import MemoScope
+
+    outcomes = [{"error": "Search failed."}, {"error": "Search failed."}, {"results": []}]
+
+    def search(query: str) -> dict:
+        """Searches case studies."""
+        return outcomes.pop(0)
+
+    monkeypatch.setattr(tool_memo.config, "tool_memo_scope", "session")
+    tool = _tool(search, "search", memo=MemoScope.SESSION)
+    ctx = _RecordingContext()
+
+    memo = tool_memo.start("chat-1")
+    assert "error" in (await tool.acall(ctx=ctx, query="rag")).content
+    assert "error" in (await tool.acall(ctx=ctx, query="rag")).content  # ran again
+    next_turn = tool_memo.start("chat-1")
+    assert "results" in (await tool.acall(ctx=ctx, query="rag")).content
+    assert outcomes == [] and memo.hits == {} and next_turn.hits == {}
+
+
+def test_metrics_registry_renders_prometheus_text():
+    from src.core.metrics import MetricsRegistry, _Metric
+
+    registry = MetricsRegistry()
+    registry.counter("calls_total", "Calls").inc(tool="a")
+    registry.gauge("pool_size", "Pool").set(4)
+    registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5)
+    text = registry.render_prometheus()
+    assert '# TYPE calls_total counter\ncalls_total{tool="a"} 1.0' in text
+    assert "pool_size 4" in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert "latency_seconds_count 1" in text
+
+    registry.counter("errors_total", "Errors\nby path").inc(path='C:\\a "b"\nc')
+    text = registry.render_prometheus()
+    assert "# HELP errors_total Errors\\nby path" in text
+    assert 'errors_total{path="C:\\\\a \\"b\\"\\nc"} 1.0' in text
+    with pytest.raises(TypeError):
+        _Metric("abstract", "Not instantiable")  # type: ignore[abstract]
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_reports_phases():
+    from fastapi import FastAPI
+
+    from src.core import timing
+
+    mini = FastAPI()
+    mini.add_middleware(timing.ServerTimingMiddleware)
+
+    @mini.get("/t")
+    async def timed():
+        with timing.phase("session"):
+            pass
+        timing.record_tool("get_core_stack", 0.002)
+        return {"timings": timing.current().to_dict()}
+
+    async with AsyncClient(transport=ASGITransport(app=mini), base_url=BASE_URL) as ac:
+        r = await ac.get("/t")
+    header = r.headers["server-timing"]
+    assert header.startswith("session;dur=")
+    assert "tool-get_core_stack;dur=2.0" in header
+    assert header.split(", ")[-1].startswith("total;dur=")
+    assert r.json()["timings"]["tools"] == [{"tool": "get_core_stack", "ms": 2.0}]
+
+
+def test_tail_sampler_keeps_errored_and_slow_traces():
+    pytest.importorskip("opentelemetry.trace")
+    from types import SimpleNamespace
+
+    from opentelemetry.trace import StatusCode
+
+    from src.core.tracing import TailSamplingProcessor, head_sampled
+
+    def fake_span(trace_id, root, seconds=0.1, error=False):
+        return SimpleNamespace(
+            context=SimpleNamespace(trace_id=trace_id),
+            parent=None if root else SimpleNamespace(is_remote=False),
+            status=SimpleNamespace(status_code=StatusCode.ERROR if error else StatusCode.UNSET),
+            start_time=0,
+            end_time=int(seconds * 1e9),
+        )
+
+    exported = []
+    delegate = SimpleNamespace(on_end=exported.append)
+    sampler = TailSamplingProcessor(delegate, ratio=0.0, slow_seconds=5)
+
+    def trace(trace_id, *spans):
+        sampler.on_start(fake_span(trace_id, root=True))
+        for s in spans:
+            sampler.on_end(s)
+
+    trace(1, fake_span(1, root=False), fake_span(1, root=True))  # fast, clean: dropped
+    trace(2, fake_span(2, root=False), fake_span(2, root=False, error=True))
+    assert [s.context.trace_id for s in exported] == [2, 2]  # kept as soon as it errors
+    sampler.on_end(fake_span(2, root=False))  # not buffered any more
+    assert len(exported) == 3 and sampler._traces == {2: None}
+    sampler.on_end(fake_span(2, root=True))
+    trace(3, fake_span(3, root=True, seconds=6))  # slow: kept
+    sampler.on_end(fake_span(3, root=False))  # ended after its root: dropped
+    assert [s.context.trace_id for s in exported] == [2, 2, 2, 2, 3]
+    assert sampler._traces == {}
+
+    head = TailSamplingProcessor(delegate, ratio=1.0, slow_seconds=5)
+    head.on_start(fake_span(4, root=True))
+    head.on_end(fake_span(4, root=False))
+    assert exported[-1].context.trace_id == 4 and head._traces == {}  # never buffered
+
+    assert head_sampled(123, 1.0) and not head_sampled(123, 0.0)
+    assert head_sampled(5, 0.5) == head_sampled(5, 0.5)
+
+
+@pytest.mark.asyncio
+async def test_profiler_records_speedscope_for_header_requests(monkeypatch):
+    from fastapi import FastAPI
+
+    from src.core import profiler
+
+    monkeypatch.setattr(profiler.config, "profiler_token", "secret")
+    monkeypatch.setattr(profiler, "profiles", profiler.ProfileStore(keep=5, max_concurrent=1))
+    mini = FastAPI()
+    mini.add_middleware(profiler.ProfilerMiddleware)
+
+    def busy_loop():
+        end = time.perf_counter() + 0.1
+        while time.perf_counter() < end:
+            pass
+
+    @mini.post("/api/v1/chat")
+    async def chat():
+        busy_loop()
+        return {}
+
+    async with AsyncClient(transport=ASGITransport(app=mini), base_url=BASE_URL) as ac:
+        plain = await ac.post("/api/v1/chat")
+        wrong = await ac.post("/api/v1/chat", headers={"X-Debug-Profile": "nope"})
+        r = await ac.post("/api/v1/chat", headers={"X-Debug-Profile": "secret"})
+        profiler.profiles.max_concurrent = 0
+        busy = await ac.post("/api/v1/chat", headers={"X-Debug-Profile": "secret"})
+
+    assert "x-profile-id" not in plain.headers and "x-profile-id" not in wrong.headers
+    assert busy.headers["x-profile-id"] == "busy"
+    profile = profiler.profiles.get(r.headers["x-profile-id"])
+    assert profile is not None and profiler.profiles.running == 0
+    speedscope = profile.to_speedscope()
+    names = [f["name"] for f in speedscope["shared"]["frames"]]
+    samples = speedscope["profiles"][0]["samples"]
+    assert samples and any(names[s[-1]].endswith("busy_loop") for s in samples)
+
+
+@pytest.mark.asyncio
+async def test_admission_queues_then_sheds():
+    from src.core.admission import AdmissionController, Saturated
+
+    governor = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.05)
+    first = await governor.acquire()
+
+    queued = asyncio.create_task(governor.acquire())
+    await asyncio.sleep(0)
+    assert governor.queue_depth == 1
+    with pytest.raises(Saturated) as full:
+        await governor.acquire()
+    assert full.value.reason == "queue_full" and full.value.retry_after >= 1
+
+    first.release()
+    first.release()  # idempotent
+    second = await queued
+    assert governor.in_flight == 1 and governor.queue_depth == 0
+
+    with pytest.raises(Saturated) as late:
+        await governor.acquire()
+    assert late.value.reason == "timeout"
+    second.release()
+    assert governor.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_lock_policies_serialize_turns_per_chat():
+    from src.core.chat_lock import ChatBusy, ChatLocks
+    from src.core.turns import Turn
+
+    queue = ChatLocks("queue", queue_timeout=1, lease_seconds=0)
+    first = await queue.acquire("c1")
+    other_chat = await queue.acquire("c2")  # other chats are unaffected
+    second = asyncio.create_task(queue.acquire("c1"))
+    await asyncio.sleep(0.01)
+    assert not second.done()
+    first.release()
+    (await second).release()
+    other_chat.release()
+    assert not queue.busy("c1")
+
+    reject = ChatLocks("reject", queue_timeout=1, lease_seconds=0)
+    held = await reject.acquire("c1")
+    with pytest.raises(ChatBusy):
+        await reject.acquire("c1")
+    held.release()
+
+    cancel = ChatLocks("cancel", queue_timeout=1, lease_seconds=0)
+    held = await cancel.acquire("c1")
+    held.turn = Turn("c1", "first", None, max_events=10, grace=0)
+    held.turn.on_abandon = held.release  # the run stops and frees the chat
+    newer = await cancel.acquire("c1")
+    assert held.turn.abandoned and held.turn.cancel_reason == "superseded"
+    newer.release()
+
+
+@pytest.mark.asyncio
+async def test_chat_lock_waiter_giving_up_does_not_let_the_next_one_overtake():
+    from src.core.chat_lock import ChatBusy, ChatLocks
+
+    locks = ChatLocks("queue", queue_timeout=0.05, lease_seconds=0)
+    a = await locks.acquire("c1")
+    b = asyncio.create_task(locks.acquire("c1"))
+    await asyncio.sleep(0)
+    locks.queue_timeout = 1  # C is queued behind B, and outlasts B's wait
+    c = asyncio.create_task(locks.acquire("c1"))
+    with pytest.raises(ChatBusy, match="timeout"):
+        await b
+    await asyncio.sleep(0.05)
+    assert not c.done() and locks.busy("c1")  # A still holds the chat
+
+    a.release()
+    (await asyncio.wait_for(c, 0.5)).release()
+    assert not locks.busy("c1")
+
+    # Same for a waiter whose request is cancelled
+    a = await locks.acquire("c1")
+    b = asyncio.create_task(locks.acquire("c1"))
+    await asyncio.sleep(0)
+    c = asyncio.create_task(locks.acquire("c1"))
+    await asyncio.sleep(0)
+    b.cancel()
+    await asyncio.sleep(0.01)
+    assert not c.done()
+    a.release()
+    (await asyncio.wait_for(c, 0.5)).release()
+
+
+# ── resilience (local fault-injecting stand-ins) ──────────────────────────────
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens_and_recovers():
+    from src.core.resilience import _BREAKER_STATE, CircuitBreaker, CircuitOpenError, Dependency
+
+    clock = _FakeClock()
+    dep = Dependency("fake", timeout=1.0, breaker=CircuitBreaker("fake", 2, 30, clock=clock))
+
+    async def failing():
+        raise ConnectionError("boom")
+
+    async def healthy():
+        return "ok"
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await dep.call(failing)
+    assert dep.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        await dep.call(healthy)
+
+    clock.now += 31
+    assert dep.breaker.state == "half_open"
+    assert _BREAKER_STATE.value(dependency="fake") == 1  # before any call comes in
+    assert await dep.call(healthy) == "ok"
+    assert dep.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_breaker_counts_server_errors_but_not_client_errors():
+    import httpx
+
+    from src.core.resilience import CircuitBreaker, Dependency
+
+    dep = Dependency("picky", timeout=1.0, breaker=CircuitBreaker("picky", 1, 30))
+    request = httpx.Request("POST", "http://embed/")
+
+    def status_error(code: int) -> httpx.HTTPStatusError:
+        response = httpx.Response(code, request=request)
+        return httpx.HTTPStatusError(str(code), request=request, response=response)
+
+    for code in (400, 403):
+
+        async def rejected(code=code):
+            raise status_error(code)
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await dep.call(rejected)
+        assert dep.breaker.state == "closed"
+
+    async def server_error():
+        raise status_error(503)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await dep.call(server_error)
+    assert dep.breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_dependency_timeout_budget():
+    import asyncio
+
+    from src.core.resilience import Dependency, DependencyTimeout
+
+    async def stalled():
+        await asyncio.sleep(5)
+
+    with pytest.raises(DependencyTimeout):
+        await Dependency("stalled", timeout=0.05).call(stalled)
+
+
+@pytest.mark.asyncio
+async def test_dependency_hedges_slow_first_attempt():
+    import asyncio
+    import time
+
+    from src.core.resilience import Dependency, LatencyWindow
+
+    latencies = LatencyWindow(min_samples=1)
+    latencies.add(0.02)
+    dep = Dependency("hedged", timeout=2.0, hedge=True, latencies=latencies)
+    attempts = []
+
+    async def sometimes_slow():
+        attempts.append(1)
+        await asyncio.sleep(1.0 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+
+    start = time.perf_counter()
+    assert await dep.call(sometimes_slow) == 2
+    assert time.perf_counter() - start < 0.5
+
+
+@pytest.mark.asyncio
+async def test_semantic_search_fails_fast_when_circuit_open(monkeypatch):
+    from src.core import resilience, retrieval
+    from src.core.tools import search_case_study_content
+
+    # Vector-only: in hybrid mode the BM25 results would be served instead.
+    monkeypatch.setattr(retrieval.config, "retrieval_mode", "vector")
+    breaker = resilience.CircuitBreaker("embedding", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    dep = resilience.Dependency("embedding", timeout=1.0, breaker=breaker)
+    monkeypatch.setitem(resilience._dependencies, resilience.EMBEDDING, dep)
+
+    result = await search_case_study_content("Why Firestore?")
+    assert result == {"error": "Search failed. Use get_case_study as a fallback."}
+
+
+# ── single-flight ─────────────────────────────────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_vector_search_coalesces_identical_queries(monkeypatch):
+    import asyncio
+
+    from src.core import vector_store
+
+    calls = []
+
+    async def fake_search(collection_name, query, n_results, options):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return [{"slug": "news-chatbot", "content": "..."}]
+
+    monkeypatch.setattr(vector_store, "_vector_search", fake_search)
+    results = await asyncio.gather(
+        vector_store.vector_search("case_study_embeddings", "Why Firestore?"),
+        vector_store.vector_search("case_study_embeddings", "  why firestore? "),
+        vector_store.vector_search("case_study_embeddings", "WHY FIRESTORE?"),
+        vector_store.vector_search("project_embeddings", "Why Firestore?"),
+    )
+    assert len(calls) == 2
+    assert all(r == [{"slug": "news-chatbot", "content": "..."}] for r in results)
+    assert results[0] is not results[1]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_retrieval_fuses_bm25_with_vector_and_falls_back(monkeypatch):
+    from src.core import retrieval, vector_store
+    from src.core.lexical import get_index, reciprocal_rank_fusion
+    from src.core.resilience import DependencyUnavailable
+
+    top = get_index("case_study_embeddings").search("Airflow", 2)
+    assert {doc["slug"] for _, doc, _ in top} == {
+        "data-warehouse-modernization",
+        "logistics-anomaly",
+    }
+    fused = reciprocal_rank_fusion([[("a", {}), ("b", {})], [("b", {}), ("c", {})]])
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "c"]
+
+    vector_calls = []
+    vector_hit = {"slug": "lorenzobot", "section": "decision_2", "content": "Firestore"}
+
+    async def fake_vector_search(collection_name, query, n_results, filters=None):
+        vector_calls.append(query)
+        if "down" in query:
+            raise DependencyUnavailable("embedding", "circuit open")
+        return [vector_hit]
+
+    monkeypatch.setattr(vector_store, "vector_search", fake_vector_search)
+    monkeypatch.setattr(retrieval.config, "retrieval_mode", "hybrid")
+
+    short = await retrieval.search("case_study_embeddings", "ChromaDB")
+    assert short[0]["slug"] == "ai-customer-support-chatbot" and vector_calls == []
+
+    fused_docs = await retrieval.search("case_study_embeddings", "Why pick Firestore over MongoDB?")
+    assert fused_docs[0]["slug"] == "lorenzobot" and len(fused_docs) == 3
+
+    fallback = await retrieval.search("case_study_embeddings", "Oracle PostgreSQL migration down")
+    assert fallback[0]["slug"] == "data-warehouse-modernization" and len(vector_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_embedding_snapshot_is_quantized_mmapped_and_serves_vector_search(
+    monkeypatch, tmp_path
+):
+    import numpy as np
+
+    from benchmarks.fakes import fake_embedding
+    from src.core import snapshot, vector_store
+    from src.core.corpus import PROJECT_COLLECTION, project_chunks
+    from src.utils.utils import _read_data_file
+
+    chunks = project_chunks(_read_data_file("projects.json", True))
+    embeddings = [fake_embedding(doc["content"]) for _, doc in chunks]
+    reference = snapshot.EmbeddingSnapshot(
+        snapshot.write_snapshot(tmp_path / "f32", chunks, embeddings, "float32")
+    )
+    directory = snapshot.write_snapshot(
+        tmp_path / PROJECT_COLLECTION, chunks, embeddings, "int8", fingerprint="m/768/l2"
+    )
+    local = snapshot.EmbeddingSnapshot(directory)
+    assert isinstance(local._vectors, np.memmap) and local._vectors.dtype == np.int8
+    assert local.nbytes * 3 < reference.nbytes
+
+    query = fake_embedding("Italian NLP transformer")
+    assert [h[0] for h in local.search(query, 3)] == [h[0] for h in reference.search(query, 3)]
+    doc_id, doc, _ = local.search(embeddings[5], 1)[0]
+    assert doc_id == chunks[5][0] and doc == chunks[5][1]
+
+    meta = json.loads((directory / "meta.json").read_text())
+    (tmp_path / "old").mkdir()
+    (tmp_path / "old" / "meta.json").write_text(json.dumps({**meta, "version": 0}))
+    with pytest.raises(ValueError, match="re-run scripts/ingest.py"):
+        snapshot.EmbeddingSnapshot(tmp_path / "old")
+
+    async def fake_embed(text):
+        return fake_embedding(text)
+
+    def no_firestore():
+        raise AssertionError("find_nearest should not run with a snapshot")
+
+    monkeypatch.setattr(snapshot, "_snapshots", {})
+    monkeypatch.setattr(snapshot.get_config(), "embedding_snapshot_dir", str(tmp_path))
+    monkeypatch.setattr(vector_store, "embed_text", fake_embed)
+    monkeypatch.setattr(vector_store, "get_vector_db", no_firestore)
+    docs = await vector_store.vector_search(PROJECT_COLLECTION, chunks[5][1]["content"], 2)
+    assert docs[0].pop("distance") < 0.01 and docs[0] == chunks[5][1]
+
+
+@pytest.mark.asyncio
+async def test_embedding_client_and_index_fingerprints_match_or_refuse_startup(
+    monkeypatch, tmp_path
+):
+    import math
+
+    from benchmarks.fakes import InMemoryFirestore, fake_embedding
+    from src.core import snapshot, vector_store
+    from src.core.config import Config
+    from src.core.corpus import PROJECT_COLLECTION, project_chunks
+    from src.core.embeddings import (
+        EmbeddingClient,
+        EmbeddingIndexMismatch,
+        EmbeddingSpec,
+    )
+    from src.utils.utils import _read_data_file
+
+    with pytest.raises(ValueError, match="EMBEDDING_DIMENSION"):
+        EmbeddingSpec("gemini-embedding-2", 300)
+    client = EmbeddingClient(EmbeddingSpec("gemini-embedding-2", 256), "k", "http://e/")
+    url, kwargs = client.request("hello")
+    assert url == "http://e/v1beta/models/gemini-embedding-2:embedContent"
+    assert kwargs["json"]["outputDimensionality"] == 256
+    vector = client.parse({"embedding": {"values": [3.0, 4.0] + [0.0] * 254}})
+    assert vector[:2] == [0.6, 0.8] and math.isclose(sum(v * v for v in vector), 1.0)
+    with pytest.raises(ValueError, match="returned 768 dimensions"):
+        client.parse({"embedding": {"values": [1.0] * 768}})
+
+    monkeypatch.delenv("EMBEDDING_INDEX_CHECK", raising=False)
+    assert Config().embedding_index_check == "all"  # Firestore is checked without a snapshot
+    config = vector_store.config
+    monkeypatch.setattr(config, "embedding_index_check", "all")
+    monkeypatch.setattr(config, "retrieval_mode", "hybrid")
+    monkeypatch.setattr(config, "embedding_dimension", 512)
+    db = InMemoryFirestore()
+    db.seed_vectors(vector_store.embedding_spec())
+    monkeypatch.setattr(vector_store, "_firestore_client", db)
+    in_flight, peak = 0, 0
+    read_fingerprint = vector_store._index_fingerprint
+
+    async def counted_read(collection):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        try:
+            return await read_fingerprint(collection)
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(vector_store, "_index_fingerprint", counted_read)
+    await vector_store.verify_embedding_indexes()
+    assert peak == 2  # both metadata documents are read at once
+
+    monkeypatch.setattr(config, "embedding_dimension", 768)
+    with pytest.raises(EmbeddingIndexMismatch, match="/512/l2 but queries use .*/768/l2"):
+        await vector_store.verify_embedding_indexes()
+
+    # A snapshot is checked instead of the Firestore index for its collection
+    chunks = project_chunks(_read_data_file("projects.json", True))
+    vectors = [fake_embedding(doc["content"], 256) for _, doc in chunks]
+    snapshot.write_snapshot(
+        tmp_path / PROJECT_COLLECTION, chunks, vectors, fingerprint="gemini-embedding-2/256/l2"
+    )
+    monkeypatch.setattr(snapshot, "_snapshots", {})
+    monkeypatch.setattr(config, "embedding_snapshot_dir", str(tmp_path))
+    monkeypatch.setattr(config, "embedding_dimension", 512)
+    with pytest.raises(EmbeddingIndexMismatch, match="Snapshot .*/256/l2"):
+        await vector_store.verify_embedding_indexes()
+
+
+@pytest.mark.asyncio
+async def test_vector_search_projects_fields_filters_and_thresholds_distance(monkeypatch):
+    from benchmarks.fakes import InMemoryFirestore, fake_embedding
+    from src.core import retrieval, vector_store
+    from src.core.tools import recommend_similar_project
+
+    async def fake_embed(text):
+        return fake_embedding(text)
+
+    db = InMemoryFirestore()
+    db.seed_vectors(vector_store.embedding_spec())
+    monkeypatch.setattr(vector_store, "_firestore_client", db)
+    monkeypatch.setattr(vector_store, "embed_text", fake_embed)
+    monkeypatch.setattr(vector_store.config, "embedding_snapshot_dir", "")
+
+    query = "an agent answering questions with retrieval"
+    docs = await vector_store.vector_search("project_embeddings", query, 4, {"category": "nlp-ml"})
+    assert docs and all(doc["category"] == "nlp-ml" for doc in docs)
+    assert all("embedding" not in doc for doc in docs)
+    assert set(docs[0]) == {"slug", "title", "category", "type", "status", "content", "distance"}
+    distances = [doc["distance"] for doc in docs]
+    assert distances == sorted(distances)
+
+    close = await vector_store.vector_search(
+        "project_embeddings", query, 4, distance_threshold=distances[0]
+    )
+    assert all(doc["distance"] <= distances[0] for doc in close) and len(close) < len(docs)
+    with pytest.raises(ValueError, match="can't be filtered on"):
+        await vector_store.vector_search("case_study_embeddings", query, filters={"type": "x"})
+
+    monkeypatch.setattr(retrieval.config, "retrieval_mode", "hybrid")
+    result = await recommend_similar_project("Airflow data pipelines", category="NLP-ML")
+    assert result["similar_projects"]
+    assert {p["category"] for p in result["similar_projects"]} == {"nlp-ml"}
+
+
+@pytest.mark.asyncio
+async def test_filtered_search_without_composite_index_leaves_the_breaker_closed(monkeypatch):
+    from google.api_core.exceptions import FailedPrecondition
+
+    from benchmarks import fakes
+    from src.core import resilience, retrieval, vector_store
+    from src.core.tools import recommend_similar_project
+
+    async def fake_embed(text):
+        return fakes.fake_embedding(text)
+
+    get = fakes._Query.get
+
+    async def needs_composite_index(query):
+        if query._filters and query._nearest:
+            raise FailedPrecondition("The query requires a vector index with 'category'")
+        return await get(query)
+
+    db = fakes.InMemoryFirestore()
+    db.seed_vectors(vector_store.embedding_spec())
+    monkeypatch.setattr(fakes._Query, "get", needs_composite_index)
+    monkeypatch.setattr(vector_store, "_firestore_client", db)
+    monkeypatch.setattr(vector_store, "embed_text", fake_embed)
+    monkeypatch.setattr(vector_store.config, "embedding_snapshot_dir", "")
+    monkeypatch.setattr(retrieval.config, "retrieval_mode", "vector")
+
+    breaker = resilience.get_dependency(resilience.FIRESTORE_VECTOR).breaker
+    for i in range(breaker.failure_threshold + 1):
+        result = await recommend_similar_project(f"retrieval agent {i}", category="nlp-ml")
+        assert "Semantic search not available" in result["message"]
+    assert breaker.state == "closed"
+    assert (await recommend_similar_project("retrieval agent"))["similar_projects"]
+
+
+def test_search_profile_returns_top_passages_with_citations():
+    from src.core.tool_output import estimate_tokens, shape_tool_output, split_artifacts
+    from src.core.tools import get_work_experience_tool_function, search_profile
+
+    result = search_profile("Pharmaidea", limit=2)
+    assert len(result["passages"]) == 2
+    assert all(p["source"] == "work" for p in result["passages"])
+    assert result["_citations"] == [
+        {
+            "kind": "profile",
+            "slug": "work-1",
+            "label": "Software Engineer & ICT Analyst — Pharmaidea SRL",
+        }
+    ]
+    certs = search_profile("LangGraph")["_citations"]
+    assert certs[0] == {
+        "kind": "certification",
+        "slug": "cert-2",
+        "label": "AI Agents in LangGraph - DeepLearning.AI",
+    }
+
+    def tokens(output):
+        return estimate_tokens(shape_tool_output("t", split_artifacts(output)[0]))
+
+    assert tokens(result) * 4 < tokens(get_work_experience_tool_function())
+    assert search_profile("zzzz")["passages"] == []
+
+
+@pytest.mark.asyncio
+async def test_singleflight_propagates_errors_and_survives_cancellation():
+    import asyncio
+
+    from src.core.singleflight import SingleFlight
+
+    flights: SingleFlight[str] = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    leader = asyncio.ensure_future(flights.do("k", work))
+    follower = asyncio.ensure_future(flights.do("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+    assert await follower == "done"
+    assert flights.in_flight() == 0
+
+    async def broken():
+        await asyncio.sleep(0.01)
+        raise ValueError("index missing")
+
+    results = await asyncio.gather(
+        flights.do("e", broken), flights.do("e", broken), return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_singleflight_waiters_keep_their_own_turn_deadlines():
+    from src.core import deadline
+    from src.core.resilience import Dependency, DependencyTimeout
+    from src.core.singleflight import SingleFlight
+
+    flights: SingleFlight[str] = SingleFlight("test")
+    dep = Dependency("slow", timeout=1.0)
+
+    async def work():
+        async def remote():
+            await asyncio.sleep(0.15)
+            return "done"
+
+        return await dep.call(remote)
+
+    async def search(seconds: float) -> str:
+        deadline.TurnBudget(seconds, 0, 0).start()
+        return await flights.do("k", work)
+
+    # The leader's turn runs out first; the follower's still has time for the shared call.
+    leader = asyncio.create_task(search(0.05))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(search(1.0))
+    with pytest.raises(DependencyTimeout):
+        await leader
+    assert await follower == "done"
+
+
+def test_agent_llm_profiles_tier_models_per_agent(monkeypatch):
+    from src.core import agent_orchestrator
+    from src.core.config import get_config
+
+    monkeypatch.setattr(
+        get_config(),
+        "agent_llm_profiles",
+        {
+            "default": {"temperature": 0.2},
+            "router_agent": {"model": "fast-model", "max_tokens": 256, "thinking_budget": 0},
+            "contact_agent": {"model": "fast-model", "max_tokens": 256, "thinking_budget": 0},
+        },
+    )
+    router = agent_orchestrator.llm_profile("router_agent")
+    assert router.model == "fast-model" and router.temperature == 0.2 and router.max_tokens == 256
+    assert agent_orchestrator.llm_profile("project_agent").model == get_config().gemini_model
+
+    from llama_index.core.llms import MockLLM
+
+    built = []
+    monkeypatch.setattr(agent_orchestrator, "_llm", lambda p: built.append(p) or MockLLM())
+    workflow = agent_orchestrator._build_workflow()
+    assert len(built) == 2  # one client per distinct profile
+    agents = workflow.agents
+    assert agents["router_agent"].llm is agents["contact_agent"].llm
+    assert agents["router_agent"].llm is not agents["project_agent"].llm
+
+
+# ── cold start ────────────────────────────────────────────────────────────────
+
+
+def test_app_import_defers_llama_index():
+    import subprocess
+    import sys
+
+    code = "import sys, src.app; print('llama_index.core' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=os.environ
+    )
+    assert out.stdout.strip().splitlines()[-1] == "False"
+
+
+def test_catalog_cache_reloads_on_change(tmp_path, monkeypatch):
+    from src.utils import utils
+
+    (tmp_path / "data").mkdir()
+    path = tmp_path / "data" / "bio.txt"
+    path.write_text("first")
+    monkeypatch.setattr(utils, "_BASE_DIR", str(tmp_path))
+    assert utils._read_data_file("bio.txt") == "first"
+    path.write_text("second, longer")
+    os.utime(path, ns=(0, 10**9))
+    assert utils._read_data_file("bio.txt") == "second, longer"
+
+
+# ── session store contract (every backend) ────────────────────────────────────
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite", "firestore"])
+async def session_store(request, tmp_path):
+    from src.core.session_store import (
+        FirestoreSessionStore,
+        InMemorySessionStore,
+        SQLiteSessionStore,
+    )
+
+    if request.param == "memory":
+        store = InMemorySessionStore()
+    elif request.param == "sqlite":
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    else:
+        from benchmarks.fakes import InMemoryFirestore
+
+        store = FirestoreSessionStore(InMemoryFirestore())
+    yield store
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_session_store_create_and_append(session_store):
+    assert await session_store.get_session("c1") is None
+    await session_store.create_session("c1")
+    session = await session_store.get_session("c1")
+    assert session["message_count"] == 0
+    assert session["last_message_preview"] == ""
+
+    citation = [{"kind": "project", "slug": "news-chatbot", "label": "News"}]
+    await session_store.append_message("c1", {"role": "user", "content": "hi"})
+    await session_store.append_message(
+        "c1",
+        {"role": "assistant", "content": "x" * 150, "agent": "router_agent", "citations": citation},
+    )
+    session = await session_store.get_session("c1")
+    assert session["message_count"] == 2
+    assert session["last_message_preview"] == "x" * 100
+
+    messages = await session_store.get_messages("c1")
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[1]["agent"] == "router_agent"
+    assert messages[1]["citations"] == citation
+    assert messages[0]["timestamp"] is not None
+
+
+@pytest.mark.asyncio
+async def test_session_store_returns_last_n_oldest_first(session_store):
+    await session_store.create_session("c1")
+    for i in range(5):
+        await session_store.append_message("c1", {"role": "user", "content": f"m{i}"})
+    messages = await session_store.get_messages("c1", limit=3)
+    assert [m["content"] for m in messages] == ["m2", "m3", "m4"]
+    assert await session_store.get_messages("c1", limit=0) == []
+    assert await session_store.get_messages("c1", limit=-1) == []
+    assert await session_store.get_messages("missing") == []
+
+
+@pytest.mark.asyncio
+async def test_session_store_delete_and_count(session_store):
+    for chat_id in ("a", "b"):
+        await session_store.create_session(chat_id)
+        await session_store.append_message(chat_id, {"role": "user", "content": "hi"})
+    assert await session_store.count_sessions() == 2
+
+    assert await session_store.delete_session("a") is True
+    assert await session_store.get_session("a") is None
+    assert await session_store.get_messages("a") == []
+    assert await session_store.delete_session("a") is False
+    assert await session_store.count_sessions() == 1
+
+
+@pytest.mark.asyncio
+async def test_session_store_turn_lease(session_store):
+    assert await session_store.acquire_lease("new", "a", ttl=30) is True  # no session yet
+    await session_store.create_session("c")
+    assert await session_store.acquire_lease("c", "a", ttl=30) is True
+    assert await session_store.acquire_lease("c", "b", ttl=30) is False
+    assert await session_store.acquire_lease("c", "a", ttl=30) is True  # renewal
+
+    await session_store.release_lease("c", "b")  # not the holder: no-op
+    assert await session_store.acquire_lease("c", "b", ttl=30) is False
+    await session_store.release_lease("c", "a")
+    assert await session_store.acquire_lease("c", "b", ttl=-1) is True  # already expired
+    assert await session_store.acquire_lease("c", "a", ttl=30) is True
+
+
+# ── offline load harness ──────────────────────────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_offline_load_harness_streams_every_scenario():
+    from benchmarks.fakes import SCENARIOS, FakeRemoteServer
+    from benchmarks.load import LoadOptions, run_load
+
+    options = LoadOptions(
+        clients=len(SCENARIOS), requests=1, first_token_ms=1, token_ms=0, remote_ms=1, warmup=0
+    )
+    with FakeRemoteServer(latency=0.001) as remote:
+        result = await run_load(options, remote.url)
+
+    assert result["errors"] == 0, result["error_samples"]
+    assert result["ttft_ms"]["p50"] is not None
+    assert all(s["requests"] == 1 for s in result["by_scenario"].values())
+
+
+@pytest.mark.asyncio
+async def test_function_agent_mode_keeps_the_sse_contract():
+    from benchmarks.fakes import SCENARIOS, FakeRemoteServer
+    from benchmarks.load import LoadOptions, offline_app, stream_chat
+
+    contact = next(s for s in SCENARIOS if s.name == "contact")
+    events = {}
+    with FakeRemoteServer(latency=0.001) as remote:
+        for mode in ("react", "function"):
+            options = LoadOptions(first_token_ms=1, token_ms=0, answer_tokens=12, agent_mode=mode)
+            async with offline_app(options, remote.url) as app:
+                result = await stream_chat(app, contact.prompt, contact.name)
+            assert result.error is None and result.tokens == 12
+            events[mode] = result.events
+
+    # Same events; only how the answer is chunked into `token` events differs.
+    assert {**events["function"], "token": 0} == {**events["react"], "token": 0}
+    assert events["function"]["tool_call"] == 1 and events["function"]["action"] == 1
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_turn_and_saves_truncated_answer(monkeypatch):
+    from benchmarks.fakes import SCENARIOS, FakeRemoteServer
+    from benchmarks.load import LoadOptions, offline_app, stream_chat
+    from src.api.endpoints import _CANCELLED
+    from src.app import app as main_app
+    from src.core import turns
+
+    monkeypatch.setattr(turns.registry, "grace", 0)  # no resume window
+
+    options = LoadOptions(first_token_ms=1, token_ms=50, answer_tokens=40, session_backend="memory")
+    scenario = SCENARIOS[0]
+    cancelled = _CANCELLED.value(reason="client_disconnect")
+    with FakeRemoteServer(latency=0.001) as remote:
+        async with offline_app(options, remote.url) as app:
+            started = time.perf_counter()
+            result = await stream_chat(
+                app, scenario.prompt, scenario.name, disconnect_after_tokens=2
+            )
+            assert time.perf_counter() - started < 1.5  # 40 tokens at 50 ms not waited for
+            await asyncio.sleep(0.1)  # detached cleanup
+            messages = await main_app.state.sessions.get_messages(result.chat_id)
+
+    assert "done" not in result.events
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[1]["truncated"] is True and messages[1]["content"]
+    assert _CANCELLED.value(reason="client_disconnect") == cancelled + 1
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_with_last_event_id_without_rerunning_turn():
+    from benchmarks.fakes import SCENARIOS, FakeRemoteServer
+    from benchmarks.load import LoadOptions, offline_app, stream_chat
+    from src.app import app as main_app
+
+    options = LoadOptions(first_token_ms=1, token_ms=5, answer_tokens=30, session_backend="memory")
+    scenario = SCENARIOS[2]
+    key = {"Idempotency-Key": "turn-1"}
+    with FakeRemoteServer(latency=0.001) as remote:
+        async with offline_app(options, remote.url) as app:
+            first = await stream_chat(
+                app, scenario.prompt, scenario.name, disconnect_after_tokens=3, headers=key
+            )
+            resumed = await stream_chat(
+                app,
+                scenario.prompt,
+                scenario.name,
+                headers={**key, "Last-Event-ID": first.last_event_id},
+            )
+            replayed = await stream_chat(app, scenario.prompt, scenario.name, headers=key)
+            messages = await main_app.state.sessions.get_messages(first.chat_id)
+
+    assert "done" not in first.events and resumed.events["done"] == 1
+    assert "meta" not in resumed.events  # continued after the last event seen
+    assert first.tokens + resumed.tokens == replayed.tokens
+    assert replayed.events["meta"] == 1 and replayed.chat_id == first.chat_id
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[1]["truncated"] is False
+
+
+@pytest.mark.asyncio
+async def test_retry_while_queued_for_admission_attaches_to_the_same_turn(monkeypatch):
+    from benchmarks.fakes import SCENARIOS, FakeRemoteServer
+    from benchmarks.load import LoadOptions, offline_app, stream_chat
+    from src.api import endpoints
+    from src.app import app as main_app
+    from src.core import turns
+
+    admitted = asyncio.Event()
+    admit = endpoints._admit
+
+    async def queued_admit():
+        await admitted.wait()
+        return await admit()
+
+    monkeypatch.setattr(endpoints, "_admit", queued_admit)
+    options = LoadOptions(first_token_ms=1, token_ms=1, answer_tokens=5, session_backend="memory")
+    scenario = SCENARIOS[2]
+    key = {"Idempotency-Key": "queued-1"}
+    with FakeRemoteServer(latency=0.001) as remote:
+        async with offline_app(options, remote.url) as app:
+            first = asyncio.create_task(
+                stream_chat(app, scenario.prompt, scenario.name, headers=key)
+            )
+            await asyncio.sleep(0.05)
+            assert turns.registry.pending("queued-1") is not None
+            retry = asyncio.create_task(
+                stream_chat(app, scenario.prompt, scenario.name, headers=key)
+            )
+            await asyncio.sleep(0.05)
+            admitted.set()
+            results = await asyncio.gather(first, retry)
+            messages = await main_app.state.sessions.get_messages(results[0].chat_id)
+
+    assert results[0].chat_id == results[1].chat_id
+    assert all(r.events["done"] == 1 and r.tokens == 5 for r in results)
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert turns.registry.pending("queued-1") is None
+
+
+@pytest.mark.asyncio
+async def test_turn_deadline_ends_stream_with_reason_and_partial_answer():
+    from benchmarks.fakes import SCENARIOS, FakeRemoteServer
+    from benchmarks.load import LoadOptions, offline_app, stream_chat
+    from src.app import app as main_app
+
+    scenario = SCENARIOS[2]
+    with FakeRemoteServer(latency=0.001) as remote:
+        # Three LLM steps of 150 ms each can't fit in a 0.2 s deadline.
+        options = LoadOptions(first_token_ms=150, token_ms=1, session_backend="memory")
+        async with offline_app(options, remote.url) as app:
+            start = time.perf_counter()
+            slow = await stream_chat(
+                app, scenario.prompt, scenario.name, body_fields={"deadlineSeconds": 0.2}
+            )
+            elapsed = time.perf_counter() - start
+            stepped = await stream_chat(
+                app, scenario.prompt, scenario.name, body_fields={"maxSteps": 2}
+            )
+            messages = await main_app.state.sessions.get_messages(slow.chat_id)
+
+    assert slow.done_reason == "deadline_exceeded" and elapsed < 0.5
+    assert slow.events["token"] == 1  # the fallback answer
+    assert messages[-1]["role"] == "assistant" and messages[-1]["truncated"] is True
+    assert stepped.done_reason == "step_budget_exceeded" and stepped.events["tool_call"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deprecated_sync_chat_runs_under_the_turn_budget(monkeypatch):
+    from benchmarks.fakes import SCENARIOS, FakeRemoteServer
+    from benchmarks.load import LoadOptions, offline_app
+    from src.core import deadline
+    from src.core.config import get_config
+
+    config = get_config()
+    monkeypatch.setattr(config, "turn_max_steps", 2)
+    headers = {"Authorization": f"Bearer {config.api_key}"}
+    body = {"message": SCENARIOS[2].prompt}
+    with FakeRemoteServer(latency=0.001) as remote:
+        options = LoadOptions(first_token_ms=1, token_ms=1, session_backend="memory")
+        async with offline_app(options, remote.url) as app:
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url=BASE_URL) as ac:
+                stepped = await ac.post("/api/v1/chat", json=body, headers=headers)
+                monkeypatch.setattr(config, "turn_max_steps", 12)
+                full = await ac.post("/api/v1/chat", json=body, headers=headers)
+
+    assert stepped.status_code == 200
+    assert stepped.json()["message"] == deadline.OUT_OF_BUDGET_ANSWER
+    assert full.status_code == 200
+    assert full.json()["message"] not in ("", deadline.OUT_OF_BUDGET_ANSWER)
+
+
+def test_degradation_tiers_escalate_with_pressure_and_recover_one_at_a_time():
+    from src.core import degradation
+
+    now = [0.0]
+    controller = degradation.DegradationController("auto", 2, 20.0, 30.0, clock=lambda: now[0])
+    assert controller.tier() == degradation.FULL
+
+    for _ in range(4):  # twice the per-minute limit
+        controller.record_rate_limit()
+    assert controller.tier() == degradation.NO_ROUTER
+
+    now[0] = 61.0  # the 429s age out: step down one tier per recovery period
+    assert controller.tier() == degradation.NO_ROUTER
+    now[0] = 91.0
+    assert controller.tier() == degradation.SMALL_MODEL
+    now[0] = 121.0
+    assert controller.tier() == degradation.NO_SEMANTIC_SEARCH
+
+    # cached_only turns don't run the workflow, so latency samples must age out by themselves
+    slow = degradation.DegradationController("auto", 0, 20.0, 30.0, clock=lambda: now[0])
+    for _ in range(10):
+        slow.observe_turn(65.0)  # p95 at 3.25x the target
+    assert slow.tier() == degradation.CACHED_ONLY
+    now[0] += 250.0
+    assert slow.tier() == degradation.CACHED_ONLY
+    now[0] += 60.0  # samples older than the latency window no longer count
+    assert slow.pressure()["latency"] == 0.0
+    assert slow.tier() == degradation.CACHED_ONLY
+    now[0] += 30.0
+    assert slow.tier() == degradation.NO_ROUTER
+
+    assert degradation.DegradationController("small_model", 2, 20.0, 30.0).tier() == 2
+    assert degradation.route_by_keywords("What's his tech stack?") == "technical_agent"
+    assert degradation.route_by_keywords("Show me a RAG project") == "project_agent"
+
+
+@pytest.mark.asyncio
+async def test_cached_only_tier_replays_answers_without_the_workflow():
+    from benchmarks.fakes import SCENARIOS, FakeRemoteServer
+    from benchmarks.load import LoadOptions, offline_app, stream_chat
+    from src.core import degradation
+
+    scenario = SCENARIOS[0]
+    with FakeRemoteServer(latency=0.001) as remote:
+        options = LoadOptions(first_token_ms=1, token_ms=1, session_backend="memory")
+        async with offline_app(options, remote.url) as app:
+            full = await stream_chat(app, scenario.prompt, scenario.name)
+            degradation.controller.mode = "cached_only"
+            cached = await stream_chat(app, scenario.prompt, scenario.name)
+            missed = await stream_chat(app, "Something nobody asked before", scenario.name)
+
+    assert full.tier == "full" and cached.tier == "cached_only"
+    assert cached.events["token"] == 1 and "tool_call" not in cached.events
+    assert cached.events.get("citation") == full.events.get("citation")
+    assert missed.done_reason == "degraded" and missed.events["token"] == 1
+
+
 # ── v2 streaming ──────────────────────────────────────────────────────────────
 
 
@@ -317,6 +1583,8 @@ async def test_v2_history_and_delete(client: AsyncClient):
     data = r.json()
     assert data["totalMessages"] >= 2
     assert data["messages"][0]["role"] == "user"
+    r = await client.get(f"/api/v2/chat/{chat_id}/history?limit=0", headers=headers)
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
     r2 = await client.delete(f"/api/v2/chat/{chat_id}", headers=headers)
     assert r2.status_code == status.HTTP_200_OK